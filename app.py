@@ -7,18 +7,26 @@ blockchain analysis tasks using RPC connections.
 """
 
 import os
-import sqlite3
+import glob
+import re
+import base64
 import json
 import threading
 import time
+import traceback
+from collections import deque
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash
 from werkzeug.security import generate_password_hash, check_password_hash
 import requests
 from dotenv import load_dotenv
-import subprocess
-import sys
 import logging
+import db
+from rpc_budget import RPCBudget, DEFAULT_RPC_BUDGET
+from job_queue import JobQueue, DEFAULT_PRIORITY, create_table as create_job_queue_table
+from event_hub import EventHub
+from progress_bus import ProgressBus
+from final_analyzer_rpc import run_analysis, run_merged_analysis, thread_stdout, DEFAULT_CACHE_PATH, DEFAULT_ARCHIVE_DIR, DEFAULT_MEMO_PATH
 
 # Load environment variables
 load_dotenv()
@@ -30,31 +38,256 @@ app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 app.logger.setLevel(logging.DEBUG)
 
-# Database configuration
-DB_PATH = 'analyzer.db'
-
-# Global variables for tracking analysis status and job queue
-analysis_status = {
-    'running': False,
-    'progress': 0,
-    'current_block': 0,
-    'total_blocks': 0,
-    'start_time': None,
-    'results': None,
-    'error': None,
-    'current_job_id': None,
-    'current_job_name': None
-}
+# HTTP session per thread, so status polling reuses keep-alive connections to the node;
+# a requests.Session is not safe to share between threads
+rpc_sessions = threading.local()
+
+# Progress of the running queue jobs by job id, in start order; read without a lock
+progress_bus = ProgressBus()
 
-# Job queue management
-job_queue = []
+# Job queue management; queued jobs are kept in the database and up to JOB_WORKERS of them run at once
+job_queue = JobQueue()
 queue_lock = threading.Lock()
-queue_worker_thread = None
-queue_worker_running = False
+queue_workers = 0
+JOB_WORKERS = int(os.getenv('B1T_JOB_WORKERS', 2))
+
+# Queued jobs listed by /api/queue_status
+QUEUE_STATUS_LIMIT = 100
+
+# Most queued jobs with overlapping ranges analyzed together in one scan (1 runs every job on its own)
+COALESCE_MAX_JOBS = int(os.getenv('B1T_COALESCE_MAX_JOBS', 16))
+
+# Concurrent RPC requests shared fairly by all running jobs (B1T_RPC_BUDGET)
+rpc_budget = RPCBudget(DEFAULT_RPC_BUDGET)
+
+# Stop events of running follow jobs and their latest status, by job id; they run beside the queue
+follow_jobs = {}
+follow_status = {}
+follow_lock = threading.Lock()
+
+# Latest status, queue, chain, follow and job state snapshots streamed to the pages by /api/events
+event_hub = EventHub()
+event_publishers_started = False
+event_publishers_lock = threading.Lock()
+
+# Directory the analyzer's relative cache, archive and memo paths resolve against
+ANALYZER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Lines of analyzer output kept with a job's results
+OUTPUT_TAIL_LINES = 200
+
+# Columns added to analysis_jobs after the initial schema: (name, definition)
+JOB_COLUMN_MIGRATIONS = [
+    ('pipeline_depth', 'INTEGER DEFAULT 4'),
+    ('stream_phase2', 'BOOLEAN DEFAULT FALSE'),
+    ('fetch_mode', "TEXT DEFAULT 'two-phase'"),
+    ('archive_mode', "TEXT DEFAULT 'off'"),
+    ('shards', 'INTEGER DEFAULT 1'),
+    ('follow', 'BOOLEAN DEFAULT FALSE'),
+    ('priority', 'INTEGER DEFAULT 0'),
+]
+
+# Jobs shown on the dashboard and the job list, newest first; the parameter is the row limit (-1 for all)
+JOB_LIST_QUERY = '''
+    SELECT id, name, start_block, end_block, status, created_at, completed_at
+    FROM analysis_jobs 
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+'''
+
+# Columns added to analysis_results after the initial schema: (name, definition)
+RESULT_COLUMN_MIGRATIONS = [
+    ('num_outputs', 'INTEGER'),
+    ('is_coinbase', 'BOOLEAN DEFAULT FALSE'),
+]
+
+# Found transactions buffered before they are written to analysis_results in one transaction
+RESULT_BATCH_SIZE = 1000
+
+# Longest time, in seconds, a found transaction waits in the buffer before it is written
+RESULT_FLUSH_INTERVAL = 2.0
+
+# Page sizes of /api/job/<id>/transactions
+TRANSACTION_PAGE_SIZE = 100
+MAX_TRANSACTION_PAGE_SIZE = 1000
+
+# Sort keys of /api/job/<id>/transactions; rows are paged by (expression, id). Rows moved from older
+# jobs' results may lack their zero count; they sort as -1, below every counted transaction
+TRANSACTION_SORTS = {'block': 'block_number', 'zeros': 'COALESCE(leading_zeros, -1)'}
+
+# Filters of /api/job/<id>/transactions: query parameter -> condition on analysis_results
+TRANSACTION_FILTERS = {
+    'min_zeros': 'leading_zeros >= ?',
+    'max_zeros': 'leading_zeros <= ?',
+    'min_inputs': 'num_inputs >= ?',
+    'from_block': 'block_number >= ?',
+    'to_block': 'block_number <= ?',
+}
+
+# Fetch strategies understood by final_analyzer_rpc.py --fetch-mode
+FETCH_MODES = ('two-phase', 'single-pass', 'auto')
+
+# Txid archive usage: off, write (archive scanned blocks), read (answer from the archive, archiving what it lacks)
+ARCHIVE_MODES = ('off', 'write', 'read')
+
+# Server-Sent Events: seconds between status/queue/follow/jobs snapshots, between chain tip queries
+# to the node, and between keep-alive comments on a quiet stream
+EVENT_INTERVAL = float(os.getenv('B1T_EVENT_INTERVAL', 1))
+CHAIN_INFO_INTERVAL = 30
+EVENT_KEEPALIVE = 15
+
+# Topics of /api/events
+EVENT_TOPICS = ('status', 'queue', 'chain', 'follow', 'jobs')
+
+# Finished jobs whose final status the 'jobs' topic carries besides the unfinished ones, most recently completed first
+JOB_EVENTS_FINISHED_LIMIT = 100
+
+# Analyzer checkpoints from which failed jobs are resumed, one per job and memo run or shard; also holds follow job state
+CHECKPOINT_DIR = os.path.abspath(os.getenv('B1T_CHECKPOINT_DIR', 'checkpoints'))
+
+def encode_cursor(value, row_id):
+    return base64.urlsafe_b64encode(json.dumps([value, row_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    """Return the (sort value, row id) a page cursor points after; raises ValueError for malformed cursors."""
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(value), int(row_id)
+    except (TypeError, ValueError, UnicodeEncodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def load_transaction_page(cursor, job_id, special_only=True, sort='block', descending=True, limit=TRANSACTION_PAGE_SIZE, after=None, filters=None):
+    """Return (one page of a job's stored transactions, cursor of the next page or None).
+    
+    filters are (condition, parameters...) tuples. Pages are read by keyset:
+    after is the (sort value, id) of the last row of the previous page, so
+    every page costs an index seek regardless of how deep into the job's
+    results it is.
+    """
+    column = TRANSACTION_SORTS[sort]
+    conditions = ['job_id = ?']
+    params = [job_id]
+    if special_only:
+        conditions.append('is_special')
+    for condition, *values in filters or []:
+        conditions.append(condition)
+        params.extend(values)
+    if after:
+        conditions.append(f"({column}, id) {'<' if descending else '>'} (?, ?)")
+        params.extend(after)
+    direction = 'DESC' if descending else 'ASC'
+    
+    cursor.execute(f'''
+        SELECT id, {column}, block_number, transaction_hash, leading_zeros, num_inputs, num_outputs, is_coinbase, is_special
+        FROM analysis_results
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {column} {direction}, id {direction}
+        LIMIT ?
+    ''', params + [limit + 1])
+    rows = cursor.fetchall()
+    
+    transactions = [{
+        'block': block,
+        'hash': tx_hash,
+        'zeros': zeros,
+        'inputs': num_inputs,
+        'outputs': num_outputs,
+        'coinbase': bool(is_coinbase),
+        'special': bool(is_special)
+    } for _, _, block, tx_hash, zeros, num_inputs, num_outputs, is_coinbase, is_special in rows[:limit]]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[1], last[0])
+    return transactions, next_cursor
+
+def job_checkpoint_path(job_id):
+    return os.path.join(CHECKPOINT_DIR, f'job_{job_id}.json')
+
+def job_follow_state_path(job_id):
+    return os.path.join(CHECKPOINT_DIR, f'job_{job_id}.follow.json')
+
+def load_follow_status(job_id):
+    """Return the last status with totals a follow job reported, or None."""
+    with follow_lock:
+        return follow_status.get(job_id)
+
+def load_follow_state_tip(job_id):
+    """Return the last block a follow job's saved state covers, or None if it has none."""
+    try:
+        with open(job_follow_state_path(job_id)) as f:
+            return json.load(f)['tip']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def job_checkpoint_files(job_id):
+    """Return all checkpoint files of a job; the analyzer suffixes the path per memo run (.<first block>) and shard (.shard<n>)."""
+    return glob.glob(glob.escape(job_checkpoint_path(job_id)) + '*')
+
+def load_job_checkpoint(job_id):
+    """Return the saved checkpoint state of a job merged over its runs and shards, or None.
+    
+    The phase and next height are those of the checkpoint furthest behind;
+    runs counts the checkpoints and blocks_analyzed adds up their blocks.
+    """
+    states = []
+    for path in job_checkpoint_files(job_id):
+        if path.endswith(('.candidates', '.tmp')):
+            continue
+        try:
+            with open(path) as f:
+                states.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    if not states:
+        return None
+    behind = min(states, key=lambda state: state['next_height'])
+    return {
+        'phase': behind['phase'],
+        'next_height': behind['next_height'],
+        'runs': len(states),
+        'blocks_analyzed': sum(state.get('blocks_analyzed', 0) for state in states)
+    }
+
+def remove_job_checkpoints(job_id):
+    for path in job_checkpoint_files(job_id):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def migrate_result_details(cursor):
+    """Move transaction lists that older jobs kept in their results column into analysis_results."""
+    cursor.execute("SELECT id, results FROM analysis_jobs WHERE results LIKE '%transaction_details%'")
+    for job_id, results_json in cursor.fetchall():
+        try:
+            results = json.loads(results_json)
+        except ValueError:
+            continue
+        parsed = results.get('parsed') or {}
+        special = parsed.pop('special_transaction_details', None) or []
+        listed = parsed.pop('zero_transaction_details', None) or []
+        special_hashes = {tx['hash'] for tx in special}
+        
+        rows = []
+        for tx, is_special in [(tx, True) for tx in special] + [(tx, False) for tx in listed if tx['hash'] not in special_hashes]:
+            # Older results only carry the details string, e.g. "3 zeros, 2 inputs, 1 outputs (COINBASE)"
+            numbers = re.match(r'(\d+) zeros, (\d+) inputs, (\d+) outputs', tx.get('details', ''))
+            zeros, num_inputs, num_outputs = map(int, numbers.groups()) if numbers else (None, None, None)
+            rows.append((job_id, tx['block'], tx['hash'], zeros, num_inputs, num_outputs, 'COINBASE' in tx.get('details', ''), is_special))
+        
+        app.logger.info(f"Moving {len(rows)} transactions of job {job_id} into analysis_results")
+        cursor.execute('DELETE FROM analysis_results WHERE job_id = ?', (job_id,))
+        cursor.executemany('''
+            INSERT INTO analysis_results (job_id, block_number, transaction_hash, leading_zeros, num_inputs, num_outputs, is_coinbase, is_special)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        cursor.execute('UPDATE analysis_jobs SET results = ? WHERE id = ?', (json.dumps(results), job_id))
 
 def init_database():
     """Initialize the SQLite database with required tables."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db.get_connection()
     cursor = conn.cursor()
     
     # Create analysis_jobs table
@@ -74,10 +307,27 @@ def init_database():
             started_at TIMESTAMP,
             completed_at TIMESTAMP,
             results TEXT,
-            error_message TEXT
+            error_message TEXT,
+            pipeline_depth INTEGER DEFAULT 4,
+            stream_phase2 BOOLEAN DEFAULT FALSE,
+            fetch_mode TEXT DEFAULT 'two-phase',
+            archive_mode TEXT DEFAULT 'off',
+            shards INTEGER DEFAULT 1,
+            follow BOOLEAN DEFAULT FALSE,
+            priority INTEGER DEFAULT 0
         )
     ''')
     
+    # Add columns introduced after the initial schema to existing databases
+    cursor.execute('PRAGMA table_info(analysis_jobs)')
+    existing_columns = [column[1] for column in cursor.fetchall()]
+    for column, definition in JOB_COLUMN_MIGRATIONS:
+        if column not in existing_columns:
+            app.logger.info(f"Adding {column} column to analysis_jobs table")
+            cursor.execute(f'ALTER TABLE analysis_jobs ADD COLUMN {column} {definition}')
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_jobs_created ON analysis_jobs (created_at)')
+    
     # Create analysis_results table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS analysis_results (
@@ -89,10 +339,28 @@ def init_database():
             num_inputs INTEGER,
             is_special BOOLEAN,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            num_outputs INTEGER,
+            is_coinbase BOOLEAN DEFAULT FALSE,
             FOREIGN KEY (job_id) REFERENCES analysis_jobs (id)
         )
     ''')
     
+    cursor.execute('PRAGMA table_info(analysis_results)')
+    existing_columns = [column[1] for column in cursor.fetchall()]
+    for column, definition in RESULT_COLUMN_MIGRATIONS:
+        if column not in existing_columns:
+            app.logger.info(f"Adding {column} column to analysis_results table")
+            cursor.execute(f'ALTER TABLE analysis_results ADD COLUMN {column} {definition}')
+    
+    # Every lookup is per job: by block, by leading zeros, or the special transactions in block order
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_job_block ON analysis_results (job_id, block_number)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_job_zeros ON analysis_results (job_id, leading_zeros)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_job_zeros_sort ON analysis_results (job_id, COALESCE(leading_zeros, -1))')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_job_special ON analysis_results (job_id, is_special, block_number)')
+    migrate_result_details(cursor)
+    
+    create_job_queue_table(cursor)
+    
     # Create rpc_config table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS rpc_config (
@@ -121,15 +389,10 @@ def init_database():
         ))
     
     conn.commit()
-    conn.close()
 
 def get_rpc_config():
     """Get RPC configuration from database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT host, port, username, password, timeout FROM rpc_config WHERE id = 1')
-    result = cursor.fetchone()
-    conn.close()
+    result = db.fetch_one('SELECT host, port, username, password, timeout FROM rpc_config WHERE id = 1')
     
     if result:
         return {
@@ -141,6 +404,13 @@ def get_rpc_config():
         }
     return None
 
+def rpc_session():
+    """Return the calling thread's HTTP session to the node, creating it on first use."""
+    session = getattr(rpc_sessions, 'session', None)
+    if session is None:
+        session = rpc_sessions.session = requests.Session()
+    return session
+
 def make_rpc_call(method, params=None):
     """Make RPC call to B1t node."""
     config = get_rpc_config()
@@ -158,7 +428,7 @@ def make_rpc_call(method, params=None):
     }
     
     try:
-        response = requests.post(
+        response = rpc_session().post(
             url,
             data=json.dumps(payload),
             headers=headers,
@@ -199,379 +469,552 @@ def get_blockchain_info():
         }
     return None
 
-def parse_analysis_output(output):
-    """Parse the analysis output and extract structured data."""
-    parsed_data = {
-        'blocks_analyzed': 0,
-        'transactions_analyzed': 0,
-        'coinbase_transactions': 0,
-        'multi_input_transactions': 0,
-        'zero_transactions': 0,
-        'zero_breakdown': {},
-        'special_transactions': 0,
-        'special_transaction_details': [],
-        'analysis_time': 0,
-        'rate': 0,
-        'phase1_time': 0,
-        'phase2_time': 0
-    }
+class OutputTail:
+    """File-like sink that keeps the last max_lines lines written to it."""
     
-    lines = output.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Parse summary statistics
-        if 'Blocks analyzed:' in line:
-            parsed_data['blocks_analyzed'] = int(line.split(':')[1].strip())
-        elif 'Transactions analyzed:' in line:
-            parsed_data['transactions_analyzed'] = int(line.split(':')[1].strip())
-        elif 'Coinbase transactions:' in line:
-            parsed_data['coinbase_transactions'] = int(line.split(':')[1].strip())
-        elif 'Multi-input transactions:' in line:
-            parsed_data['multi_input_transactions'] = int(line.split(':')[1].strip())
-        elif 'Transactions with' in line and 'leading zeros:' in line:
-            try:
-                # Extract the number after the colon
-                value_str = line.split(':')[1].strip()
-                parsed_data['zero_transactions'] = int(value_str)
-                app.logger.debug(f"Parsed zero_transactions: {value_str} -> {parsed_data['zero_transactions']}")
-            except (ValueError, IndexError) as e:
-                app.logger.error(f"Failed to parse zero_transactions from line: '{line}' - Error: {e}")
-                parsed_data['zero_transactions'] = 0
-        elif 'SPECIAL transactions' in line:
-            parsed_data['special_transactions'] = int(line.split(':')[1].strip())
-        elif 'Total analysis time:' in line:
-            try:
-                time_str = line.split(':')[1].strip().replace(' seconds', '')
-                parsed_data['analysis_time'] = float(time_str)
-            except (ValueError, IndexError) as e:
-                app.logger.warning(f"Could not parse analysis time from line: {line} - {e}")
-                parsed_data['analysis_time'] = 0.0
-        elif 'Rate:' in line and 'blocks/sec' in line:
-            try:
-                rate_str = line.split(':')[1].strip().replace(' blocks/sec', '')
-                # Handle cases like "0.00, Zero TXs found"
-                if ',' in rate_str:
-                    rate_str = rate_str.split(',')[0].strip()
-                parsed_data['rate'] = float(rate_str)
-            except (ValueError, IndexError) as e:
-                app.logger.warning(f"Could not parse rate from line: {line} - {e}")
-                parsed_data['rate'] = 0.0
-        elif 'Phase 1 (collection):' in line:
-            try:
-                parts = line.split(',')
-                phase1_time = parts[0].split(':')[1].strip().replace('s', '')
-                phase2_time = parts[1].split(':')[1].strip().replace('s', '')
-                parsed_data['phase1_time'] = float(phase1_time)
-                parsed_data['phase2_time'] = float(phase2_time)
-            except (ValueError, IndexError) as e:
-                app.logger.warning(f"Could not parse phase times from line: {line} - {e}")
-                parsed_data['phase1_time'] = 0.0
-                parsed_data['phase2_time'] = 0.0
-        
-        # Parse zero breakdown
-        if ' leading zeros:' in line and 'transactions' in line:
+    def __init__(self, max_lines=OUTPUT_TAIL_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.partial = ''
+    
+    def write(self, text):
+        *lines, self.partial = (self.partial + text).split('\n')
+        self.lines.extend(lines)
+        return len(text)
+    
+    def flush(self):
+        pass
+    
+    def getvalue(self):
+        return '\n'.join([*self.lines, self.partial])
+
+class ResultWriter:
+    """Analyzer events callback that stores a job's found transactions in analysis_results.
+    
+    Rows are buffered and written with executemany, at most batch_size rows
+    per transaction. The buffer is also written after every analyzed batch,
+    before the analyzer saves a checkpoint or the follow state, and once
+    flush_interval seconds have passed, so the job page shows results while
+    the scan runs and a saved tip never covers unwritten rows. A transaction that is both special and listed among the
+    zero transactions is reported twice by the analyzer but stored once,
+    with is_special set. Follow mode rollbacks delete the rows of the
+    dropped blocks.
+    """
+    
+    def __init__(self, job_id, min_inputs, batch_size=RESULT_BATCH_SIZE, flush_interval=RESULT_FLUSH_INTERVAL):
+        self.job_id = job_id
+        self.min_inputs = min_inputs
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.written = 0
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.conn = db.connect()
+    
+    def clear(self, above_block=None):
+        """Delete the job's stored rows, or only those above above_block."""
+        with self.lock:
+            if above_block is None:
+                self.conn.execute('DELETE FROM analysis_results WHERE job_id = ?', (self.job_id,))
+            else:
+                self.conn.execute('DELETE FROM analysis_results WHERE job_id = ? AND block_number > ?', (self.job_id, above_block))
+            self.conn.commit()
+    
+    def __call__(self, event):
+        kind = event['event']
+        # Listed transactions with enough inputs are special; their 'special' event already stored them
+        if kind == 'special' or (kind == 'zero' and event['inputs'] < self.min_inputs):
+            row = (self.job_id, event['block'], event['hash'], event['zeros'], event['inputs'], event['outputs'], event['coinbase'], kind == 'special')
+            with self.lock:
+                self.rows.append(row)
+                if len(self.rows) >= self.batch_size or time.monotonic() - self.flushed_at >= self.flush_interval:
+                    self._flush()
+        elif kind in ('batch', 'checkpoint', 'summary'):
+            with self.lock:
+                self._flush()
+        elif kind == 'rollback':
+            with self.lock:
+                self._flush()
+                self.conn.execute('DELETE FROM analysis_results WHERE job_id = ? AND block_number BETWEEN ? AND ?',
+                                  (self.job_id, event['first'], event['last']))
+                self.conn.commit()
+    
+    def _flush(self):
+        self.flushed_at = time.monotonic()
+        if not self.rows:
+            return
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO analysis_results (job_id, block_number, transaction_hash, leading_zeros, num_inputs, num_outputs, is_coinbase, is_special)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+    
+    def close(self):
+        """Write the buffered rows and close the connection."""
+        with self.lock:
             try:
-                parts = line.strip().split(' ')
-                if len(parts) >= 4:
-                    zeros = parts[0]
-                    count = parts[3]
-                    # Skip lines with '+' in zeros as they are summary lines
-                    if '+' not in zeros:
-                        parsed_data['zero_breakdown'][zeros] = int(count)
-                        app.logger.debug(f"Parsed zero breakdown: {zeros} -> {count}")
-                    else:
-                        app.logger.debug(f"Skipping summary line with '+': {line}")
-            except (ValueError, IndexError) as e:
-                app.logger.error(f"Failed to parse zero breakdown from line: '{line}' - Error: {e}")
-                continue
-        
-        # Parse special transactions
-        if 'Block ' in line and ':' in line and 'zeros' in line and 'inputs' in line:
-            # Extract transaction details
-            parts = line.split(':')
-            if len(parts) >= 2:
-                block_part = parts[0].strip()
-                tx_part = parts[1].strip()
-                
-                block_num = block_part.replace('Block ', '')
-                tx_details = tx_part.split(' ')
-                
-                if len(tx_details) >= 1:
-                    tx_hash = tx_details[0]
-                    
-                    # Extract additional info from parentheses
-                    paren_info = ''
-                    if '(' in line and ')' in line:
-                        paren_info = line[line.find('(')+1:line.find(')')]
-                    
-                    parsed_data['special_transaction_details'].append({
-                        'block': block_num,
-                        'hash': tx_hash,
-                        'details': paren_info
-                    })
-    
-    return parsed_data
-
-def add_job_to_queue(job_id, name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase):
-    """Add a job to the processing queue."""
-    global queue_worker_thread, queue_worker_running
+                self._flush()
+            finally:
+                self.conn.close()
+
+def analysis_options(batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth=4, stream_phase2=False, fetch_mode='two-phase', archive_mode='off', resume=False):
+    """Keyword arguments for final_analyzer_rpc.run_analysis from a job's parameters."""
+    return {
+        'batch_size': batch_size,
+        'min_zeros': min_zeros,
+        'min_inputs': min_inputs,
+        'show_all_zeros': bool(show_all_zeros),
+        'exclude_coinbase': bool(exclude_coinbase),
+        'pipeline_depth': pipeline_depth,
+        'stream': bool(stream_phase2),
+        'fetch_mode': fetch_mode,
+        'write_archive': archive_mode in ('write', 'read'),
+        'from_archive': archive_mode == 'read',
+        'cache_path': os.path.join(ANALYZER_DIR, DEFAULT_CACHE_PATH),
+        'archive_dir': os.path.join(ANALYZER_DIR, DEFAULT_ARCHIVE_DIR),
+        'resume': resume,
+        'verbose': True
+    }
+
+def add_job_to_queue(job_id, name, priority=DEFAULT_PRIORITY, resume=False):
+    """Add a job to the processing queue; its parameters are read from analysis_jobs when it starts."""
+    job_queue.put(job_id, priority, resume)
+    app.logger.info(f"Job {job_id} ({name}) added to queue with priority {priority}")
+    start_queue_workers()
+
+def recover_queued_jobs():
+    """Queue the jobs a previous run of the app left queued or running and start the workers for them."""
+    recovered = job_queue.recover()
+    if recovered:
+        app.logger.info(f"Recovered {recovered} queued jobs")
+    if len(job_queue):
+        start_queue_workers()
+
+def recover_follow_jobs():
+    """Restart the follow jobs a previous run of the app left running; each continues from its saved follow state."""
+    jobs = db.fetch_all('''
+        SELECT id, name, start_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth, fetch_mode
+        FROM analysis_jobs
+        WHERE status = 'running' AND COALESCE(follow, 0)
+        ORDER BY id
+    ''')
+    for job in jobs:
+        start_follow_job(*job)
+    if jobs:
+        app.logger.info(f"Restarted {len(jobs)} follow jobs")
+    return len(jobs)
+
+def start_queue_workers():
+    """Start the JOB_WORKERS worker threads unless they are running already."""
+    global queue_workers
     
     with queue_lock:
-        job_queue.append({
-            'job_id': job_id,
-            'name': name,
-            'start_block': start_block,
-            'end_block': end_block,
-            'batch_size': batch_size,
-            'min_zeros': min_zeros,
-            'min_inputs': min_inputs,
-            'show_all_zeros': show_all_zeros,
-            'exclude_coinbase': exclude_coinbase
-        })
-        
-        # Update job status to queued
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE analysis_jobs 
-            SET status = 'queued'
-            WHERE id = ?
-        ''', (job_id,))
-        conn.commit()
-        conn.close()
-        
-        app.logger.info(f"Job {job_id} ({name}) added to queue. Queue length: {len(job_queue)}")
-        
-        # Start queue worker if not running
-        if not queue_worker_running:
-            start_queue_worker()
+        while queue_workers < JOB_WORKERS:
+            queue_workers += 1
+            threading.Thread(target=queue_worker, daemon=True).start()
+            app.logger.info(f"Queue worker started ({queue_workers} of {JOB_WORKERS})")
 
-def start_queue_worker():
-    """Start the queue worker thread."""
-    global queue_worker_thread, queue_worker_running
-    
-    if queue_worker_running:
-        return
-        
-    queue_worker_running = True
-    queue_worker_thread = threading.Thread(target=queue_worker, daemon=True)
-    queue_worker_thread.start()
-    app.logger.info("Queue worker started")
+def load_queued_job(job_id):
+    """Return the parameters run_analysis_job takes after the job id, from name to shards, or None."""
+    return db.fetch_one('''
+        SELECT name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase,
+               pipeline_depth, stream_phase2, fetch_mode, archive_mode, shards
+        FROM analysis_jobs 
+        WHERE id = ?
+    ''', (job_id,))
 
 def queue_worker():
-    """Worker thread that processes jobs from the queue."""
-    global queue_worker_running
+    """Worker thread that processes jobs from the queue; it waits for new jobs while the queue is empty.
     
+    A job that scans the chain plainly takes the queued jobs overlapping
+    its range along, and they are analyzed together by run_merged_jobs.
+    """
     app.logger.info("Queue worker thread started")
     
-    while queue_worker_running:
-        job = None
+    while True:
+        job_id, resume = job_queue.get()
+        job = load_queued_job(job_id)
+        if not job:
+            app.logger.warning(f"Queued job {job_id} no longer exists")
+            continue
         
-        with queue_lock:
-            if job_queue:
-                job = job_queue.pop(0)
-                app.logger.info(f"Processing job {job['job_id']} from queue. Remaining jobs: {len(job_queue)}")
+        group = [job_id]
+        if not resume and job[12] <= 1 and job[11] != 'read':
+            group += job_queue.take_overlapping(job[1], job[2], COALESCE_MAX_JOBS - 1)
         
-        if job:
-            try:
-                run_analysis_job(
-                    job['job_id'], job['name'], job['start_block'], job['end_block'],
-                    job['batch_size'], job['min_zeros'], job['min_inputs'],
-                    job['show_all_zeros'], job['exclude_coinbase']
-                )
-            except Exception as e:
-                app.logger.error(f"Error processing job {job['job_id']}: {e}")
-                # Update job status to failed
+        app.logger.info(f"Processing jobs {group} from queue. Remaining jobs: {len(job_queue)}")
+        try:
+            if len(group) > 1:
+                run_merged_jobs(group)
+            else:
+                run_analysis_job(job_id, *job, resume=resume)
+        except Exception as e:
+            app.logger.error(f"Error processing jobs {group}: {e}")
+            # Update job status to failed
+            for failed_id in group:
                 try:
-                    conn = sqlite3.connect(DB_PATH)
-                    cursor = conn.cursor()
-                    cursor.execute('''
+                    db.execute('''
                         UPDATE analysis_jobs 
                         SET status = 'failed', completed_at = CURRENT_TIMESTAMP, error_message = ?
                         WHERE id = ?
-                    ''', (f"Queue processing error: {str(e)}", job['job_id']))
-                    conn.commit()
-                    conn.close()
+                    ''', (f"Queue processing error: {str(e)}", failed_id))
                 except Exception as db_error:
-                    app.logger.error(f"Failed to update job {job['job_id']} status: {db_error}")
-        else:
-            # No jobs in queue, wait a bit
-            time.sleep(1)
-            
-            # Check if we should stop the worker (no jobs for a while)
-            with queue_lock:
-                if not job_queue:
-                    queue_worker_running = False
-                    app.logger.info("Queue worker stopping - no jobs in queue")
-                    break
-    
-    app.logger.info("Queue worker thread ended")
+                    app.logger.error(f"Failed to update job {failed_id} status: {db_error}")
 
 def get_queue_status():
-    """Get current queue status."""
+    """Get current queue status; jobs lists the first QUEUE_STATUS_LIMIT queued jobs in dispatch order."""
     with queue_lock:
-        return {
-            'queue_length': len(job_queue),
-            'jobs': [{
-                'job_id': job['job_id'],
-                'name': job['name'],
-                'start_block': job['start_block'],
-                'end_block': job['end_block']
-            } for job in job_queue],
-            'worker_running': queue_worker_running
-        }
+        workers = queue_workers
+    status = {
+        'queue_length': len(job_queue),
+        'jobs': [{
+            'job_id': job_id,
+            'name': name,
+            'start_block': start_block,
+            'end_block': end_block,
+            'priority': priority
+        } for job_id, name, start_block, end_block, priority in job_queue.peek(QUEUE_STATUS_LIMIT)],
+        'worker_running': workers > 0,
+        'workers': workers,
+        'max_workers': JOB_WORKERS
+    }
+    status['rpc_budget'] = rpc_budget.slots
+    status['running_jobs'] = running_job_statuses()
+    return status
+
+def running_job_statuses():
+    """Progress of every running queue job with its share of the RPC budget, oldest first."""
+    shares = rpc_budget.snapshot()
+    statuses = [dict(status) for status in progress_bus.snapshot()]
+    for status in statuses:
+        # A merged scan holds one share, registered under its first job
+        status['rpc'] = shares.get(status['merged_with'][0] if status.get('merged_with') else status['job_id'])
+    return statuses
+
+def job_progress(job_id):
+    """Progress of a running queue job with its RPC share, or None."""
+    return next((status for status in running_job_statuses() if status['job_id'] == job_id), None)
+
+def overall_status():
+    """Status for views that show a single analysis: whether any job runs, and the oldest running job's progress."""
+    jobs = running_job_statuses()
+    status = {'progress': 0, 'current_block': 0, 'total_blocks': 0, 'phase': None, 'blocks_processed': 0, 'phases': None}
+    if jobs:
+        status.update({key: jobs[0][key] for key in status})
+    status.update(running=bool(jobs), jobs=jobs,
+                  current_job_id=jobs[0]['job_id'] if jobs else None,
+                  current_job_name=jobs[0]['name'] if jobs else None)
+    return status
 
-def run_analysis_job(job_id, name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase):
-    """Run the analysis job in a separate thread."""
-    global analysis_status
+def follow_totals():
+    """Totals of the running follow jobs by job id; None for a job that has not finished its first step."""
+    with follow_lock:
+        return {str(job_id): (follow_status.get(job_id) or {}).get('totals') for job_id in follow_jobs}
+
+def job_states():
+    """Status and completion time by job id of the unfinished jobs and the most recently finished ones."""
+    rows = db.fetch_all('''
+        SELECT id, status, completed_at FROM analysis_jobs WHERE status IN ('pending', 'queued', 'running')
+        UNION ALL
+        SELECT * FROM (
+            SELECT id, status, completed_at FROM analysis_jobs WHERE status NOT IN ('pending', 'queued', 'running')
+            ORDER BY completed_at DESC LIMIT ?
+        )
+    ''', (JOB_EVENTS_FINISHED_LIMIT,))
+    return {str(job_id): {'status': status, 'completed_at': completed_at} for job_id, status, completed_at in rows}
+
+def publish_status_events():
+    event_hub.publish('status', overall_status())
+    event_hub.publish('queue', get_queue_status())
+    event_hub.publish('follow', follow_totals())
+    event_hub.publish('jobs', job_states())
+
+def publish_chain_events():
+    event_hub.publish('chain', get_blockchain_info() or {'error': 'Unable to connect to blockchain node'})
+
+def run_event_publisher(publish, interval):
+    """Publisher thread: offers publish()'s snapshots to event_hub every interval seconds while anyone is subscribed."""
+    while True:
+        event_hub.wait_for_subscribers()
+        try:
+            publish()
+        except Exception as e:
+            app.logger.error(f"Error publishing events: {e}")
+        time.sleep(interval)
+
+def start_event_publishers():
+    """Start the publisher threads on the first subscription; the chain has its own so a slow node does not hold up status."""
+    global event_publishers_started
+    
+    with event_publishers_lock:
+        if event_publishers_started:
+            return
+        event_publishers_started = True
+        threading.Thread(target=run_event_publisher, args=(publish_status_events, EVENT_INTERVAL), daemon=True).start()
+        threading.Thread(target=run_event_publisher, args=(publish_chain_events, CHAIN_INFO_INTERVAL), daemon=True).start()
+
+def store_job_results(job_id, result, output):
+    """Save an analysis result and the tail of its output to the job; returns the stored results data."""
+    app.logger.info(f"Job {job_id} completed successfully")
+    # The found transactions are in analysis_results already; sharded runs still return them
+    result = {key: value for key, value in result.items() if key not in ('special_transaction_details', 'zero_transaction_details')}
+    results_data = {
+        'output': output,
+        'return_code': 0,
+        'parsed': result
+    }
+    
+    # Update job as completed
+    try:
+        results_json = json.dumps(results_data)
+        app.logger.debug(f"Saving results for job {job_id}, JSON length: {len(results_json)}")
+        db.execute('''
+            UPDATE analysis_jobs 
+            SET status = 'completed', completed_at = CURRENT_TIMESTAMP, results = ?
+            WHERE id = ?
+        ''', (results_json, job_id))
+        app.logger.info(f"Job {job_id} results saved successfully")
+    except Exception as e:
+        app.logger.error(f"Failed to save results for job {job_id}: {e}")
+        db.execute('''
+            UPDATE analysis_jobs 
+            SET status = 'completed', completed_at = CURRENT_TIMESTAMP, error_message = ?
+            WHERE id = ?
+        ''', (f"Failed to save results: {str(e)}", job_id))
+    
+    return results_data
+
+def fail_job(job_id, error_msg):
+    """Mark a job as failed with error_msg."""
+    try:
+        db.execute('''
+            UPDATE analysis_jobs 
+            SET status = 'failed', completed_at = CURRENT_TIMESTAMP, error_message = ?
+            WHERE id = ?
+        ''', (error_msg, job_id))
+    except Exception as db_error:
+        app.logger.error(f"Failed to update job {job_id} status in database: {db_error}")
+
+def analysis_error(e, output):
+    return f"Exception during analysis: {str(e)}\n\n{traceback.format_exc()}\nLast output:\n{output.getvalue()}"
+
+def run_analysis_job(job_id, name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth=4, stream_phase2=False, fetch_mode='two-phase', archive_mode='off', shards=1, resume=False):
+    """Run the analysis job in the calling (queue worker) thread."""
+    output = OutputTail()
+    status = {
+        'job_id': job_id,
+        'name': name,
+        'start_block': start_block,
+        'end_block': end_block,
+        'progress': 0,
+        'current_block': start_block,
+        'total_blocks': end_block - start_block + 1,
+        'phase': 'starting',
+        'blocks_processed': 0,
+        'phases': None,
+        'start_time': datetime.now()
+    }
+    report_progress = progress_bus.open({job_id: status})
+    rpc_share = rpc_budget.register(job_id)
     
     try:
-        analysis_status['running'] = True
-        analysis_status['progress'] = 0
-        analysis_status['current_block'] = start_block
-        analysis_status['total_blocks'] = end_block - start_block + 1
-        analysis_status['start_time'] = datetime.now()
-        analysis_status['error'] = None
-        analysis_status['results'] = None
-        analysis_status['current_job_id'] = job_id
-        analysis_status['current_job_name'] = name
-        
         # Update job status to running
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
+        db.execute('''
             UPDATE analysis_jobs 
             SET status = 'running', started_at = CURRENT_TIMESTAMP
             WHERE id = ?
         ''', (job_id,))
-        conn.commit()
-        conn.close()
-        
-        # Build command arguments
-        cmd = [
-            sys.executable, 'final_analyzer_rpc.py',
-            '--start', str(start_block),
-            '--end', str(end_block),
-            '--batch-size', str(batch_size),
-            '--min-zeros', str(min_zeros),
-            '--min-inputs', str(min_inputs),
-            '--verbose'
-        ]
-        
-        if show_all_zeros:
-            cmd.append('--show-all-zeros')
-            
-        if exclude_coinbase:
-            cmd.append('--exclude-coinbase')
-        
-        # Log the command being executed
-        app.logger.info(f"Starting analysis job {job_id}: {' '.join(cmd)}")
-        app.logger.info(f"Job parameters - Name: {name}, Blocks: {start_block}-{end_block}, Batch: {batch_size}, Show zeros: {show_all_zeros}")
-        
-        # Run the analysis
-        app.logger.info(f"Executing analysis command for job {job_id}")
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd='/root/b1t-web-analyzer')
-        
-        app.logger.info(f"Analysis job {job_id} completed with return code: {result.returncode}")
-        
-        if result.returncode == 0:
-            app.logger.info(f"Job {job_id} completed successfully")
-            # Parse results and store in database
-            parsed_analysis = parse_analysis_output(result.stdout)
-            results_data = {
-                'output': result.stdout,
-                'stderr': result.stderr,
-                'return_code': result.returncode,
-                'parsed': parsed_analysis
-            }
-            
-            # Update job as completed
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            try:
-                results_json = json.dumps(results_data)
-                app.logger.debug(f"Saving results for job {job_id}, JSON length: {len(results_json)}")
-                app.logger.debug(f"Results JSON preview (first 200 chars): {results_json[:200]}...")
-                cursor.execute('''
-                    UPDATE analysis_jobs 
-                    SET status = 'completed', completed_at = CURRENT_TIMESTAMP, results = ?
-                    WHERE id = ?
-                ''', (results_json, job_id))
-                conn.commit()
-                app.logger.info(f"Job {job_id} results saved successfully")
-            except Exception as e:
-                app.logger.error(f"Failed to save results for job {job_id}: {e}")
-                cursor.execute('''
-                    UPDATE analysis_jobs 
-                    SET status = 'completed', completed_at = CURRENT_TIMESTAMP, error_message = ?
-                    WHERE id = ?
-                ''', (f"Failed to save results: {str(e)}", job_id))
-                conn.commit()
-            finally:
-                conn.close()
-            
-            analysis_status['results'] = results_data
-            app.logger.info(f"Job {job_id} results stored in database")
-        else:
-            # Handle error
-            error_msg = f"Analysis failed with return code {result.returncode}\nSTDOUT: {result.stdout}\nSTDERR: {result.stderr}"
-            app.logger.error(f"Job {job_id} failed: {error_msg}")
-            
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE analysis_jobs 
-                SET status = 'failed', completed_at = CURRENT_TIMESTAMP, error_message = ?
-                WHERE id = ?
-            ''', (error_msg, job_id))
-            conn.commit()
-            conn.close()
-            
-            analysis_status['error'] = error_msg
+        
+        options = analysis_options(batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth, stream_phase2, fetch_mode, archive_mode, resume)
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        if not resume:
+            remove_job_checkpoints(job_id)
+        
+        # Found transactions go to analysis_results as they are resolved; a resumed
+        # run reports those of its checkpoint again, so earlier rows are replaced
+        writer = ResultWriter(job_id, min_inputs)
+        writer.clear()
+        
+        app.logger.info(f"Job parameters - Name: {name}, Blocks: {start_block}-{end_block}, Batch: {batch_size}, Pipeline depth: {pipeline_depth}, Streaming: {stream_phase2}, Fetch mode: {fetch_mode}, Archive: {archive_mode}, Shards: {shards}, Show zeros: {show_all_zeros}")
+        
+        # Run the analysis; its printed progress is kept as the tail of the job output
+        app.logger.info(f"Starting analysis job {job_id}")
+        try:
+            with thread_stdout(output):
+                result = run_analysis(start_block, end_block, shards, chunk_memo=True, memo_path=os.path.join(ANALYZER_DIR, DEFAULT_MEMO_PATH),
+                                      checkpoint_path=job_checkpoint_path(job_id), progress=report_progress, events=writer, rpc_limiter=rpc_share, **options)
+        finally:
+            writer.close()
+        
+        app.logger.info(f"Analysis job {job_id} completed, {writer.written} transactions stored")
+        store_job_results(job_id, result, output.getvalue())
+        # Runs that the memo covered on a resume leave their checkpoints behind
+        remove_job_checkpoints(job_id)
             
     except Exception as e:
-        error_msg = f"Exception during analysis: {str(e)}"
-        app.logger.error(f"Job {job_id} failed with exception: {error_msg}")
-        analysis_status['error'] = error_msg
+        error_msg = analysis_error(e, output)
+        app.logger.error(f"Job {job_id} failed with exception: {e}")
+        fail_job(job_id, error_msg)
+    
+    finally:
+        rpc_share.close()
+        report_progress.close()
+
+def run_merged_jobs(job_ids):
+    """Run overlapping queued jobs as one scan of the union of their ranges, in the calling (queue worker) thread.
+    
+    Every job keeps its own filters, results and status; the scan uses the
+    first job's batch size, pipeline depth, streaming and fetch mode, and
+    the progress it reports is that of the whole union.
+    """
+    jobs = [(job_id, load_queued_job(job_id)) for job_id in job_ids]
+    jobs = [(job_id, job) for job_id, job in jobs if job]
+    job_ids = [job_id for job_id, _ in jobs]
+    first = min(job[1] for _, job in jobs)
+    last = max(job[2] for _, job in jobs)
+    output = OutputTail()
+    statuses = {}
+    for job_id, job in jobs:
+        statuses[job_id] = {
+            'job_id': job_id,
+            'name': job[0],
+            'start_block': job[1],
+            'end_block': job[2],
+            'progress': 0,
+            'current_block': first,
+            'total_blocks': last - first + 1,
+            'phase': 'starting',
+            'blocks_processed': 0,
+            'phases': None,
+            'start_time': datetime.now(),
+            'merged_with': job_ids
+        }
+    report_progress = progress_bus.open(statuses)
+    rpc_share = rpc_budget.register(job_ids[0])
+    writers = {}
+    
+    try:
+        db.executemany('''
+            UPDATE analysis_jobs 
+            SET status = 'running', started_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', [(job_id,) for job_id in job_ids])
+        
+        leader = jobs[0][1]
+        archive_mode = 'write' if any(job[11] == 'write' for _, job in jobs) else 'off'
+        options = analysis_options(*leader[3:11], archive_mode)
+        
+        specs = {}
+        for job_id, job in jobs:
+            writers[job_id] = ResultWriter(job_id, job[5])
+            writers[job_id].clear()
+            specs[job_id] = {
+                'start_block': job[1],
+                'end_block': job[2],
+                'min_zeros': job[4],
+                'min_inputs': job[5],
+                'show_all_zeros': bool(job[6]),
+                'exclude_coinbase': bool(job[7]),
+                'events': writers[job_id]
+            }
         
-        # Update job status to failed
+        app.logger.info(f"Starting merged scan of blocks {first}-{last} for jobs {job_ids}")
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE analysis_jobs 
-                SET status = 'failed', completed_at = CURRENT_TIMESTAMP, error_message = ?
-                WHERE id = ?
-            ''', (error_msg, job_id))
-            conn.commit()
-            conn.close()
-        except Exception as db_error:
-            app.logger.error(f"Failed to update job {job_id} status in database: {db_error}")
+            with thread_stdout(output):
+                results = run_merged_analysis(specs, chunk_memo=True, memo_path=os.path.join(ANALYZER_DIR, DEFAULT_MEMO_PATH),
+                                              progress=report_progress, rpc_limiter=rpc_share, **options)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        
+        for job_id in job_ids:
+            result = dict(results[job_id], merged_with=[other for other in job_ids if other != job_id])
+            app.logger.info(f"Analysis job {job_id} completed in merged scan, {writers[job_id].written} transactions stored")
+            store_job_results(job_id, result, output.getvalue())
+    
+    except Exception as e:
+        error_msg = analysis_error(e, output)
+        app.logger.error(f"Merged jobs {job_ids} failed with exception: {e}")
+        for job_id in job_ids:
+            fail_job(job_id, error_msg)
+    
+    finally:
+        rpc_share.close()
+        report_progress.close()
+
+def start_follow_job(job_id, name, start_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth=4, fetch_mode='two-phase'):
+    """Start a follow job in its own thread; it runs until stopped and does not hold up the queue."""
+    stop = threading.Event()
+    with follow_lock:
+        follow_jobs[job_id] = stop
+    thread = threading.Thread(target=run_follow_job, daemon=True,
+                              args=(job_id, name, start_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth, fetch_mode, stop))
+    thread.start()
+    app.logger.info(f"Follow job {job_id} ({name}) started from block {start_block}")
+
+def run_follow_job(job_id, name, start_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth=4, fetch_mode='two-phase', stop=None):
+    """Follow the chain tip until the stop event is set, then store the totals as the job results."""
+    output = OutputTail()
+    writer = None
+    rpc_share = rpc_budget.register(job_id)
+    
+    def report_progress(status):
+        # Steps report their own phases too; the page shows the latest totals
+        if status.get('totals'):
+            with follow_lock:
+                follow_status[job_id] = status
+    
+    try:
+        db.execute('''
+            UPDATE analysis_jobs 
+            SET status = 'running', started_at = CURRENT_TIMESTAMP, error_message = NULL, completed_at = NULL
+            WHERE id = ?
+        ''', (job_id,))
+        
+        options = analysis_options(batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth, fetch_mode=fetch_mode)
+        options['verbose'] = False
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        
+        # A resumed follow job keeps the rows up to the tip of its saved state
+        writer = ResultWriter(job_id, min_inputs)
+        writer.clear(load_follow_state_tip(job_id))
+        
+        app.logger.info(f"Starting follow job {job_id} from block {start_block}")
+        with thread_stdout(output):
+            result = run_analysis(start_block, follow=True, follow_state=job_follow_state_path(job_id), stop=stop, progress=report_progress, events=writer, rpc_limiter=rpc_share, **options)
+        
+        app.logger.info(f"Follow job {job_id} stopped at block {result['follow']['tip']}")
+        store_job_results(job_id, result, output.getvalue())
+        
+        # The range of a follow job grows with the chain
+        db.execute('UPDATE analysis_jobs SET end_block = ? WHERE id = ?', (result['follow']['tip'], job_id))
+    
+    except Exception as e:
+        error_msg = analysis_error(e, output)
+        app.logger.error(f"Follow job {job_id} failed with exception: {e}")
+        fail_job(job_id, error_msg)
     
     finally:
-        analysis_status['running'] = False
-        analysis_status['progress'] = 100
-        analysis_status['current_job_id'] = None
-        analysis_status['current_job_name'] = None
+        rpc_share.close()
+        if writer:
+            writer.close()
+        with follow_lock:
+            follow_jobs.pop(job_id, None)
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Hand the request thread's database connection back to the pool."""
+    db.release_connection()
 
 @app.route('/')
 def index():
     """Main dashboard page."""
     # Get recent jobs
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT id, name, start_block, end_block, status, created_at, completed_at
-        FROM analysis_jobs 
-        ORDER BY created_at DESC 
-        LIMIT 10
-    ''')
-    recent_jobs = cursor.fetchall()
-    conn.close()
+    recent_jobs = db.fetch_all(JOB_LIST_QUERY, (10,))
     
-    return render_template('index.html', recent_jobs=recent_jobs, analysis_status=analysis_status)
+    return render_template('index.html', recent_jobs=recent_jobs, analysis_status=overall_status())
 
 @app.route('/new_job')
 def new_job():
@@ -588,17 +1031,43 @@ def submit_job():
         batch_size = int(request.form.get('batch_size', 1000))
         min_zeros = int(request.form.get('min_zeros', 2))
         min_inputs = int(request.form.get('min_inputs', 1))
+        pipeline_depth = int(request.form.get('pipeline_depth', 4))
+        shards = int(request.form.get('shards', 1))
+        priority = int(request.form.get('priority', DEFAULT_PRIORITY))
 
         show_all_zeros = 'show_all_zeros' in request.form
         exclude_coinbase = 'exclude_coinbase' in request.form
+        stream_phase2 = 'stream_phase2' in request.form
+        follow = 'follow' in request.form
+        fetch_mode = request.form.get('fetch_mode', 'two-phase')
+        archive_mode = request.form.get('archive_mode', 'off')
         
-        if start_block >= end_block:
+        if follow:
+            # A follow job has no fixed end; end_block records how far it got
+            end_block = start_block
+        elif start_block >= end_block:
             flash('Start block must be less than end block', 'error')
             return redirect(url_for('new_job'))
         
+        if pipeline_depth < 1:
+            flash('Pipeline depth must be at least 1', 'error')
+            return redirect(url_for('new_job'))
+        
+        if shards < 1:
+            flash('Shards must be at least 1', 'error')
+            return redirect(url_for('new_job'))
+        
+        if fetch_mode not in FETCH_MODES:
+            flash(f'Unknown fetch mode: {fetch_mode}', 'error')
+            return redirect(url_for('new_job'))
+        
+        if archive_mode not in ARCHIVE_MODES:
+            flash(f'Unknown archive mode: {archive_mode}', 'error')
+            return redirect(url_for('new_job'))
+        
         # Insert job into database
-        app.logger.info(f"Connecting to database: {DB_PATH}")
-        conn = sqlite3.connect(DB_PATH)
+        app.logger.info(f"Connecting to database: {db.DB_PATH}")
+        conn = db.get_connection()
         cursor = conn.cursor()
         
         # Check if database and table exist
@@ -616,27 +1085,30 @@ def submit_job():
                 min_inputs_exists = any('min_inputs' in str(col) for col in columns)
                 app.logger.info(f"min_inputs column exists: {min_inputs_exists}")
             
-            app.logger.info(f"Attempting to insert job with values: name={name}, start_block={start_block}, end_block={end_block}, batch_size={batch_size}, min_zeros={min_zeros}, min_inputs={min_inputs}, show_all_zeros={show_all_zeros}, exclude_coinbase={exclude_coinbase}")
+            app.logger.info(f"Attempting to insert job with values: name={name}, start_block={start_block}, end_block={end_block}, batch_size={batch_size}, min_zeros={min_zeros}, min_inputs={min_inputs}, show_all_zeros={show_all_zeros}, exclude_coinbase={exclude_coinbase}, pipeline_depth={pipeline_depth}, stream_phase2={stream_phase2}, fetch_mode={fetch_mode}, archive_mode={archive_mode}, shards={shards}, follow={follow}, priority={priority}")
             
             cursor.execute('''
-                INSERT INTO analysis_jobs (name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase))
+                INSERT INTO analysis_jobs (name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth, stream_phase2, fetch_mode, archive_mode, shards, follow, priority)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth, stream_phase2, fetch_mode, archive_mode, shards, follow, priority))
             job_id = cursor.lastrowid
             conn.commit()
             app.logger.info(f"Successfully inserted job with ID: {job_id}")
             
         except Exception as e:
             app.logger.error(f"Database error: {str(e)}")
-            app.logger.error(f"Database path: {DB_PATH}")
+            app.logger.error(f"Database path: {db.DB_PATH}")
             conn.rollback()
             flash(f'Error submitting job: {str(e)}', 'error')
             return redirect(url_for('new_job'))
-        finally:
-            conn.close()
+        
+        if follow:
+            start_follow_job(job_id, name, start_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase, pipeline_depth, fetch_mode)
+            flash(f'Follow job "{name}" started; it analyzes new blocks until you stop it', 'success')
+            return redirect(url_for('job_detail', job_id=job_id))
         
         # Add job to queue instead of starting immediately
-        add_job_to_queue(job_id, name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase)
+        add_job_to_queue(job_id, name, priority)
         
         flash(f'Analysis job "{name}" added to queue successfully!', 'success')
         return redirect(url_for('index'))
@@ -650,16 +1122,12 @@ def job_detail(job_id):
     """Job detail page."""
     app.logger.info(f"Viewing job detail for job ID: {job_id}")
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
+    job = db.fetch_one('''
         SELECT id, name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros,
-               status, created_at, started_at, completed_at, results, error_message
+               status, created_at, started_at, completed_at, results, error_message, pipeline_depth, stream_phase2, fetch_mode, archive_mode, shards, follow
         FROM analysis_jobs 
         WHERE id = ?
     ''', (job_id,))
-    job = cursor.fetchone()
-    conn.close()
     
     if not job:
         app.logger.warning(f"Job with ID {job_id} not found")
@@ -668,34 +1136,159 @@ def job_detail(job_id):
     
     app.logger.info(f"Job {job_id} status: {job[8]}, created: {job[9]}")
     
-    # Parse results if available
+    # The results column holds the summary; the found transactions are paged in from /api/job/<id>/transactions
     results = None
-    app.logger.debug(f"Job {job_id} results column type: {type(job[12])}, value: {repr(job[12])[:200]}...")
-    
     if job[12] and job[12].strip():  # results column - check for non-empty string
-        app.logger.debug(f"Attempting to parse JSON for job {job_id}")
         try:
             results = json.loads(job[12])
-            app.logger.info(f"Job {job_id} has results with {len(results)} entries")
         except json.JSONDecodeError as e:
             app.logger.error(f"JSON decode error for job {job_id}: {e}")
-            app.logger.error(f"Raw results data (first 200 chars): {repr(job[12][:200])}")
         except Exception as e:
             app.logger.error(f"Unexpected error parsing results for job {job_id}: {e}")
-            app.logger.error(f"Raw results data (first 200 chars): {repr(job[12][:200])}")
     
     # Log error message if present
     if job[13]:  # error_message column
         app.logger.error(f"Job {job_id} has error: {job[13]}")
     
-    return render_template('job_detail.html', job=job, results=results, analysis_status=analysis_status)
+    return render_template('job_detail.html', job=job, results=results, progress=job_progress(job_id),
+                           checkpoint=load_job_checkpoint(job_id), follow_status=load_follow_status(job_id) if job[19] else None)
+
+@app.route('/api/job/<int:job_id>/transactions')
+def api_job_transactions(job_id):
+    """API endpoint for one page of a job's found transactions.
+    
+    Query parameters: kind (special or all), sort (block or zeros), order
+    (asc or desc), limit, cursor (next_cursor of the previous page) and the
+    filters min_zeros, max_zeros, min_inputs, from_block, to_block and
+    coinbase (exclude or only).
+    """
+    kind = request.args.get('kind', 'special')
+    sort = request.args.get('sort', 'block')
+    order = request.args.get('order', 'desc')
+    if kind not in ('special', 'all') or sort not in TRANSACTION_SORTS or order not in ('asc', 'desc'):
+        return jsonify({'error': 'kind must be special or all, sort block or zeros, order asc or desc'}), 400
+    
+    try:
+        limit = min(max(int(request.args.get('limit', TRANSACTION_PAGE_SIZE)), 1), MAX_TRANSACTION_PAGE_SIZE)
+        filters = [(condition, int(request.args[name])) for name, condition in TRANSACTION_FILTERS.items() if request.args.get(name)]
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    coinbase = request.args.get('coinbase')
+    if coinbase == 'exclude':
+        filters.append(('NOT is_coinbase',))
+    elif coinbase == 'only':
+        filters.append(('is_coinbase',))
+    
+    transactions, next_cursor = load_transaction_page(db.get_connection().cursor(), job_id, kind == 'special', sort, order == 'desc', limit, after, filters)
+    
+    return jsonify({'job_id': job_id, 'transactions': transactions, 'next_cursor': next_cursor})
+
+@app.route('/job/<int:job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """Re-queue a failed job; the analyzer continues from its last checkpoint."""
+    job = db.fetch_one('''
+        SELECT name, start_block, end_block, batch_size, min_zeros, min_inputs, show_all_zeros, exclude_coinbase,
+               pipeline_depth, stream_phase2, fetch_mode, archive_mode, shards, status, follow, priority
+        FROM analysis_jobs 
+        WHERE id = ?
+    ''', (job_id,))
+    
+    if not job:
+        flash('Job not found', 'error')
+        return redirect(url_for('index'))
+    
+    if job[13] != 'failed':
+        flash('Only failed jobs can be resumed', 'error')
+        return redirect(url_for('job_detail', job_id=job_id))
+    
+    db.execute('''
+        UPDATE analysis_jobs 
+        SET error_message = NULL, completed_at = NULL
+        WHERE id = ?
+    ''', (job_id,))
+    
+    if job[14]:
+        # The follow state saved by the analyzer lets it continue where it stopped
+        start_follow_job(job_id, job[0], job[1], job[3], job[4], job[5], job[6], job[7], job[8], job[10])
+        flash(f'Follow job "{job[0]}" resumed', 'success')
+        return redirect(url_for('job_detail', job_id=job_id))
+    
+    checkpoint = load_job_checkpoint(job_id)
+    if checkpoint:
+        app.logger.info(f"Resuming job {job_id} from checkpoint: {checkpoint['phase']} at block {checkpoint['next_height']}")
+    add_job_to_queue(job_id, job[0], job[15], resume=True)
+    
+    flash(f'Analysis job "{job[0]}" resumed from its last checkpoint' if checkpoint else f'Analysis job "{job[0]}" restarted (no checkpoint saved)', 'success')
+    return redirect(url_for('index'))
+
+@app.route('/job/<int:job_id>/stop', methods=['POST'])
+def stop_job(job_id):
+    """Stop a running follow job; the analyzer stores its totals as the job results."""
+    with follow_lock:
+        stop = follow_jobs.get(job_id)
+    if stop is None:
+        flash('This job is not a running follow job', 'error')
+    else:
+        stop.set()
+        flash('Follow job is stopping, its results will appear shortly', 'success')
+    return redirect(url_for('job_detail', job_id=job_id))
+
+@app.route('/api/job/<int:job_id>/follow')
+def api_follow_status(job_id):
+    """API endpoint for the live totals of a follow job."""
+    with follow_lock:
+        running = job_id in follow_jobs
+    return jsonify({'running': running, 'status': load_follow_status(job_id)})
 
 # RPC configuration removed - settings are managed via .env file
 
 @app.route('/api/status')
 def api_status():
     """API endpoint for getting analysis status."""
-    return jsonify(analysis_status)
+    return jsonify(overall_status())
+
+@app.route('/api/job/<int:job_id>/status')
+def api_job_status(job_id):
+    """API endpoint for the progress of one queue job; running is false once it has finished."""
+    progress = job_progress(job_id)
+    return jsonify(dict(progress, running=True) if progress else {'job_id': job_id, 'running': False})
+
+@app.route('/api/events')
+def api_events():
+    """Server-Sent Events stream of status, queue, chain and follow updates.
+    
+    Each SSE event is named after its topic and carries the topic's new
+    value as JSON; a topic is only sent when it has changed. The first
+    events after connecting hold the current value of every topic. The
+    optional topics parameter is a comma-separated subset of EVENT_TOPICS.
+    """
+    topics = set(request.args.get('topics', ','.join(EVENT_TOPICS)).split(','))
+    if not topics <= set(EVENT_TOPICS):
+        return jsonify({'error': f"topics must be among {', '.join(EVENT_TOPICS)}"}), 400
+    
+    def stream():
+        event_hub.subscribe()
+        try:
+            version = 0
+            yield 'retry: 5000\n\n'
+            last_sent = time.monotonic()
+            while True:
+                version, changes = event_hub.changes(version, EVENT_KEEPALIVE)
+                sent = ''.join(f'event: {topic}\ndata: {text}\n\n' for topic, text in changes.items() if topic in topics)
+                if sent:
+                    yield sent
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= EVENT_KEEPALIVE:
+                    # A comment keeps proxies from closing the quiet connection and lets a gone client be noticed
+                    yield ': keep-alive\n\n'
+                    last_sent = time.monotonic()
+        finally:
+            event_hub.unsubscribe()
+    
+    start_event_publishers()
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/blockchain_info')
 def api_blockchain_info():
@@ -708,38 +1301,8 @@ def api_blockchain_info():
 
 @app.route('/api/analysis_status')
 def api_analysis_status():
-    """API endpoint for getting current analysis status."""
-    # Try to read status from file first
-    try:
-        with open('/tmp/b1t_analysis_status.json', 'r') as f:
-            file_status = json.load(f)
-            
-        # Check if status is recent (within last 30 seconds)
-        if time.time() - file_status.get('timestamp', 0) < 30:
-            return jsonify({
-                'running': analysis_status['running'],
-                'progress': file_status.get('progress', 0),
-                'current_block': file_status.get('current_block', 0),
-                'total_blocks': file_status.get('total_blocks', 0),
-                'phase': file_status.get('phase', 'unknown'),
-                'blocks_processed': file_status.get('blocks_processed', 0),
-                'current_job_id': analysis_status.get('current_job_id'),
-                'current_job_name': analysis_status.get('current_job_name')
-            })
-    except (FileNotFoundError, json.JSONDecodeError, KeyError):
-        pass
-    
-    # Fallback to in-memory status
-    return jsonify({
-        'running': analysis_status['running'],
-        'progress': analysis_status['progress'],
-        'current_block': analysis_status['current_block'],
-        'total_blocks': analysis_status['total_blocks'],
-        'phase': 'unknown',
-        'blocks_processed': 0,
-        'current_job_id': analysis_status.get('current_job_id'),
-        'current_job_name': analysis_status.get('current_job_name')
-    })
+    """API endpoint for getting current analysis status; jobs lists every running job."""
+    return jsonify(overall_status())
 
 @app.route('/api/queue_status')
 def api_queue_status():
@@ -753,7 +1316,7 @@ def api_delete_all_jobs():
     app.logger.info("Request to delete all jobs received")
     
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = db.get_connection()
         cursor = conn.cursor()
         
         # Count existing jobs before deletion
@@ -765,11 +1328,19 @@ def api_delete_all_jobs():
         
         app.logger.info(f"Deleting {job_count} jobs and {result_count} results")
         
+        # Checkpoints and follow states of the deleted jobs
+        cursor.execute('SELECT id FROM analysis_jobs')
+        for (job_id,) in cursor.fetchall():
+            remove_job_checkpoints(job_id)
+            if os.path.exists(job_follow_state_path(job_id)):
+                os.remove(job_follow_state_path(job_id))
+        
         # Delete all analysis results first (foreign key constraint)
         cursor.execute('DELETE FROM analysis_results')
         app.logger.info("Deleted all analysis results")
         
-        # Delete all analysis jobs
+        # Delete all analysis jobs and empty the queue
+        cursor.execute('DELETE FROM job_queue')
         cursor.execute('DELETE FROM analysis_jobs')
         app.logger.info("Deleted all analysis jobs")
         
@@ -779,26 +1350,18 @@ def api_delete_all_jobs():
         app.logger.info("Reset auto-increment counters")
         
         conn.commit()
-        conn.close()
         
         app.logger.info(f"Successfully deleted all {job_count} jobs and {result_count} results")
         return jsonify({'success': True, 'message': f'All {job_count} jobs deleted successfully'})
     except Exception as e:
         app.logger.error(f"Error deleting all jobs: {e}")
+        db.get_connection().rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/jobs')
 def jobs_list():
     """List all jobs page."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT id, name, start_block, end_block, status, created_at, completed_at
-        FROM analysis_jobs 
-        ORDER BY created_at DESC
-    ''')
-    jobs = cursor.fetchall()
-    conn.close()
+    jobs = db.fetch_all(JOB_LIST_QUERY, (-1,))
     
     return render_template('jobs_list.html', jobs=jobs)
 
@@ -806,5 +1369,10 @@ if __name__ == '__main__':
     # Initialize database
     init_database()
     
+    # With the reloader the app is served by a child process; only that one works the queue
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        recover_queued_jobs()
+        recover_follow_jobs()
+    
     # Run Flask app
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Asyncio JSON-RPC client for the B1T node.
+
+AsyncB1TRPCClient has the same call()/batch_call() interface as
+B1TRPCClient, but its methods are coroutines and share a bounded pool of
+persistent HTTP/1.1 connections, so many batch requests can be in flight
+from a single thread. AsyncRPCBridge runs such a client on a background
+event loop and exposes blocking call()/batch_call() plus submit() for
+coroutines, which is how the analyzer uses it.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from rpc_batching import HTTP_FAILURE, batch_payload, count_reply_bytes, failure_budget, is_retryable, parse_batch_reply
+
+# Load environment variables
+load_dotenv()
+
+
+class RPCConnection:
+    """One keep-alive HTTP/1.1 connection to the node."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+
+    async def request(self, host_header, headers, body):
+        head = ['POST / HTTP/1.1', f'Host: {host_header}', f'Content-Length: {len(body)}']
+        head.extend(f'{name}: {value}' for name, value in headers.items())
+        self.writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by node')
+        version, status = status_line.split(None, 2)[:2]
+        status = int(status)
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            payload = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            payload = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            payload = await self.reader.read()
+            self.reusable = False
+
+        connection_header = response_headers.get('connection', '').lower()
+        if connection_header == 'close' or (version == b'HTTP/1.0' and connection_header != 'keep-alive'):
+            self.reusable = False
+        return status, payload
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+
+class AsyncB1TRPCClient:
+    def __init__(self, max_connections=None, max_in_flight=None):
+        self.host = os.getenv('B1T_RPC_HOST', '127.0.0.1')
+        self.port = int(os.getenv('B1T_RPC_PORT', 8332))
+        self.user = os.getenv('B1T_RPC_USER')
+        self.password = os.getenv('B1T_RPC_PASS')
+        self.timeout = int(os.getenv('B1T_RPC_TIMEOUT', 30))
+        self.max_retries = int(os.getenv('B1T_RPC_MAX_RETRIES', 3))
+        self.retry_delay = float(os.getenv('B1T_RPC_RETRY_DELAY', 1.0))
+        self.max_connections = max_connections or int(os.getenv('B1T_RPC_MAX_CONNECTIONS', 8))
+        self.max_in_flight = max_in_flight or int(os.getenv('B1T_RPC_MAX_IN_FLIGHT', 32))
+
+        self.url = f'http://{self.host}:{self.port}'
+        self.headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if self.user is not None or self.password is not None:
+            credentials = f'{self.user or ""}:{self.password or ""}'.encode()
+            self.headers['Authorization'] = 'Basic ' + base64.b64encode(credentials).decode()
+
+        self._idle = []
+        self._open = 0
+        # Created lazily so they bind to the loop the client is used on
+        self._pool_condition = None
+        self._in_flight = None
+        self.connections_opened = 0
+
+        print(f"Async RPC Client initialized: {self.url} ({self.max_connections} connections, {self.max_in_flight} requests in flight)")
+
+    def _primitives(self):
+        if self._pool_condition is None:
+            self._pool_condition = asyncio.Condition()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self._pool_condition, self._in_flight
+
+    async def _acquire(self):
+        pool_condition, _ = self._primitives()
+        async with pool_condition:
+            while not self._idle and self._open >= self.max_connections:
+                await pool_condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+        try:
+            target = urlsplit(self.url)
+            reader, writer = await asyncio.open_connection(target.hostname, target.port)
+        except BaseException:
+            async with pool_condition:
+                self._open -= 1
+                pool_condition.notify()
+            raise
+        self.connections_opened += 1
+        return RPCConnection(reader, writer)
+
+    async def _release(self, connection):
+        pool_condition, _ = self._primitives()
+        async with pool_condition:
+            if connection.reusable:
+                self._idle.append(connection)
+            else:
+                connection.close()
+                self._open -= 1
+            pool_condition.notify()
+
+    async def _post(self, payload):
+        """POST a JSON payload on a pooled connection and return the decoded reply."""
+        _, in_flight = self._primitives()
+        body = json.dumps(payload).encode()
+        async with in_flight:
+            connection = await self._acquire()
+            try:
+                status, reply = await asyncio.wait_for(
+                    connection.request(f'{self.host}:{self.port}', self.headers, body), self.timeout)
+            except BaseException:
+                # A half-read response leaves the connection unusable
+                connection.reusable = False
+                raise
+            finally:
+                await self._release(connection)
+        if status >= 400:
+            raise Exception(f"HTTP Error: {status}")
+        count_reply_bytes(len(reply))
+        return json.loads(reply)
+
+    async def call(self, method, params=None):
+        """Make a single RPC call"""
+        if params is None:
+            params = []
+
+        payload = {
+            'jsonrpc': '2.0',
+            'method': method,
+            'params': params,
+            'id': 1
+        }
+
+        for attempt in range(self.max_retries):
+            try:
+                result = await self._post(payload)
+                if 'error' in result and result['error']:
+                    raise Exception(f"RPC Error: {result['error']}")
+
+                return result.get('result')
+
+            except Exception as e:
+                if attempt < self.max_retries - 1:
+                    print(f"RPC call failed (attempt {attempt + 1}): {e}. Retrying...")
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    print(f"RPC call failed after {self.max_retries} attempts: {e}")
+                    return None
+
+    async def batch_call(self, calls):
+        """Make multiple RPC calls in a single batch request
+
+        Failed batches are bisected and transient per-call errors retried
+        one by one, concurrently, as in B1TRPCClient.batch_call().
+        """
+        if not calls:
+            return []
+
+        budget = {'failures': 0, 'limit': failure_budget(len(calls), self.max_retries)}
+        replies = await self._send_batch(calls, budget)
+
+        async def settle(method, params, result, error):
+            return await self.call(method, params) if is_retryable(error) else result
+
+        return await asyncio.gather(*(settle(method, params, result, error)
+                                      for (method, params), (result, error) in zip(calls, replies)))
+
+    async def _send_batch(self, calls, budget):
+        if budget['failures'] >= budget['limit']:
+            return [(None, HTTP_FAILURE)] * len(calls)
+
+        try:
+            replies = await self._post(batch_payload(calls))
+        except Exception as e:
+            budget['failures'] += 1
+            action = 'Splitting' if len(calls) > 1 else 'Retrying'
+            print(f"Batch RPC call of {len(calls)} requests failed: {e!r}. {action}...")
+            await asyncio.sleep(self.retry_delay)
+            if len(calls) == 1:
+                replies = await self._send_batch(calls, budget)
+                if replies[0][1] is HTTP_FAILURE:
+                    # One bad call must not sink its neighbours; if the next request fails too, the node is down
+                    budget['failures'] = budget['limit'] - 1
+                return replies
+            middle = len(calls) // 2
+            return await self._send_batch(calls[:middle], budget) + await self._send_batch(calls[middle:], budget)
+
+        budget['failures'] = 0
+        return parse_batch_reply(replies, len(calls))
+
+    async def close(self):
+        pool_condition, _ = self._primitives()
+        async with pool_condition:
+            for connection in self._idle:
+                connection.close()
+            self._open -= len(self._idle)
+            self._idle = []
+
+
+class AsyncRPCBridge:
+    """Drives an AsyncB1TRPCClient on a background event loop thread.
+
+    call() and batch_call() block the calling thread like B1TRPCClient, while
+    submit() schedules any coroutine on the loop and returns a
+    concurrent.futures.Future, so callers can keep many requests in flight.
+    """
+
+    def __init__(self, max_connections=None, max_in_flight=None):
+        self.client = AsyncB1TRPCClient(max_connections, max_in_flight)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='async-rpc', daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, method, params=None):
+        return self.submit(self.client.call(method, params)).result()
+
+    def batch_call(self, calls):
+        return self.submit(self.client.batch_call(calls)).result()
+
+    def close(self):
+        self.submit(self.client.close()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
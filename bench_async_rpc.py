@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compare B1TRPCClient and AsyncB1TRPCClient against the local stub node.
+
+Starts stub_rpc_node in-process with an artificial per-request latency,
+issues the same getblockhash batches through both clients and checks that
+they return identical results.
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_rpc_node import StubChain, serve
+
+
+def run_sync(batches, concurrency):
+    from final_analyzer_rpc import B1TRPCClient
+    rpc = B1TRPCClient()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(rpc.batch_call, batches))
+
+
+async def run_async(batches, concurrency):
+    from async_rpc import AsyncB1TRPCClient
+    client = AsyncB1TRPCClient(max_in_flight=concurrency)
+    try:
+        return await asyncio.gather(*(client.batch_call(calls) for calls in batches))
+    finally:
+        print(f"  async client opened {client.connections_opened} connections")
+        await client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the sync and asyncio RPC clients against a stub node')
+    parser.add_argument('--batches', type=int, default=200, help='Number of batch requests (default: 200)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Calls per batch request (default: 100)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight (default: 32)')
+    parser.add_argument('--latency', type=float, default=0.02, help='Stub latency per request in seconds (default: 0.02)')
+    args = parser.parse_args()
+
+    chain = StubChain(args.batches * args.batch_size)
+    server = serve(0, chain, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['B1T_RPC_HOST'] = '127.0.0.1'
+    os.environ['B1T_RPC_PORT'] = str(server.server_address[1])
+
+    batches = [[('getblockhash', [height]) for height in range(start, start + args.batch_size)]
+               for start in range(0, args.batches * args.batch_size, args.batch_size)]
+    print(f"{args.batches} batches of {args.batch_size} calls, {args.concurrency} in flight, {args.latency * 1000:.0f} ms latency")
+
+    start = time.perf_counter()
+    expected = run_sync(batches, args.concurrency)
+    sync_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = asyncio.run(run_async(batches, args.concurrency))
+    async_time = time.perf_counter() - start
+    server.shutdown()
+
+    if results != expected:
+        raise SystemExit("Async client results differ from B1TRPCClient")
+
+    print(f"  {f'B1TRPCClient ({args.concurrency} threads):':34}{sync_time:6.2f}s")
+    print(f"  {'AsyncB1TRPCClient (1 thread):':34}{async_time:6.2f}s")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the dashboard pages that read the job database.
+
+Seeds a scratch database with completed jobs and their found transactions,
+then times GET / and GET /jobs through the Flask test client from several
+reader threads, first on an idle database and then while a writer thread
+bulk-inserts analysis_results rows the way a running job does. Prints the
+mean, median, 95th percentile and maximum latency per page.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(path, num_jobs, rows_per_job):
+    conn = sqlite3.connect(path)
+    summary = json.dumps({'output': 'x' * 2000, 'return_code': 0, 'parsed': {'blocks_analyzed': 1000, 'special_transactions': rows_per_job}})
+    conn.executemany('''
+        INSERT INTO analysis_jobs (name, start_block, end_block, status, started_at, completed_at, results)
+        VALUES (?, ?, ?, 'completed', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?)
+    ''', [(f'job {i}', i * 1000, i * 1000 + 999, summary) for i in range(num_jobs)])
+    conn.executemany('''
+        INSERT INTO analysis_results (job_id, block_number, transaction_hash, leading_zeros, num_inputs, num_outputs, is_coinbase, is_special)
+        VALUES (?, ?, ?, 3, 2, 1, 0, 1)
+    ''', [(job_id, job_id * 1000 + i, os.urandom(32).hex()) for job_id in range(1, num_jobs + 1) for i in range(rows_per_job)])
+    conn.commit()
+    conn.close()
+
+
+def write_results(stop, batch_rows):
+    """Insert batches of found transactions in one transaction each, like ResultWriter."""
+    conn = sqlite3.connect('analyzer.db', timeout=30)
+    batches = 0
+    while not stop.is_set():
+        rows = [(0, i, os.urandom(32).hex()) for i in range(batch_rows)]
+        with conn:
+            conn.executemany('''
+                INSERT INTO analysis_results (job_id, block_number, transaction_hash, leading_zeros, num_inputs, num_outputs, is_coinbase, is_special)
+                VALUES (?, ?, ?, 3, 2, 1, 0, 1)
+            ''', rows)
+            conn.execute("UPDATE analysis_jobs SET status = 'running' WHERE id = 1")
+        batches += 1
+    conn.close()
+    return batches
+
+
+def time_pages(client, pages, requests_per_thread, threads):
+    latencies = {page: [] for page in pages}
+    lock = threading.Lock()
+
+    def reader():
+        for _ in range(requests_per_thread):
+            for page in pages:
+                start = time.perf_counter()
+                response = client.get(page)
+                elapsed = time.perf_counter() - start
+                assert response.status_code == 200, (page, response.status_code)
+                with lock:
+                    latencies[page].append(elapsed * 1000)
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies
+
+
+def report(label, latencies):
+    print(label)
+    for page, values in latencies.items():
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(f"  GET {page:<6} mean {statistics.mean(values):7.2f} ms  median {statistics.median(values):7.2f} ms  "
+              f"p95 {p95:7.2f} ms  max {values[-1]:7.2f} ms  ({len(values)} requests)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark dashboard page latency against the job database')
+    parser.add_argument('--jobs', type=int, default=500, help='Completed jobs in the database (default: 500)')
+    parser.add_argument('--rows-per-job', type=int, default=200, help='Found transactions per job (default: 200)')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per page and reader thread (default: 50)')
+    parser.add_argument('--threads', type=int, default=4, help='Reader threads (default: 4)')
+    parser.add_argument('--write-batch', type=int, default=20000, help='Rows per writer transaction (default: 20000)')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    import app as app_module
+    logging.disable(logging.CRITICAL)
+    app_module.init_database()
+    seed('analyzer.db', args.jobs, args.rows_per_job)
+    client = app_module.app.test_client()
+    pages = ['/', '/jobs']
+
+    # Warm up templates and connections
+    time_pages(client, pages, 1, 1)
+    report('Idle database:', time_pages(client, pages, args.requests, args.threads))
+
+    stop = threading.Event()
+    written = []
+    writer = threading.Thread(target=lambda: written.append(write_results(stop, args.write_batch)))
+    writer.start()
+    time.sleep(0.2)
+    latencies = time_pages(client, pages, args.requests, args.threads)
+    stop.set()
+    writer.join()
+    report(f'While a job writes results ({written[0]} transactions of {args.write_batch} rows):', latencies)
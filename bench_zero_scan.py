@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the phase-1 leading-zero scan.
+
+Compares the original per-character loop with scan_block_batch() on
+synthetic batches of random txids and prints the cost per txid.
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+
+from final_analyzer_rpc import scan_block_batch
+
+
+def make_batch(num_blocks, txs_per_block):
+    """Build a batch of (height, hash, txids, counts) blocks with random txids."""
+    return [(height, None, [os.urandom(32).hex() for _ in range(txs_per_block)], None)
+            for height in range(num_blocks)]
+
+
+def scan_char_loop(blocks, min_zeros, histogram):
+    """The per-character loop phase 1 used before scan_block_batch()."""
+    candidates = []
+    for block_height, _, txids, _ in blocks:
+        for j, txid in enumerate(txids):
+            leading_zeros = 0
+            for char in txid:
+                if char == '0':
+                    leading_zeros += 1
+                else:
+                    break
+
+            if leading_zeros >= min_zeros:
+                histogram[leading_zeros] += 1
+                candidates.append((block_height, j, txid, leading_zeros))
+    return candidates
+
+
+def time_scanner(scanner, blocks, min_zeros, repeat):
+    best = None
+    for _ in range(repeat):
+        histogram = defaultdict(int)
+        start = time.perf_counter()
+        candidates = scanner(blocks, min_zeros, histogram)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, candidates, histogram
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark leading-zero counting over batches of txids')
+    parser.add_argument('--blocks', type=int, default=1000, help='Blocks per batch (default: 1000)')
+    parser.add_argument('--txs-per-block', type=int, default=200, help='Transactions per block (default: 200)')
+    parser.add_argument('--min-zeros', type=int, default=2, help='Minimum leading zeros (default: 2)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per scanner, best is reported (default: 5)')
+    args = parser.parse_args()
+
+    blocks = make_batch(args.blocks, args.txs_per_block)
+    total_txids = args.blocks * args.txs_per_block
+    print(f"Scanning {total_txids} txids (min_zeros={args.min_zeros}, best of {args.repeat})")
+
+    before, expected, expected_histogram = time_scanner(scan_char_loop, blocks, args.min_zeros, args.repeat)
+    after, candidates, histogram = time_scanner(scan_block_batch, blocks, args.min_zeros, args.repeat)
+
+    if candidates != expected or histogram != expected_histogram:
+        raise SystemExit("scan_block_batch() disagrees with the character loop")
+
+    print(f"  character loop:    {before / total_txids * 1e9:7.1f} ns/txid")
+    print(f"  scan_block_batch:  {after / total_txids * 1e9:7.1f} ns/txid")
+    print(f"  speedup:           {before / after:7.2f}x ({len(candidates)} candidates)")
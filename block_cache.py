@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk block cache for the RPC analyzer.
+
+Stores, per block height, the block hash, the txid list and (when known) the
+input/output count of every transaction, plus input/output counts of single
+transactions resolved in phase 2. Jobs that re-scan an already seen range with
+different filters read from this SQLite file instead of the node.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+DEFAULT_CACHE_PATH = os.getenv('B1T_BLOCK_CACHE_PATH', 'block_cache.db')
+DEFAULT_CACHE_MAX_MB = int(os.getenv('B1T_BLOCK_CACHE_MAX_MB', 2048))
+
+# Blocks closer to the tip than this may still be reorganized and are not cached
+DEFAULT_MIN_CONFIRMATIONS = int(os.getenv('B1T_BLOCK_CACHE_MIN_CONFIRMATIONS', 6))
+
+# Eviction frees space down to this share of the limit so it does not run on every insert
+EVICT_TARGET = 0.9
+
+
+def pack_txids(txids):
+    return b''.join(bytes.fromhex(txid) for txid in txids)
+
+
+def unpack_txids(blob):
+    return [blob[i:i + 32].hex() for i in range(0, len(blob), 32)]
+
+
+def pack_counts(counts):
+    flat = array('I')
+    for num_inputs, num_outputs in counts:
+        flat.append(num_inputs)
+        flat.append(num_outputs)
+    return flat.tobytes()
+
+
+def unpack_counts(blob):
+    flat = array('I')
+    flat.frombytes(blob)
+    return list(zip(flat[0::2], flat[1::2]))
+
+
+class BlockCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_mb=DEFAULT_CACHE_MAX_MB, min_confirmations=DEFAULT_MIN_CONFIRMATIONS):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.min_confirmations = min_confirmations
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA busy_timeout=30000')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS blocks (
+                height INTEGER PRIMARY KEY,
+                hash TEXT NOT NULL,
+                txids BLOB NOT NULL,
+                counts BLOB,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_blocks_last_used ON blocks (last_used)')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS tx_counts (
+                txid BLOB PRIMARY KEY,
+                height INTEGER NOT NULL,
+                num_inputs INTEGER NOT NULL,
+                num_outputs INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_tx_counts_height ON tx_counts (height)')
+        self.conn.commit()
+
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM blocks').fetchone()[0]
+
+    def get_blocks(self, start_height, end_height, need_counts=False):
+        """Return {height: (hash, txids, counts)} for cached blocks in the range.
+
+        counts is a list of (num_inputs, num_outputs) per transaction, or None
+        if the block was only ever fetched without transaction details. With
+        need_counts=True such blocks are reported as misses.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT height, hash, txids, counts FROM blocks WHERE height BETWEEN ? AND ?',
+                (start_height, end_height)
+            ).fetchall()
+            if rows:
+                self.conn.execute('UPDATE blocks SET last_used = ? WHERE height BETWEEN ? AND ?',
+                                  (time.time(), start_height, end_height))
+                self.conn.commit()
+
+        blocks = {}
+        for height, block_hash, txids, counts in rows:
+            if need_counts and counts is None:
+                continue
+            blocks[height] = (block_hash, unpack_txids(txids), unpack_counts(counts) if counts is not None else None)
+
+        self.hits += len(blocks)
+        self.misses += (end_height - start_height + 1) - len(blocks)
+        return blocks
+
+    def put_blocks(self, blocks):
+        """Store blocks given as (height, hash, txids, counts, confirmations)."""
+        now = time.time()
+        rows = []
+        for height, block_hash, txids, counts, confirmations in blocks:
+            if confirmations is not None and confirmations < self.min_confirmations:
+                continue
+            txid_blob = pack_txids(txids)
+            count_blob = pack_counts(counts) if counts is not None else None
+            size = len(txid_blob) + (len(count_blob) if count_blob else 0)
+            rows.append((height, block_hash, txid_blob, count_blob, size, now))
+        if not rows:
+            return
+
+        with self.lock:
+            heights = [row[0] for row in rows]
+            placeholders = ','.join('?' * len(heights))
+            old_size = self.conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM blocks WHERE height IN ({placeholders})', heights).fetchone()[0]
+            # Keep known counts when the same block is re-fetched without them;
+            # a different hash at the same height (reorg) replaces the entry
+            self.conn.executemany('''
+                INSERT INTO blocks (height, hash, txids, counts, size, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(height) DO UPDATE SET
+                    counts = CASE WHEN blocks.hash = excluded.hash THEN COALESCE(excluded.counts, blocks.counts) ELSE excluded.counts END,
+                    size = CASE WHEN blocks.hash = excluded.hash AND excluded.counts IS NULL THEN blocks.size ELSE excluded.size END,
+                    hash = excluded.hash,
+                    txids = excluded.txids,
+                    last_used = excluded.last_used
+            ''', rows)
+            new_size = self.conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM blocks WHERE height IN ({placeholders})', heights).fetchone()[0]
+            self.total_bytes += new_size - old_size
+            self.conn.commit()
+
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def get_tx_counts(self, txids):
+        """Return {txid: (num_inputs, num_outputs)} for cached transactions."""
+        if not txids:
+            return {}
+        keys = [bytes.fromhex(txid) for txid in txids]
+        placeholders = ','.join('?' * len(keys))
+        with self.lock:
+            rows = self.conn.execute(
+                f'SELECT txid, num_inputs, num_outputs FROM tx_counts WHERE txid IN ({placeholders})', keys
+            ).fetchall()
+        return {txid.hex(): (num_inputs, num_outputs) for txid, num_inputs, num_outputs in rows}
+
+    def put_tx_counts(self, entries):
+        """Store resolved transactions given as (txid, height, num_inputs, num_outputs)."""
+        rows = [(bytes.fromhex(txid), height, num_inputs, num_outputs) for txid, height, num_inputs, num_outputs in entries]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany('INSERT OR REPLACE INTO tx_counts (txid, height, num_inputs, num_outputs) VALUES (?, ?, ?, ?)', rows)
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least recently used blocks until the cache is below EVICT_TARGET of its limit."""
+        target = self.max_bytes * EVICT_TARGET
+        evicted = 0
+        while self.total_bytes > target:
+            rows = self.conn.execute('SELECT height, size FROM blocks ORDER BY last_used LIMIT 1000').fetchall()
+            if not rows:
+                break
+            heights = []
+            for height, size in rows:
+                heights.append((height,))
+                self.total_bytes -= size
+                if self.total_bytes <= target:
+                    break
+            self.conn.executemany('DELETE FROM blocks WHERE height = ?', heights)
+            self.conn.executemany('DELETE FROM tx_counts WHERE height = ?', heights)
+            evicted += len(heights)
+        self.conn.commit()
+        print(f"Block cache: evicted {evicted} blocks, {self.total_bytes / 1024 / 1024:.1f} MB in use")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Checkpoints that let an interrupted analysis continue where it stopped.
+
+A checkpoint consists of two files:
+
+    <path>             JSON state: job parameters, phase, next height to scan,
+                       phase 1 counters and the valid length of the log
+    <path>.candidates  append-only log with one JSON line per candidate found
+                       in phase 1 ("c") and per transaction resolved ("r")
+
+Before the state is replaced, the log is flushed and fsynced. The state
+therefore always describes a prefix of the log, and lines written after the
+last save are cut off on resume. Coinbase, multi-input and special counts
+are not saved; replaying the resolved transactions rebuilds them.
+"""
+
+import json
+import os
+import threading
+import time
+
+DEFAULT_CHECKPOINT_INTERVAL = float(os.getenv('B1T_CHECKPOINT_INTERVAL', 10))
+
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    """Saves analysis progress to path at most once per interval seconds."""
+
+    def __init__(self, path, parameters, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.log_path = path + '.candidates'
+        self.parameters = parameters
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.log = None
+        self.last_save = time.monotonic()
+        self.saves = 0
+        self.save_time = 0.0
+
+    def load(self):
+        """Return (state, log records) of the saved checkpoint, or None if there is none.
+
+        Raises ValueError when the checkpoint was written for different parameters.
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint {self.path} has unsupported version {state.get('version')}")
+        changed = [name for name, value in self.parameters.items() if state['parameters'].get(name) != value]
+        if changed:
+            raise ValueError(f"Checkpoint {self.path} was written with different {', '.join(changed)}")
+
+        with open(self.log_path, 'ab') as log:
+            log.truncate(state['log_length'])
+        with open(self.log_path, 'rb') as log:
+            records = [json.loads(line) for line in log]
+        return state, records
+
+    def open_log(self, fresh):
+        self.log = open(self.log_path, 'wb' if fresh else 'ab')
+
+    def _append(self, record):
+        line = (json.dumps(record) + '\n').encode()
+        with self.lock:
+            self.log.write(line)
+
+    def candidate(self, candidate):
+        self._append(['c', *candidate])
+
+    def resolved(self, candidate, num_inputs, num_outputs):
+        self._append(['r', *candidate, num_inputs, num_outputs])
+
+    def due(self):
+        return time.monotonic() - self.last_save >= self.interval
+
+    def save(self, state):
+        started = time.perf_counter()
+        with self.lock:
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            state = dict(state, version=CHECKPOINT_VERSION, parameters=self.parameters,
+                         log_length=self.log.tell(), saved_at=time.time())
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        self.saves += 1
+        self.save_time += time.perf_counter() - started
+        self.last_save = time.monotonic()
+
+    def close(self, completed=False):
+        """Close the log; a completed analysis no longer needs its checkpoint."""
+        if self.log:
+            self.log.close()
+            self.log = None
+        if completed:
+            for path in (self.path, self.log_path):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Per-chunk analysis facts shared by overlapping jobs.
+
+The chain is divided into aligned chunks of chunk_size blocks. For every
+chunk that was analyzed completely, the store keeps the raw facts a job's
+answer is built from: the transaction count of each block and every
+transaction with at least min_zeros leading zeros, together with its
+position and input/output count. Any job whose min_zeros is at least that
+floor can be answered for the chunk, with its own min_inputs and coinbase
+filters, without touching the node. Coinbase, multi-input and special
+counts and the leading zero histogram are all derived from these facts.
+
+By default the facts live in the block cache database, next to the blocks
+they were computed from.
+"""
+
+import os
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+
+from block_cache import DEFAULT_CACHE_PATH
+
+DEFAULT_MEMO_PATH = os.getenv('B1T_CHUNK_MEMO_PATH', DEFAULT_CACHE_PATH)
+DEFAULT_CHUNK_SIZE = int(os.getenv('B1T_CHUNK_SIZE', 1000))
+
+# height, tx index, txid, leading zeros, inputs, outputs
+CANDIDATE_FORMAT = struct.Struct('<II32sBII')
+
+
+def pack_candidates(candidates):
+    return b''.join(CANDIDATE_FORMAT.pack(height, tx_index, bytes.fromhex(txid), zeros, num_inputs, num_outputs)
+                    for height, tx_index, txid, zeros, num_inputs, num_outputs in candidates)
+
+
+def unpack_candidates(blob):
+    return [(height, tx_index, txid.hex(), zeros, num_inputs, num_outputs)
+            for height, tx_index, txid, zeros, num_inputs, num_outputs in CANDIDATE_FORMAT.iter_unpack(blob)]
+
+
+class ChunkStore:
+    def __init__(self, path=DEFAULT_MEMO_PATH, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.stored = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA busy_timeout=30000')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS chunk_facts (
+                chunk_size INTEGER NOT NULL,
+                first_height INTEGER NOT NULL,
+                min_zeros INTEGER NOT NULL,
+                tx_counts BLOB NOT NULL,
+                candidates BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (chunk_size, first_height)
+            ) WITHOUT ROWID
+        ''')
+        self.conn.commit()
+
+    def chunks(self, start_height, end_height):
+        """Split a range into (chunk_first, first, last) pieces along chunk boundaries.
+
+        first..last is the part of the chunk starting at chunk_first that lies
+        in the range; only the two outer pieces can be partial.
+        """
+        pieces = []
+        chunk_first = start_height - start_height % self.chunk_size
+        while chunk_first <= end_height:
+            pieces.append((chunk_first, max(chunk_first, start_height), min(chunk_first + self.chunk_size - 1, end_height)))
+            chunk_first += self.chunk_size
+        return pieces
+
+    def get_chunks(self, start_height, end_height, min_zeros):
+        """Return {chunk_first: (tx_counts, candidates)} for stored chunks overlapping the range.
+
+        Only chunks computed with a floor of at most min_zeros are returned.
+        tx_counts lists the transaction count of each block of the chunk,
+        candidates are (height, tx_index, txid, zeros, num_inputs, num_outputs).
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT first_height, tx_counts, candidates FROM chunk_facts '
+                'WHERE chunk_size = ? AND first_height BETWEEN ? AND ? AND min_zeros <= ?',
+                (self.chunk_size, start_height - start_height % self.chunk_size, end_height, min_zeros)
+            ).fetchall()
+
+        chunks = {}
+        for first_height, tx_counts, candidates in rows:
+            counts = array('I')
+            counts.frombytes(tx_counts)
+            chunks[first_height] = (counts.tolist(), unpack_candidates(candidates))
+        return chunks
+
+    def put_chunk(self, first_height, min_zeros, tx_counts, candidates):
+        """Store the facts of one complete chunk; a stored chunk is only replaced by one with a lower floor."""
+        with self.lock:
+            cursor = self.conn.execute('''
+                INSERT INTO chunk_facts (chunk_size, first_height, min_zeros, tx_counts, candidates, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chunk_size, first_height) DO UPDATE SET
+                    min_zeros = excluded.min_zeros,
+                    tx_counts = excluded.tx_counts,
+                    candidates = excluded.candidates,
+                    created_at = excluded.created_at
+                WHERE excluded.min_zeros < chunk_facts.min_zeros
+            ''', (self.chunk_size, first_height, min_zeros, array('I', tx_counts).tobytes(), pack_candidates(candidates), time.time()))
+            self.conn.commit()
+            # No row changes when a chunk with an equal or lower floor is already stored
+            self.stored += cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Shared pytest fixtures: a stub RPC node served in-process and a scratch web app database.
+"""
+
+import threading
+
+import pytest
+
+import db
+from stub_rpc_node import StubChain, serve
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    """Run every test in its own directory, so relative cache, memo and archive paths stay out of the tree."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def start_stub():
+    """Start stub nodes in-process: start_stub(chain, **serve options) returns the port it listens on."""
+    servers = []
+
+    def start(chain, **options):
+        server = serve(0, chain, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stub_node(start_stub, monkeypatch):
+    """A synthetic 300 block chain the analyzer's RPC clients talk to; yields its StubChain."""
+    chain = StubChain(300)
+    monkeypatch.setenv('B1T_RPC_HOST', '127.0.0.1')
+    monkeypatch.setenv('B1T_RPC_PORT', str(start_stub(chain)))
+    monkeypatch.setenv('B1T_RPC_USER', 'stub')
+    monkeypatch.setenv('B1T_RPC_PASS', 'stub')
+    monkeypatch.delenv('B1T_RPC_NODES', raising=False)
+    monkeypatch.setenv('B1T_RPC_RETRY_DELAY', '0')
+    return chain
+
+
+@pytest.fixture
+def web_db(tmp_path, monkeypatch):
+    """Point the web app at an empty database in tmp_path and create its tables; yields the app module."""
+    import app
+
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'analyzer.db'))
+    monkeypatch.setattr(db, '_pool', [])
+    monkeypatch.setattr(db, '_local', threading.local())
+    monkeypatch.setattr(app, 'CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    app.init_database()
+    yield app
+    db.release_connection()
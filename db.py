@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Connection pool for the web app's SQLite database.
+
+Each thread uses one connection: the first call to get_connection() in a
+thread takes an idle connection from the pool or opens a new one, and
+later calls in that thread return the same connection. Request threads
+hand theirs back with release_connection() when the request ends, so the
+next request reuses it with its cache of prepared statements. Long-lived
+threads such as the queue worker simply keep theirs.
+
+The database runs in WAL mode, so dashboard reads do not wait for a job
+that is writing results, and writers wait for each other up to
+BUSY_TIMEOUT_MS instead of failing.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = os.getenv('B1T_DB_PATH', 'analyzer.db')
+
+# Milliseconds a statement waits for another connection's write lock
+BUSY_TIMEOUT_MS = int(os.getenv('B1T_DB_BUSY_TIMEOUT', 30000))
+
+# Idle connections kept for request threads
+POOL_SIZE = int(os.getenv('B1T_DB_POOL_SIZE', 8))
+
+# Prepared statements cached per connection
+STATEMENT_CACHE_SIZE = 256
+
+_pool = []
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def connect(path=None):
+    """Open a new connection with the app's pragmas; usable from any thread, one thread at a time."""
+    conn = sqlite3.connect(path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-16000')
+    return conn
+
+
+def get_connection():
+    """Return the calling thread's connection, taking it from the pool on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        with _pool_lock:
+            conn = _pool.pop() if _pool else None
+        if conn is None:
+            conn = connect()
+        _local.conn = conn
+    return conn
+
+
+def release_connection():
+    """Return the calling thread's connection to the pool; an open transaction is rolled back."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        return
+    _local.conn = None
+    conn.rollback()
+    with _pool_lock:
+        if len(_pool) < POOL_SIZE:
+            _pool.append(conn)
+            return
+    conn.close()
+
+
+@contextmanager
+def transaction():
+    """Yield a cursor on the thread's connection; commits on success, rolls back on an exception."""
+    conn = get_connection()
+    with conn:
+        yield conn.cursor()
+
+
+def fetch_one(sql, params=()):
+    return get_connection().execute(sql, params).fetchone()
+
+
+def fetch_all(sql, params=()):
+    return get_connection().execute(sql, params).fetchall()
+
+
+def execute(sql, params=()):
+    """Run one write statement in its own transaction; returns the cursor for lastrowid/rowcount."""
+    conn = get_connection()
+    with conn:
+        return conn.execute(sql, params)
+
+
+def executemany(sql, rows):
+    conn = get_connection()
+    with conn:
+        return conn.executemany(sql, rows)
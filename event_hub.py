@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Change feed behind the web app's Server-Sent Events stream.
+
+An EventHub holds the latest value of each topic (overall status, queue,
+chain tip, follow totals, job states) as serialized JSON together with
+the version at which it last changed. publish() only bumps the version
+when the value differs from the stored one, so a publisher can offer its
+snapshot as often as it likes and subscribers hear about actual changes
+only.
+
+Values are serialized once when published, however many clients stream
+them. A subscriber remembers the last version it has seen and waits in
+changes() for anything newer; its first call, with version 0, returns
+every topic, which gives a new page the full current state. Publishers
+sleep in wait_for_subscribers() while no page is listening.
+"""
+
+import json
+import threading
+
+
+class EventHub:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.topics = {}  # topic -> (version, JSON text)
+        self.subscribers = 0
+
+    def publish(self, topic, data):
+        """Store data as the topic's value; returns whether it changed."""
+        text = json.dumps(data, sort_keys=True, default=str)
+        with self.condition:
+            current = self.topics.get(topic)
+            if current and current[1] == text:
+                return False
+            self.version += 1
+            self.topics[topic] = (self.version, text)
+            self.condition.notify_all()
+            return True
+
+    def changes(self, since, timeout):
+        """Wait up to timeout seconds for topics changed after version since; returns (version, {topic: JSON text})."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version > since, timeout)
+            return self.version, {topic: text for topic, (version, text) in self.topics.items() if version > since}
+
+    def subscribe(self):
+        with self.condition:
+            self.subscribers += 1
+            self.condition.notify_all()
+
+    def unsubscribe(self):
+        with self.condition:
+            self.subscribers -= 1
+
+    def wait_for_subscribers(self):
+        """Block while nobody is subscribed, so publishers do no work for an empty audience."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.subscribers > 0)
@@ -4,16 +4,102 @@ import os
 import json
 import time
 import argparse
+import contextlib
+import multiprocessing
+import random
+import queue
+import signal
+import sys
+import threading
 import requests
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dotenv import load_dotenv
+from block_cache import BlockCache, DEFAULT_CACHE_PATH, DEFAULT_CACHE_MAX_MB, DEFAULT_MIN_CONFIRMATIONS
+from txid_archive import TxidArchive, DEFAULT_ARCHIVE_DIR
+from async_rpc import AsyncRPCBridge
+from checkpoint import Checkpoint, DEFAULT_CHECKPOINT_INTERVAL
+from progress_bus import PROGRESS_INTERVAL, ProgressFile, ShardProgress
+from chunk_store import ChunkStore, DEFAULT_MEMO_PATH, DEFAULT_CHUNK_SIZE
+from rpc_batching import (AdaptiveBatcher, MemoryBudget, HTTP_FAILURE, batch_payload, count_reply_bytes, failure_budget, is_retryable,
+                          iter_json_array, parse_batch_reply, reply_bytes)
 
 # Load environment variables
 load_dotenv()
 
+# Ways of learning input/output counts for candidate transactions
+FETCH_MODES = ('two-phase', 'single-pass', 'auto')
+
+# Share of scanned transactions that are candidates above which 'auto' mode
+# fetches the next batch with getblock verbosity 2 instead of resolving each
+# candidate with getrawtransaction
+AUTO_DENSITY_THRESHOLD = float(os.getenv('B1T_AUTO_DENSITY_THRESHOLD', 0.02))
+
+# Blocks and transactions missing after the main pass get this many more
+# attempts, in small batches so one bad request cannot sink the others
+REFETCH_ROUNDS = int(os.getenv('B1T_REFETCH_ROUNDS', 3))
+REFETCH_BATCH_SIZE = 10
+
+# Bytes read from the socket at a time when decoding a batch reply as a stream
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Output formats of the command line; ndjson records are flushed at least this often (seconds)
+OUTPUT_FORMATS = ('text', 'ndjson')
+NDJSON_FLUSH_INTERVAL = 0.5
+
+# Default progress file of the command line (--status-file)
+STATUS_PATH = '/tmp/b1t_analysis_status.json'
+
+# Follow mode: seconds between tip polls, and how many blocks below the tip
+# stay revertible (with their hashes) in case of a reorg
+FOLLOW_POLL_INTERVAL = float(os.getenv('B1T_FOLLOW_POLL_INTERVAL', 10))
+FOLLOW_REORG_DEPTH = int(os.getenv('B1T_FOLLOW_REORG_DEPTH', 100))
+
+class RPCNode:
+    """One node endpoint with its observed latency and error rate"""
+    
+    def __init__(self, host, port, user, password):
+        self.host = host
+        self.port = port
+        self.url = f'http://{host}:{port}'
+        self.auth = (user, password)
+        self.latency = None  # EWMA of request latency in seconds
+        self.error_rate = 0.0  # EWMA of failed requests
+        self.failures = 0  # Consecutive failures
+        self.ejected_until = 0
+        self.probing = False
+        self.requests = 0
+    
+    def weight(self):
+        # Unmeasured nodes are tried first so every node gets a latency sample
+        latency = self.latency if self.latency is not None else 0.001
+        return 1.0 / (latency * (1 + 10 * self.error_rate))
+
+def parse_rpc_nodes(spec, user, password):
+    """Parse B1T_RPC_NODES: comma-separated [user:pass@]host[:port] entries"""
+    nodes = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        node_user, node_password = user, password
+        if '@' in entry:
+            credentials, entry = entry.rsplit('@', 1)
+            node_user, _, node_password = credentials.partition(':')
+        host, _, port = entry.partition(':')
+        nodes.append(RPCNode(host, int(port) if port else 8332, node_user, node_password))
+    return nodes
+
+class RPCNodeError(Exception):
+    """A request to one node failed at the HTTP level"""
+    
+    def __init__(self, node, error):
+        super().__init__(f"{node.url}: {error}")
+        self.node = node
+
 class B1TRPCClient:
-    def __init__(self):
+    def __init__(self, limiter=None):
         self.host = os.getenv('B1T_RPC_HOST', '127.0.0.1')
         self.port = int(os.getenv('B1T_RPC_PORT', 8332))
         self.user = os.getenv('B1T_RPC_USER')
@@ -22,13 +108,99 @@ class B1TRPCClient:
         self.max_retries = int(os.getenv('B1T_RPC_MAX_RETRIES', 3))
         self.retry_delay = float(os.getenv('B1T_RPC_RETRY_DELAY', 1.0))
         
-        self.url = f'http://{self.host}:{self.port}'
-        self.session = requests.Session()
-        self.session.auth = (self.user, self.password)
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Several nodes can share the load; B1T_RPC_HOST/PORT is used if none are listed
+        self.nodes = parse_rpc_nodes(os.getenv('B1T_RPC_NODES', ''), self.user, self.password)
+        if not self.nodes:
+            self.nodes = [RPCNode(self.host, self.port, self.user, self.password)]
+        self.eject_after = int(os.getenv('B1T_RPC_EJECT_AFTER', 3))
+        self.eject_seconds = float(os.getenv('B1T_RPC_EJECT_SECONDS', 30))
+        self.nodes_lock = threading.Lock()
+        
+        self.url = ', '.join(node.url for node in self.nodes)
+        self._local = threading.local()
+        
+        # Optional RPCShare of a budget shared with other analyses; every HTTP request holds one of its slots
+        self.limiter = limiter
         
         print(f"RPC Client initialized: {self.url}")
     
+    def session(self, node):
+        """Per-thread, per-node HTTP session so pipelined batches can share one client"""
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+        session = sessions.get(node.url)
+        if session is None:
+            session = requests.Session()
+            session.auth = node.auth
+            session.headers.update({'Content-Type': 'application/json'})
+            sessions[node.url] = session
+        return session
+    
+    def request_slot(self):
+        return self.limiter.slot() if self.limiter else contextlib.nullcontext()
+    
+    def pick_node(self, exclude=None):
+        """Choose a node weighted by observed latency and error rate.
+        
+        Ejected nodes are skipped until their cooldown ends; then a single
+        request is let through as a probe that reinstates or re-ejects it.
+        """
+        now = time.time()
+        with self.nodes_lock:
+            candidates = []
+            for node in self.nodes:
+                if node is exclude:
+                    continue
+                if node.ejected_until > now:
+                    continue
+                if node.ejected_until and not node.probing:
+                    node.probing = True
+                    return node
+                if not node.ejected_until:
+                    candidates.append(node)
+            if not candidates:
+                # Everything is ejected: use the node that comes back first
+                others = [node for node in self.nodes if node is not exclude] or self.nodes
+                return min(others, key=lambda node: node.ejected_until)
+            return random.choices(candidates, weights=[node.weight() for node in candidates])[0]
+    
+    def record_result(self, node, elapsed=None):
+        """Update a node's health after a request; elapsed=None marks a failure."""
+        alpha = 0.3
+        with self.nodes_lock:
+            node.requests += 1
+            node.probing = False
+            if elapsed is not None:
+                node.latency = elapsed if node.latency is None else (1 - alpha) * node.latency + alpha * elapsed
+                node.error_rate *= 1 - alpha
+                node.failures = 0
+                if node.ejected_until:
+                    print(f"RPC node {node.url} is healthy again")
+                node.ejected_until = 0
+            else:
+                node.error_rate = (1 - alpha) * node.error_rate + alpha
+                node.failures += 1
+                if len(self.nodes) > 1 and node.failures >= self.eject_after:
+                    node.ejected_until = time.time() + self.eject_seconds
+                    print(f"RPC node {node.url} ejected for {self.eject_seconds:.0f}s after {node.failures} failures")
+    
+    def post(self, payload, exclude=None):
+        """POST a JSON-RPC payload to one node and return (node, decoded reply)"""
+        node = self.pick_node(exclude)
+        started = time.time()
+        try:
+            with self.request_slot():
+                response = self.session(node).post(node.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            count_reply_bytes(len(response.content))
+            result = response.json()
+        except Exception as e:
+            self.record_result(node)
+            raise RPCNodeError(node, e)
+        self.record_result(node, time.time() - started)
+        return node, result
+    
     def call(self, method, params=None):
         """Make a single RPC call"""
         if params is None:
@@ -41,86 +213,595 @@ class B1TRPCClient:
             'id': 1
         }
         
+        failed_node = None
         for attempt in range(self.max_retries):
             try:
-                response = self.session.post(self.url, json=payload, timeout=self.timeout)
-                response.raise_for_status()
-                
-                result = response.json()
+                _, result = self.post(payload, failed_node)
                 if 'error' in result and result['error']:
                     raise Exception(f"RPC Error: {result['error']}")
                 
                 return result.get('result')
                 
             except Exception as e:
+                failed_node = e.node if isinstance(e, RPCNodeError) else None
                 if attempt < self.max_retries - 1:
                     print(f"RPC call failed (attempt {attempt + 1}): {e}. Retrying...")
-                    time.sleep(self.retry_delay)
+                    if len(self.nodes) == 1:
+                        time.sleep(self.retry_delay)
                 else:
                     print(f"RPC call failed after {self.max_retries} attempts: {e}")
                     return None
     
     def batch_call(self, calls):
-        """Make multiple RPC calls in a single batch request"""
+        """Make multiple RPC calls in a single batch request
+        
+        A batch that fails at the HTTP level is split in half and both halves
+        are sent again, so a timeout or a bad request only costs its own part
+        of the batch. Calls answered with a transient JSON-RPC error are
+        retried one by one. None is returned only for calls that still fail.
+        """
         if not calls:
             return []
         
-        payload = []
-        for i, (method, params) in enumerate(calls):
-            payload.append({
-                'jsonrpc': '2.0',
-                'method': method,
-                'params': params or [],
-                'id': i
-            })
+        budget = {'failures': 0, 'limit': failure_budget(len(calls), self.max_retries), 'node': None}
+        replies = self.send_batch(calls, budget)
         
-        for attempt in range(self.max_retries):
-            try:
-                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        results = []
+        for (method, params), (result, error) in zip(calls, replies):
+            if is_retryable(error):
+                result = self.call(method, params)
+            results.append(result)
+        return results
+    
+    def send_batch(self, calls, budget):
+        """Send calls as one batch request, bisecting it on failure; returns (result, error) per call"""
+        if budget['failures'] >= budget['limit']:
+            return [(None, HTTP_FAILURE)] * len(calls)
+        
+        try:
+            _, replies = self.post(batch_payload(calls), budget['node'])
+        except Exception as e:
+            budget['failures'] += 1
+            budget['node'] = e.node if isinstance(e, RPCNodeError) else None
+            action = 'Splitting' if len(calls) > 1 else 'Retrying'
+            print(f"Batch RPC call of {len(calls)} requests failed: {e}. {action}...")
+            if len(self.nodes) == 1:
+                time.sleep(self.retry_delay)
+            if len(calls) == 1:
+                replies = self.send_batch(calls, budget)
+                if replies[0][1] is HTTP_FAILURE:
+                    # One bad call must not sink its neighbours; if the next request fails too, the node is down
+                    budget['failures'] = budget['limit'] - 1
+                return replies
+            middle = len(calls) // 2
+            return self.send_batch(calls[:middle], budget) + self.send_batch(calls[middle:], budget)
+        
+        budget['failures'] = 0
+        return parse_batch_reply(replies, len(calls))
+    
+    def iter_batch(self, calls):
+        """Yield (index, result) for each call as soon as its reply is parsed
+        
+        The reply array is decoded incrementally from the response stream,
+        so only one result is held at a time instead of the whole payload.
+        Calls left unanswered by a failed stream are sent again through
+        batch_call(), and calls with a transient error through call().
+        """
+        if not calls:
+            return
+        
+        pending = set(range(len(calls)))
+        retry = []
+        node = self.pick_node()
+        started = time.time()
+        try:
+            with self.request_slot(), self.session(node).post(node.url, json=batch_payload(calls), timeout=self.timeout, stream=True) as response:
                 response.raise_for_status()
-                
-                results = response.json()
-                if not isinstance(results, list):
-                    results = [results]
-                
-                # Sort results by id to maintain order
-                results.sort(key=lambda x: x.get('id', 0))
-                
-                return [r.get('result') if 'error' not in r or not r['error'] else None for r in results]
-                
+                for reply in iter_json_array(response.iter_content(STREAM_CHUNK_SIZE)):
+                    index = reply.get('id')
+                    if index not in pending:
+                        continue
+                    pending.discard(index)
+                    if is_retryable(reply.get('error')):
+                        retry.append(index)
+                    else:
+                        yield index, None if reply.get('error') else reply.get('result')
+            self.record_result(node, time.time() - started)
+        except Exception as e:
+            self.record_result(node)
+            print(f"Streaming batch RPC call failed after {len(calls) - len(pending)} of {len(calls)} replies: {node.url}: {e}. Retrying the rest...")
+        
+        if pending:
+            rest = sorted(pending)
+            yield from zip(rest, self.batch_call([calls[index] for index in rest]))
+        for index in retry:
+            yield index, self.call(*calls[index])
+    
+    def verify_chain(self, height):
+        """Keep only nodes that agree on the hash of block `height`.
+        
+        Nodes that are behind or on a different branch would return missing
+        or different blocks for part of the range, so they are dropped for
+        this client. The hash reported by most nodes wins.
+        """
+        if len(self.nodes) < 2:
+            return
+        payload = {'jsonrpc': '2.0', 'method': 'getblockhash', 'params': [height], 'id': 1}
+        hashes = {}
+        for node in self.nodes:
+            try:
+                with self.request_slot():
+                    response = self.session(node).post(node.url, json=payload, timeout=self.timeout)
+                hashes[node.url] = response.json().get('result')
             except Exception as e:
-                if attempt < self.max_retries - 1:
-                    print(f"Batch RPC call failed (attempt {attempt + 1}): {e}. Retrying...")
-                    time.sleep(self.retry_delay)
-                else:
-                    print(f"Batch RPC call failed after {self.max_retries} attempts: {e}")
-                    return [None] * len(calls)
+                print(f"RPC node {node.url} unreachable: {e}")
+                hashes[node.url] = None
+        
+        votes = defaultdict(int)
+        for block_hash in hashes.values():
+            if block_hash:
+                votes[block_hash] += 1
+        if not votes:
+            raise Exception(f"No RPC node knows block {height}")
+        agreed = max(votes, key=votes.get)
+        
+        for node in list(self.nodes):
+            if hashes[node.url] != agreed:
+                print(f"RPC node {node.url} disagrees on block {height} ({hashes[node.url]}), not using it")
+                self.nodes.remove(node)
+        print(f"{len(self.nodes)} RPC nodes agree on block {height}: {agreed}")
+    
+    def node_summary(self):
+        return [(node.url, node.requests, node.latency, node.error_rate) for node in self.nodes]
+
+class ThreadStdout:
+    """sys.stdout stand-in that lets a thread send its prints elsewhere without affecting other threads
+
+    contextlib.redirect_stdout swaps the stream of the whole process, which
+    breaks when several analyses run in one process.
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def target(self):
+        return getattr(self.local, 'stream', None) or self.stream
+    
+    def write(self, text):
+        return self.target().write(text)
+    
+    def flush(self):
+        self.target().flush()
+    
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+@contextlib.contextmanager
+def thread_stdout(stream):
+    """Send what the current thread prints to stream while the block runs"""
+    if not isinstance(sys.stdout, ThreadStdout):
+        sys.stdout = ThreadStdout(sys.stdout)
+    router = sys.stdout
+    previous = getattr(router.local, 'stream', None)
+    router.local.stream = stream
+    try:
+        yield
+    finally:
+        router.local.stream = previous
 
-def update_status(current_block, start_block, total_blocks, phase="analysis"):
-    """Update analysis status to a file that can be read by the web app"""
+def detail_output():
+    """Context for the output of nested runs: stderr, unless the caller already redirected this thread"""
+    if isinstance(sys.stdout, ThreadStdout) and getattr(sys.stdout.local, 'stream', None) is not None:
+        return contextlib.nullcontext()
+    return thread_stdout(sys.stderr)
+
+def update_status(current_block, start_block, total_blocks, phase="analysis", phases=None, totals=None, progress=None):
+    """Report analysis status to the progress callback; without one there is nobody to report to"""
+    if not progress:
+        return
     try:
         blocks_processed = current_block - start_block + 1
-        progress = (blocks_processed / total_blocks) * 100 if total_blocks > 0 else 0
+        percent = (blocks_processed / total_blocks) * 100 if total_blocks > 0 else 0
         status_data = {
             'current_block': current_block,
             'start_block': start_block,
             'total_blocks': total_blocks,
             'blocks_processed': blocks_processed,
-            'progress': min(progress, 100),
+            'progress': min(percent, 100),
             'phase': phase,
             'timestamp': time.time()
         }
+        if phases:
+            status_data['phases'] = phases
+        if totals:
+            status_data['totals'] = totals
         
-        with open('/tmp/b1t_analysis_status.json', 'w') as f:
-            json.dump(status_data, f)
+        progress(status_data)
     except Exception as e:
-        print(f"Warning: Could not update status file: {e}")
+        print(f"Warning: Could not report status: {e}")
+
+def cached_block_batch(cache, batch_start, batch_end, verbosity):
+    """Return ({height: (height, hash, txids, counts)}, heights to fetch) for one batch."""
+    blocks = {}
+    if cache:
+        cached = cache.get_blocks(batch_start, batch_end, need_counts=verbosity == 2)
+        for height, (block_hash, txids, counts) in cached.items():
+            blocks[height] = (height, block_hash, txids, counts)
+    
+    heights = [height for height in range(batch_start, batch_end + 1) if height not in blocks]
+    return blocks, heights
+
+def store_fetched_blocks(blocks, fetched, replies, verbosity, cache):
+    """Decode getblock replies, given as (index into fetched, block_data), into blocks.
+    
+    Each reply is reduced to txids and counts as it arrives, so the full
+    decoded block is released before the next one is parsed.
+    """
+    new_blocks = []
+    for index, block_data in replies:
+        height, block_hash = fetched[index]
+        if not block_data or 'tx' not in block_data:
+            continue
+        if verbosity == 2:
+            txids = [tx['txid'] for tx in block_data['tx']]
+            counts = [(len(tx.get('vin', [])), len(tx.get('vout', []))) for tx in block_data['tx']]
+        else:
+            txids = block_data['tx']
+            counts = None
+        blocks[height] = (height, block_hash, txids, counts)
+        new_blocks.append((height, block_hash, txids, counts, block_data.get('confirmations')))
+    
+    if cache:
+        cache.put_blocks(new_blocks)
+
+def fetch_block_batch(rpc, batch_start, batch_end, verbosity=1, cache=None, batcher=None):
+    """Fetch one batch of heights as a list of (height, hash, txids, counts).
+    
+    counts holds (num_inputs, num_outputs) per transaction when the block was
+    fetched with verbosity 2 or came from a cache entry that knows them, and
+    is None otherwise. Cached blocks are served without touching the node.
+    The latency and reply size of the node requests are reported to batcher.
+    """
+    blocks, heights = cached_block_batch(cache, batch_start, batch_end, verbosity)
+    if heights:
+        received = [0]
+        reply_bytes.set(received)
+        started = time.time()
+        
+        # Batch get block hashes
+        block_hashes = rpc.batch_call([('getblockhash', [height]) for height in heights])
+        
+        # Batch get block data; verbosity 2 inlines the decoded transactions
+        fetched = [(height, block_hash) for height, block_hash in zip(heights, block_hashes) if block_hash]
+        block_calls = [('getblock', [block_hash, verbosity]) for _, block_hash in fetched]
+        replies = rpc.iter_batch(block_calls) if isinstance(rpc, B1TRPCClient) else enumerate(rpc.batch_call(block_calls))
+        store_fetched_blocks(blocks, fetched, replies, verbosity, cache)
+        if batcher:
+            batcher.record(len(heights), time.time() - started, received[0])
+    
+    return batch_start, batch_end, verbosity, [blocks[height] for height in sorted(blocks)]
+
+async def fetch_block_batch_async(client, batch_start, batch_end, verbosity=1, cache=None, batcher=None):
+    """fetch_block_batch() for an AsyncB1TRPCClient, run on its event loop"""
+    blocks, heights = cached_block_batch(cache, batch_start, batch_end, verbosity)
+    if heights:
+        # Each task runs in its own context, so concurrent fetches count separately
+        received = [0]
+        reply_bytes.set(received)
+        started = time.time()
+        block_hashes = await client.batch_call([('getblockhash', [height]) for height in heights])
+        fetched = [(height, block_hash) for height, block_hash in zip(heights, block_hashes) if block_hash]
+        block_data_list = await client.batch_call([('getblock', [block_hash, verbosity]) for _, block_hash in fetched])
+        if batcher:
+            batcher.record(len(heights), time.time() - started, received[0])
+        store_fetched_blocks(blocks, fetched, enumerate(block_data_list), verbosity, cache)
+    
+    return batch_start, batch_end, verbosity, [blocks[height] for height in sorted(blocks)]
+
+def iter_block_batches(rpc, start_block, end_block, batch_size, pipeline_depth=4, choose_verbosity=None, cache=None, batcher=None, memory_budget=None):
+    """Yield (batch_start, batch_end, verbosity, blocks) in height order.
+    
+    Up to pipeline_depth batches are fetched concurrently while the caller
+    scans the batch it was handed, so the node and the scanner overlap.
+    choose_verbosity, if given, is asked for the getblock verbosity each
+    time a batch is submitted. With an AsyncRPCBridge as rpc, the batches
+    are fetched as coroutines on its event loop instead of worker threads.
+    With an AdaptiveBatcher, each batch takes the size it currently suggests
+    instead of batch_size; a MemoryBudget further caps it so the batches
+    alive at once fit in the budget.
+    """
+    next_start = [start_block]
+    in_flight = deque()
+    async_rpc = isinstance(rpc, AsyncRPCBridge)
+    
+    with ThreadPoolExecutor(max_workers=1 if async_rpc else max(1, pipeline_depth)) as executor:
+        def submit_next():
+            batch_start = next_start[0]
+            if batch_start > end_block:
+                return False
+            size = batcher.next_size() if batcher else batch_size
+            if memory_budget:
+                size = memory_budget.max_blocks(size)
+            batch_end = min(batch_start + size - 1, end_block)
+            next_start[0] = batch_end + 1
+            verbosity = choose_verbosity() if choose_verbosity else 1
+            if async_rpc:
+                in_flight.append(rpc.submit(fetch_block_batch_async(rpc.client, batch_start, batch_end, verbosity, cache, batcher)))
+            else:
+                in_flight.append(executor.submit(fetch_block_batch, rpc, batch_start, batch_end, verbosity, cache, batcher))
+            return True
+        
+        while len(in_flight) < max(1, pipeline_depth) and submit_next():
+            pass
+        
+        while in_flight:
+            # Results are consumed in submission order to keep heights ordered
+            batch = in_flight.popleft().result()
+            if memory_budget:
+                memory_budget.record(batch[3])
+            submit_next()
+            yield batch
+
+def height_ranges(heights):
+    """Collapse sorted heights into (first, last) runs of consecutive heights"""
+    ranges = []
+    for height in heights:
+        if ranges and height == ranges[-1][1] + 1:
+            ranges[-1][1] = height
+        else:
+            ranges.append([height, height])
+    return [tuple(run) for run in ranges]
+
+def scan_block_batch(blocks, min_zeros, histogram):
+    """Find all txids with min_zeros+ leading zeros in a whole batch of blocks.
+    
+    Returns (block_height, tx_index, txid, leading_zeros) tuples in height
+    order and adds each hit to histogram (leading_zeros -> count).
+    
+    Lowercase hex txids sort lexicographically, so a txid starts with
+    min_zeros '0' characters exactly when it compares below
+    '0' * (min_zeros - 1) + '1'. That single C-level string comparison
+    rejects almost every txid; only the hits are counted with str.lstrip.
+    """
+    limit = '0' * (min_zeros - 1) + '1' if min_zeros > 0 else 'g'
+    candidates = []
+    for block_height, _, txids, _ in blocks:
+        candidates.extend([(block_height, j, txid, len(txid) - len(txid.lstrip('0')))
+                           for j, txid in enumerate(txids) if txid < limit])
+    
+    for candidate in candidates:
+        histogram[candidate[3]] += 1
+    return candidates
+
+def resolve_transactions(rpc, candidates, cache=None):
+    """Look up input/output counts for candidate transactions via getrawtransaction.
+    
+    Returns a list of (candidate, num_inputs, num_outputs); candidates whose
+    lookup failed are left out. Counts already in the block cache are used
+    without an RPC call, and new ones are added to it.
+    """
+    known = cache.get_tx_counts([txid for _, _, txid, _ in candidates]) if cache else {}
+    missing = [candidate for candidate in candidates if candidate[2] not in known]
+    
+    if missing:
+        tx_calls = [('getrawtransaction', [txid, True]) for _, _, txid, _ in missing]
+        tx_data_list = rpc.batch_call(tx_calls)
+        
+        new_counts = []
+        for (block_height, _, txid, _), tx_data in zip(missing, tx_data_list):
+            if not tx_data:
+                continue
+            known[txid] = (len(tx_data.get('vin', [])), len(tx_data.get('vout', [])))
+            new_counts.append((txid, block_height) + known[txid])
+        
+        if cache:
+            cache.put_tx_counts(new_counts)
+    
+    return [(candidate,) + known[candidate[2]] for candidate in candidates if candidate[2] in known]
+
+def tally_transaction(stats, special_txs, zero_txs, candidate, num_inputs, num_outputs, min_zeros, min_inputs, exclude_coinbase, show_all_zeros):
+    """Count one resolved candidate into stats and append it to special_txs/zero_txs as ((height, tx_index), tx) if it matches
+
+    Lists given as None are not filled. Returns (tx, is_special, is_listed).
+    """
+    block_height, tx_index, txid, leading_zeros = candidate
+    is_coinbase = tx_index == 0  # First transaction is coinbase
+    tx = {
+        'block': block_height,
+        'txid': txid,
+        'zeros': leading_zeros,
+        'inputs': num_inputs,
+        'outputs': num_outputs,
+        'coinbase': is_coinbase
+    }
+    
+    if is_coinbase:
+        stats['coinbase_transactions'] += 1
+    
+    # Only count multi-input for non-coinbase transactions
+    if num_inputs > 1 and not is_coinbase:
+        stats['multi_input_transactions'] += 1
+    
+    # Special transaction: min_zeros+ zeros + at least min_inputs input + optionally exclude coinbase
+    coinbase_filter = not is_coinbase if exclude_coinbase else True
+    is_special = leading_zeros >= min_zeros and num_inputs >= min_inputs and coinbase_filter
+    if is_special:
+        stats['special_transactions'] += 1
+        if special_txs is not None:
+            special_txs.append(((block_height, tx_index), tx))
+    
+    # All transactions with min_zeros+ zeros
+    is_listed = leading_zeros >= min_zeros and show_all_zeros and coinbase_filter
+    if is_listed and zero_txs is not None:
+        zero_txs.append(((block_height, tx_index), tx))
+    
+    return tx, is_special, is_listed
 
-def analyze_blocks_rpc(start_block, end_block, batch_size=1000, verbose=False, show_all_zeros=False, min_zeros=2, min_inputs=1, exclude_coinbase=False):
-    """Analyze blocks using RPC with two-phase approach"""
-    print(f'Analyzing blocks {start_block} to {end_block} with batch size {batch_size}...')
+def transaction_details(tx):
+    coinbase_str = ' (COINBASE)' if tx['coinbase'] else ''
+    return {
+        'block': tx['block'],
+        'hash': tx['txid'],
+        'zeros': tx['zeros'],
+        'inputs': tx['inputs'],
+        'outputs': tx['outputs'],
+        'coinbase': tx['coinbase'],
+        'details': f"{tx['zeros']} zeros, {tx['inputs']} inputs, {tx['outputs']} outputs{coinbase_str}"
+    }
+
+def candidate_event(candidate):
+    block_height, tx_index, txid, leading_zeros = candidate
+    return {'event': 'candidate', 'block': block_height, 'index': tx_index, 'hash': txid, 'zeros': leading_zeros}
+
+def transaction_event(kind, tx):
+    """'special' or 'zero' event for a resolved transaction; the details string is left to text output"""
+    event = {'event': kind}
+    event.update(transaction_details(tx))
+    del event['details']
+    return event
+
+def emit_transactions(events, special_txs, zero_txs):
+    for tx in special_txs:
+        events(transaction_event('special', tx))
+    for tx in zero_txs:
+        events(transaction_event('zero', tx))
+
+def print_summary(stats, special_txs, zero_txs, min_zeros, min_inputs, show_all_zeros):
+    """Print the ANALYSIS SUMMARY section of the command line output; callers in code get the same figures from analysis_result()"""
+    print('\n\n=== ANALYSIS SUMMARY ===')
+    print(f'Blocks analyzed: {stats["blocks_analyzed"]}')
+    print(f'Transactions analyzed: {stats["transactions_analyzed"]}')
+    print(f'Coinbase transactions: {stats["coinbase_transactions"]}')
+    print(f'Multi-input transactions: {stats["multi_input_transactions"]}')
+    
+    zero_count = sum(stats['transactions_with_zeros'].values())
+    print(f'Transactions with {min_zeros}+ leading zeros: {zero_count}')
+    
+    if stats['transactions_with_zeros']:
+        for zeros, count in sorted(stats['transactions_with_zeros'].items()):
+            print(f'  {zeros} leading zeros: {count} transactions')
+    
+    print(f'SPECIAL transactions ({min_zeros}+ zeros + at least {min_inputs} input + non-coinbase): {stats["special_transactions"]}')
+    
+    if special_txs:
+        print('\nSpecial transactions found:')
+        for tx in special_txs:
+            print(f'  Block {tx["block"]}: {tx["txid"]} ({tx["zeros"]} zeros, {tx["inputs"]} inputs, {tx["outputs"]} outputs)')
     
-    rpc = B1TRPCClient()
+    if show_all_zeros and zero_txs:
+        print(f'\nAll transactions with {min_zeros}+ leading zeros:')
+        for tx in zero_txs:
+            coinbase_str = ' (COINBASE)' if tx["coinbase"] else ''
+            print(f'  Block {tx["block"]}: {tx["txid"]} ({tx["zeros"]} zeros, {tx["inputs"]} inputs, {tx["outputs"]} outputs){coinbase_str}')
+    
+    if stats['unfetched_blocks']:
+        ranges = ', '.join(f'{first}-{last}' if first != last else str(first) for first, last in height_ranges(stats['unfetched_blocks']))
+        print(f'WARNING: {len(stats["unfetched_blocks"])} blocks could not be fetched and are missing from the results: {ranges}')
+    
+    if stats['unresolved_transactions']:
+        print(f'WARNING: {len(stats["unresolved_transactions"])} transactions could not be resolved and are missing from the results:')
+        for block_height, _, txid, _ in stats['unresolved_transactions']:
+            print(f'  Block {block_height}: {txid}')
+
+def print_timing(stats, total_elapsed):
+    print(f'\nTotal analysis time: {total_elapsed:.2f} seconds')
+    print(f'Rate: {stats["blocks_analyzed"] / total_elapsed:.2f} blocks/sec')
+    print(f'Phase 1 (collection): {stats["phase1_time"]:.2f}s, Phase 2 (analysis): {stats["phase2_time"]:.2f}s')
+
+def analyze_blocks_rpc(start_block, end_block, batch_size=1000, verbose=False, show_all_zeros=False, min_zeros=2, min_inputs=1, exclude_coinbase=False, pipeline_depth=4, stream=False, phase2_workers=2, stream_queue_size=10000,
+                       fetch_mode='two-phase', auto_density=AUTO_DENSITY_THRESHOLD, use_cache=True, cache_path=DEFAULT_CACHE_PATH, cache_max_mb=DEFAULT_CACHE_MAX_MB,
+                       write_archive=False, from_archive=False, archive_dir=DEFAULT_ARCHIVE_DIR, histogram_only=False, async_rpc=False,
+                       adaptive_batch=False, target_latency=2.0, max_reply_mb=32, memory_budget_mb=None,
+                       checkpoint_path=None, resume=False, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, facts=None, progress=None, events=None, rpc_limiter=None):
+    """Analyze blocks using RPC with two-phase approach
+    
+    With stream=True, candidates found in phase 1 are handed to phase 2
+    workers through a bounded queue while the scan is still running. The
+    queue blocks phase 1 when phase 2 falls behind, and the returned results
+    are identical to the two-phase run.
+    
+    fetch_mode selects how input/output counts are obtained:
+      'two-phase'   getblock verbosity 1, then getrawtransaction per candidate
+      'single-pass' getblock verbosity 2, counts read inline (no -txindex needed)
+      'auto'        per batch: verbosity 2 once the observed candidate density
+                    (candidates / transactions) reaches auto_density
+    
+    With use_cache=True, blocks and resolved transactions are read from and
+    written to the on-disk BlockCache at cache_path.
+    
+    With write_archive=True, every scanned block is appended to the columnar
+    TxidArchive in archive_dir. With from_archive=True, phase 1 is answered
+    from that archive when it covers the whole range, falling back to the
+    node otherwise. histogram_only=True skips phase 2, so an archived range
+    is analyzed without any RPC call.
+    
+    With async_rpc=True, all requests go through an AsyncRPCBridge: one event
+    loop thread multiplexes up to pipeline_depth in-flight batches over a
+    bounded pool of keep-alive connections.
+    
+    With adaptive_batch=True, batch_size is only the starting size: an
+    AdaptiveBatcher resizes batches so each fetch takes about target_latency
+    seconds and its replies stay below max_reply_mb.
+    
+    Batch replies are decoded as a stream and reduced block by block. With
+    memory_budget_mb, batches are also kept small enough that all batches in
+    flight plus the one being scanned fit in that many MB.
+    
+    With checkpoint_path, progress is saved to a Checkpoint after a batch
+    whenever checkpoint_interval seconds have passed, and at the end of
+    phase 1. With resume=True, an existing checkpoint for the same
+    parameters is loaded and the analysis continues from it.
+    
+    With a facts dict, the raw per-block facts are collected for the chunk
+    store: facts['tx_counts'][height] gets each scanned block's transaction
+    count and facts['candidates'] every resolved candidate with its
+    input/output count, regardless of the min_inputs and coinbase filters.
+    
+    Status updates go to the progress callback if one is given, called
+    with the dict update_status builds after every batch; see progress_bus
+    for callbacks that throttle them.
+    
+    With an events callback, a dict is passed to it per scanned batch
+    ('batch'), per candidate found ('candidate') and per resolved special
+    or listed zero transaction ('special', 'zero'), possibly from several
+    threads. Those transactions are then only reported as events and not
+    collected, so the returned lists stay empty. A 'checkpoint' event comes
+    right before a checkpoint is saved; the callback should make the
+    transactions it received durable before it returns.
+    
+    With an rpc_limiter (an RPCShare), every request of the threaded client
+    waits for a slot of the budget it shares with other analyses. The async
+    client is bounded by its own in-flight limit instead.
+    """
+    if fetch_mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode: {fetch_mode}")
+    
+    mode = 'streaming' if stream else 'two-phase'
+    if fetch_mode == 'single-pass':
+        mode = 'single-pass'
+    print(f'Analyzing blocks {start_block} to {end_block} with batch size {batch_size}, pipeline depth {pipeline_depth} ({mode}, fetch mode {fetch_mode})...')
+    
+    rpc = AsyncRPCBridge() if async_rpc else B1TRPCClient(rpc_limiter)
+    batcher = AdaptiveBatcher(batch_size, target_latency, max_reply_mb * 1024 * 1024) if adaptive_batch else None
+    memory_budget = MemoryBudget(memory_budget_mb, pipeline_depth + 1) if memory_budget_mb else None
+    if not async_rpc:
+        rpc.verify_chain(end_block)
+    cache = BlockCache(cache_path, cache_max_mb) if use_cache else None
+    
+    txid_archive = TxidArchive(archive_dir) if write_archive or from_archive else None
+    archive_writer = None
+    read_archive = False
+    if from_archive:
+        gaps = txid_archive.missing(start_block, end_block)
+        if gaps:
+            print(f"Txid archive is missing {sum(last - first + 1 for first, last in gaps)} blocks of this range (first gap {gaps[0][0]}-{gaps[0][1]}), scanning via RPC")
+        else:
+            read_archive = True
+    if write_archive and not read_archive:
+        # Blocks near the tip may still be reorganized and are not archived
+        tip = rpc.call('getblockcount')
+        archive_writer = txid_archive.writer(tip - DEFAULT_MIN_CONFIRMATIONS + 1 if tip is not None else -1)
     
     stats = {
         'blocks_analyzed': 0,
@@ -132,186 +813,1099 @@ def analyze_blocks_rpc(start_block, end_block, batch_size=1000, verbose=False, s
     }
     
     # Phase 1: Collect all transactions with min_zeros+ leading zeros
-    zero_transactions = []  # List of (block_height, txid, leading_zeros, is_coinbase)
+    zero_transactions = []  # List of (block_height, tx_index, txid, leading_zeros)
+    candidates_found = 0
     
-    start_time = time.time()
-    total_blocks = end_block - start_block + 1
+    special_txs = []
+    zero_txs = []
+    results_lock = threading.Lock()
     
-    # Initialize status
-    update_status(start_block, start_block, total_blocks, "phase1")
+    # Heights and candidates whose RPC requests failed, retried after each phase
+    missing_heights = []
+    unresolved = []
     
-    print(f"\n=== PHASE 1: Collecting transactions with {min_zeros}+ leading zeros ===")
+    checkpoint = None
+    if checkpoint_path:
+        checkpoint = Checkpoint(checkpoint_path, {
+            'start_block': start_block, 'end_block': end_block, 'min_zeros': min_zeros, 'min_inputs': min_inputs,
+            'exclude_coinbase': exclude_coinbase, 'show_all_zeros': show_all_zeros, 'histogram_only': histogram_only
+        }, checkpoint_interval)
+    saved = checkpoint.load() if checkpoint and resume else None
+    if checkpoint:
+        checkpoint.open_log(fresh=saved is None)
+    
+    # Process in batches to avoid overwhelming the RPC
+    tx_batch_size = 100
+    
+    phase2 = {'queued': 0, 'resolved': 0, 'error': None}
     
-    for batch_start in range(start_block, end_block + 1, batch_size):
-        batch_end = min(batch_start + batch_size - 1, end_block)
+    # Candidate density of the most recently scanned batch drives auto mode
+    density = {'candidates': 0, 'transactions': 0}
+    batches_by_verbosity = defaultdict(int)
+    
+    def choose_verbosity():
+        if fetch_mode == 'single-pass':
+            return 2
+        if fetch_mode == 'auto' and density['transactions']:
+            if density['candidates'] / density['transactions'] >= auto_density:
+                return 2
+        return 1
+    
+    def record_transaction(candidate, num_inputs, num_outputs, log=True):
+        if checkpoint and log:
+            checkpoint.resolved(candidate, num_inputs, num_outputs)
         
-        if verbose or batch_start % (batch_size * 10) == start_block:
-            elapsed = time.time() - start_time
-            rate = stats['blocks_analyzed'] / elapsed if elapsed > 0 else 0
-            print(f'Processing batch {batch_start}-{batch_end}, Rate: {rate:.2f} blocks/sec, Zero TXs found: {len(zero_transactions)}')
+        with results_lock:
+            if facts is not None:
+                facts['candidates'].append((*candidate, num_inputs, num_outputs))
+            if events is None:
+                tally_transaction(stats, special_txs, zero_txs, candidate, num_inputs, num_outputs, min_zeros, min_inputs, exclude_coinbase, show_all_zeros)
+                return
+            tx, is_special, is_listed = tally_transaction(stats, None, None, candidate, num_inputs, num_outputs, min_zeros, min_inputs, exclude_coinbase, show_all_zeros)
+        if is_special:
+            events(transaction_event('special', tx))
+        if is_listed:
+            events(transaction_event('zero', tx))
+    
+    def phase2_status():
+        return {
+            'phase1': {'blocks_processed': stats['blocks_analyzed'], 'total_blocks': total_blocks},
+            'phase2': {'resolved': phase2['resolved'], 'queued': phase2['queued']}
+        }
+    
+    def process_blocks(blocks):
+        nonlocal candidates_found
+        stats['blocks_analyzed'] += len(blocks)
+        stats['transactions_analyzed'] += sum(len(txids) for _, _, txids, _ in blocks)
+        if facts is not None:
+            for block_height, _, txids, _ in blocks:
+                facts['tx_counts'][block_height] = len(txids)
         
-        # Update status every batch
-        update_status(batch_start, start_block, total_blocks, "phase1")
+        if archive_writer:
+            for block_height, _, txids, _ in blocks:
+                archive_writer.append_block(block_height, txids)
         
-        # Batch get block hashes
-        hash_calls = [('getblockhash', [height]) for height in range(batch_start, batch_end + 1)]
-        block_hashes = rpc.batch_call(hash_calls)
+        # Check all transactions of the batch for leading zeros at once
+        counts_by_height = {block_height: counts for block_height, _, _, counts in blocks if counts is not None}
+        for candidate in scan_block_batch(blocks, min_zeros, stats['transactions_with_zeros']):
+            candidates_found += 1
+            if events:
+                events(candidate_event(candidate))
+            counts = counts_by_height.get(candidate[0])
+            if histogram_only:
+                continue
+            if counts is not None:
+                record_transaction(candidate, *counts[candidate[1]])
+                continue
+            if checkpoint:
+                checkpoint.candidate(candidate)
+            if stream:
+                pending.append(candidate)
+            else:
+                zero_transactions.append(candidate)
+    
+    def save_checkpoint(phase, next_height):
+        if events:
+            events({'event': 'checkpoint', 'phase': phase, 'next_height': next_height})
+        checkpoint.save({
+            'phase': phase,
+            'next_height': next_height,
+            'blocks_analyzed': stats['blocks_analyzed'],
+            'transactions_analyzed': stats['transactions_analyzed'],
+            'transactions_with_zeros': dict(stats['transactions_with_zeros']),
+            'candidates_found': candidates_found,
+            'missing_heights': list(missing_heights)
+        })
+    
+    def resolve_batch(batch):
+        resolved = resolve_transactions(rpc, batch, cache)
+        for candidate, num_inputs, num_outputs in resolved:
+            record_transaction(candidate, num_inputs, num_outputs)
+        if len(resolved) < len(batch):
+            found = {candidate[2] for candidate, _, _ in resolved}
+            with results_lock:
+                unresolved.extend(candidate for candidate in batch if candidate[2] not in found)
+    
+    def phase2_worker(candidate_queue):
+        while True:
+            batch = candidate_queue.get()
+            if batch is None:
+                return
+            try:
+                resolve_batch(batch)
+            except Exception as e:
+                # Keep draining so phase 1 never blocks on a dead consumer
+                phase2['error'] = e
+            with results_lock:
+                phase2['resolved'] += len(batch)
+    
+    start_time = time.time()
+    total_blocks = end_block - start_block + 1
+    
+    # Initialize status
+    update_status(start_block, start_block, total_blocks, "phase1", progress=progress)
+    
+    candidate_queue = None
+    phase2_pool = None
+    phase2_futures = []
+    pending = []
+    if stream:
+        candidate_queue = queue.Queue(maxsize=max(1, stream_queue_size // tx_batch_size))
+        phase2_pool = ThreadPoolExecutor(max_workers=max(1, phase2_workers))
+        phase2_futures = [phase2_pool.submit(phase2_worker, candidate_queue) for _ in range(max(1, phase2_workers))]
+    
+    def enqueue_pending(flush=False):
+        # Hand full chunks to phase 2; put() blocks when the queue is full
+        while len(pending) >= tx_batch_size or (flush and pending):
+            chunk = pending[:tx_batch_size]
+            del pending[:tx_batch_size]
+            with results_lock:
+                phase2['queued'] += len(chunk)
+            candidate_queue.put(chunk)
+    
+    scan_start = start_block
+    if saved:
+        state, records = saved
+        scan_start = state['next_height']
+        stats['blocks_analyzed'] = state['blocks_analyzed']
+        stats['transactions_analyzed'] = state['transactions_analyzed']
+        for zeros, count in state['transactions_with_zeros'].items():
+            stats['transactions_with_zeros'][int(zeros)] = count
+        candidates_found = state['candidates_found']
+        missing_heights.extend(state['missing_heights'])
         
-        # Batch get block data
-        block_calls = [('getblock', [block_hash]) for block_hash in block_hashes if block_hash]
-        block_data_list = rpc.batch_call(block_calls)
+        # Replay resolved transactions; the remaining candidates still need phase 2
+        resolved = set()
+        for record in records:
+            if record[0] == 'r':
+                candidate = tuple(record[1:5])
+                record_transaction(candidate, record[5], record[6], log=False)
+                resolved.add(candidate)
+        remaining = [candidate for candidate in (tuple(record[1:5]) for record in records if record[0] == 'c') if candidate not in resolved]
+        if stream:
+            pending.extend(remaining)
+        else:
+            zero_transactions.extend(remaining)
+        print(f"Resuming from checkpoint {checkpoint_path}: {state['phase']} at block {scan_start}, "
+              f"{len(resolved)} transactions resolved, {len(remaining)} waiting for phase 2")
+    
+    print(f"\n=== PHASE 1: Collecting transactions with {min_zeros}+ leading zeros ===")
+    
+    try:
+        if read_archive and scan_start == start_block:
+            blocks_found, transactions_found, histogram, archived_candidates = txid_archive.query(start_block, end_block, min_zeros, not histogram_only)
+            stats['blocks_analyzed'] = blocks_found
+            stats['transactions_analyzed'] = transactions_found
+            stats['transactions_with_zeros'].update(histogram)
+            candidates_found = sum(histogram.values())
+            print(f"Read {blocks_found} blocks from txid archive {archive_dir}")
+            if stream:
+                pending.extend(archived_candidates)
+            else:
+                zero_transactions.extend(archived_candidates)
+            if checkpoint:
+                for candidate in archived_candidates:
+                    checkpoint.candidate(candidate)
+            if events:
+                for candidate in archived_candidates:
+                    events(candidate_event(candidate))
         
-        # Process blocks
-        for i, block_data in enumerate(block_data_list):
-            if not block_data or 'tx' not in block_data:
-                continue
+        scanned = read_archive or scan_start > end_block
+        batches = [] if scanned else iter_block_batches(rpc, scan_start, end_block, batch_size, pipeline_depth, choose_verbosity, cache, batcher, memory_budget)
+        for batch_start, batch_end, verbosity, blocks in batches:
+            if verbose or sum(batches_by_verbosity.values()) % 10 == 0:
+                elapsed = time.time() - start_time
+                rate = stats['blocks_analyzed'] / elapsed if elapsed > 0 else 0
+                print(f'Processing batch {batch_start}-{batch_end}, Rate: {rate:.2f} blocks/sec, Zero TXs found: {candidates_found}')
             
-            block_height = batch_start + i
-            txids = block_data['tx']
+            # Update status every batch
+            if stream:
+                update_status(batch_start, start_block, total_blocks, "phase1+phase2", phase2_status(), progress=progress)
+            else:
+                update_status(batch_start, start_block, total_blocks, "phase1", progress=progress)
             
-            stats['blocks_analyzed'] += 1
-            stats['transactions_analyzed'] += len(txids)
+            batches_by_verbosity[verbosity] += 1
+            batch_candidates = candidates_found
+            batch_transactions = stats['transactions_analyzed']
             
-            # Check each transaction for leading zeros
-            for j, txid in enumerate(txids):
-                leading_zeros = 0
-                for char in txid:
-                    if char == '0':
-                        leading_zeros += 1
-                    else:
-                        break
-                
-                if leading_zeros >= min_zeros:
-                    stats['transactions_with_zeros'][leading_zeros] += 1
-                    is_coinbase = j == 0  # First transaction is coinbase
-                    zero_transactions.append((block_height, txid, leading_zeros, is_coinbase))
-    
-    phase1_time = time.time() - start_time
-    print(f"\nPhase 1 completed in {phase1_time:.2f} seconds")
-    print(f"Found {len(zero_transactions)} transactions with {min_zeros}+ leading zeros")
+            # Process blocks; heights the node did not deliver are refetched below
+            process_blocks(blocks)
+            fetched_heights = {block_height for block_height, _, _, _ in blocks}
+            missing_heights.extend(height for height in range(batch_start, batch_end + 1) if height not in fetched_heights)
+            
+            density['candidates'] = candidates_found - batch_candidates
+            density['transactions'] = stats['transactions_analyzed'] - batch_transactions
+            
+            if events:
+                events({'event': 'batch', 'first': batch_start, 'last': batch_end, 'blocks_analyzed': stats['blocks_analyzed'],
+                        'transactions_analyzed': stats['transactions_analyzed'], 'candidates': candidates_found,
+                        'elapsed': round(time.time() - start_time, 3)})
+            
+            if stream:
+                enqueue_pending()
+            
+            if checkpoint and checkpoint.due():
+                save_checkpoint('phase1', batch_end + 1)
+        
+        for attempt in range(REFETCH_ROUNDS if not saved or saved[0]['phase'] == 'phase1' else 0):
+            if not missing_heights:
+                break
+            print(f"Refetching {len(missing_heights)} missing blocks (attempt {attempt + 1} of {REFETCH_ROUNDS})")
+            retry_heights = sorted(missing_heights)
+            missing_heights.clear()
+            for first, last in height_ranges(retry_heights):
+                for batch_start in range(first, last + 1, REFETCH_BATCH_SIZE):
+                    batch_end = min(batch_start + REFETCH_BATCH_SIZE - 1, last)
+                    _, _, _, blocks = fetch_block_batch(rpc, batch_start, batch_end, choose_verbosity(), cache)
+                    process_blocks(blocks)
+                    fetched_heights = {block_height for block_height, _, _, _ in blocks}
+                    missing_heights.extend(height for height in range(batch_start, batch_end + 1) if height not in fetched_heights)
+            if stream:
+                enqueue_pending()
+        
+        if checkpoint:
+            save_checkpoint('phase2', end_block + 1)
+        
+        phase1_time = time.time() - start_time
+        print(f"\nPhase 1 completed in {phase1_time:.2f} seconds")
+        print(f"Found {candidates_found} transactions with {min_zeros}+ leading zeros")
+    finally:
+        if archive_writer:
+            archive_writer.close()
+        if stream:
+            enqueue_pending(flush=True)
+            for _ in phase2_futures:
+                candidate_queue.put(None)
     
     # Phase 2: Analyze transaction details for collected transactions
-    print(f"\n=== PHASE 2: Analyzing {len(zero_transactions)} transactions with {min_zeros}+ leading zeros ===")
     phase2_start = time.time()
     
-    special_txs = []
-    zero_txs = []
+    if stream:
+        print(f"\n=== PHASE 2: Waiting for {candidates_found - phase2['resolved']} of {candidates_found} streamed transactions ===")
+        while wait(phase2_futures, timeout=0.5).not_done:
+            update_status(end_block, start_block, total_blocks, f"phase2 ({phase2['resolved']}/{phase2['queued']} transactions)", phase2_status(), progress=progress)
+            if checkpoint and checkpoint.due():
+                save_checkpoint('phase2', end_block + 1)
+        phase2_pool.shutdown()
+        if phase2['error']:
+            print(f"Warning: phase 2 worker error: {phase2['error']}")
+        
+        phase2_time = time.time() - phase2_start
+        print(f"\nPhase 2 completed in {phase2_time:.2f} seconds")
+    else:
+        print(f"\n=== PHASE 2: Analyzing {len(zero_transactions)} transactions with {min_zeros}+ leading zeros ===")
     
     if zero_transactions:
         print(f"Found {len(zero_transactions)} transactions to analyze in detail...")
         
-        # Process in batches to avoid overwhelming the RPC
-        tx_batch_size = 100
-        
         for i in range(0, len(zero_transactions), tx_batch_size):
             batch = zero_transactions[i:i + tx_batch_size]
             
             if verbose or i % (tx_batch_size * 10) == 0:
-                progress = (i / len(zero_transactions)) * 100
-                print(f'Analyzing transaction details: {progress:.1f}% ({i}/{len(zero_transactions)})')
+                percent = (i / len(zero_transactions)) * 100
+                print(f'Analyzing transaction details: {percent:.1f}% ({i}/{len(zero_transactions)})')
             
             # Update status for phase 2
             current_tx = i + len(batch)
             tx_progress = (current_tx / len(zero_transactions)) * 100 if len(zero_transactions) > 0 else 100
-            update_status(end_block, start_block, total_blocks, f"phase2 ({tx_progress:.1f}% of transactions)")
+            phase2['queued'] = len(zero_transactions)
+            phase2['resolved'] = i
+            update_status(end_block, start_block, total_blocks, f"phase2 ({tx_progress:.1f}% of transactions)", phase2_status(), progress=progress)
             
-            # Batch get transaction data
-            tx_calls = [('getrawtransaction', [txid, True]) for _, txid, _, _ in batch]
-            tx_data_list = rpc.batch_call(tx_calls)
+            # Batch get transaction data and process it
+            resolve_batch(batch)
             
-            # Process transaction data
-            for j, tx_data in enumerate(tx_data_list):
-                if not tx_data:
-                    continue
-                
-                block_height, txid, leading_zeros, is_coinbase = batch[j]
-                
-                num_inputs = len(tx_data.get('vin', []))
-                num_outputs = len(tx_data.get('vout', []))
-                
-                if is_coinbase:
-                    stats['coinbase_transactions'] += 1
-                
-                # Only count multi-input for non-coinbase transactions
-                if num_inputs > 1 and not is_coinbase:
-                    stats['multi_input_transactions'] += 1
-                
-                # Special transaction: min_zeros+ zeros + at least min_inputs input + optionally exclude coinbase
-                coinbase_filter = not is_coinbase if exclude_coinbase else True
-                if leading_zeros >= min_zeros and num_inputs >= min_inputs and coinbase_filter:
-                    stats['special_transactions'] += 1
-                    special_txs.append({
-                        'block': block_height,
-                        'txid': txid,
-                        'zeros': leading_zeros,
-                        'inputs': num_inputs,
-                        'outputs': num_outputs,
-                        'coinbase': is_coinbase
-                    })
-                
-                # All transactions with min_zeros+ zeros
-                if leading_zeros >= min_zeros and show_all_zeros and coinbase_filter:
-                    zero_txs.append({
-                        'block': block_height,
-                        'txid': txid,
-                        'zeros': leading_zeros,
-                        'inputs': num_inputs,
-                        'outputs': num_outputs,
-                        'coinbase': is_coinbase
-                    })
+            if checkpoint and checkpoint.due():
+                save_checkpoint('phase2', end_block + 1)
         
         phase2_time = time.time() - phase2_start
         print(f"\nPhase 2 completed in {phase2_time:.2f} seconds")
     
+    for attempt in range(REFETCH_ROUNDS):
+        if not unresolved:
+            break
+        print(f"Retrying {len(unresolved)} unresolved transactions (attempt {attempt + 1} of {REFETCH_ROUNDS})")
+        retry_candidates = unresolved[:]
+        unresolved.clear()
+        for i in range(0, len(retry_candidates), REFETCH_BATCH_SIZE):
+            resolve_batch(retry_candidates[i:i + REFETCH_BATCH_SIZE])
+    
+    stats['unfetched_blocks'] = sorted(missing_heights)
+    stats['unresolved_transactions'] = sorted(unresolved)
+    
+    # Streamed candidates resolve out of order; report them by height and position
+    special_txs = [tx for _, tx in sorted(special_txs, key=lambda entry: entry[0])]
+    zero_txs = [tx for _, tx in sorted(zero_txs, key=lambda entry: entry[0])]
+    
     end_time = time.time()
     total_elapsed = end_time - start_time
     
-    print('\n\n=== ANALYSIS SUMMARY ===')
-    print(f'Blocks analyzed: {stats["blocks_analyzed"]}')
-    print(f'Transactions analyzed: {stats["transactions_analyzed"]}')
-    print(f'Coinbase transactions: {stats["coinbase_transactions"]}')
-    print(f'Multi-input transactions: {stats["multi_input_transactions"]}')
+    stats['phase1_time'] = phase1_time
+    stats['phase2_time'] = total_elapsed - phase1_time
+    stats['total_time'] = total_elapsed
+    print_summary(stats, special_txs, zero_txs, min_zeros, min_inputs, show_all_zeros)
     
-    zero_count = sum(stats['transactions_with_zeros'].values())
-    print(f'Transactions with {min_zeros}+ leading zeros: {zero_count}')
+    if cache:
+        print(f'Block cache: {cache.hits} blocks from cache, {cache.misses} from node')
+        cache.close()
     
-    if stats['transactions_with_zeros']:
-        for zeros, count in sorted(stats['transactions_with_zeros'].items()):
-            print(f'  {zeros} leading zeros: {count} transactions')
+    if not async_rpc and len(rpc.nodes) > 1:
+        for url, requests_sent, latency, error_rate in rpc.node_summary():
+            print(f'RPC node {url}: {requests_sent} requests, {(latency or 0) * 1000:.1f} ms avg latency, {error_rate:.1%} error rate')
     
-    print(f'SPECIAL transactions ({min_zeros}+ zeros + at least {min_inputs} input + non-coinbase): {stats["special_transactions"]}')
+    if async_rpc:
+        print(f'Async RPC: {rpc.client.connections_opened} connections opened')
+        rpc.close()
     
-    if special_txs:
-        print('\nSpecial transactions found:')
-        for tx in special_txs:
-            print(f'  Block {tx["block"]}: {tx["txid"]} ({tx["zeros"]} zeros, {tx["inputs"]} inputs, {tx["outputs"]} outputs)')
+    if memory_budget:
+        print(f'Memory budget: largest batch held {memory_budget.peak_batch_bytes / 1024 / 1024:.1f} MB of {memory_budget_mb} MB for {pipeline_depth + 1} batches')
     
-    if show_all_zeros and zero_txs:
-        print(f'\nAll transactions with {min_zeros}+ leading zeros:')
-        for tx in zero_txs:
-            coinbase_str = ' (COINBASE)' if tx["coinbase"] else ''
-            print(f'  Block {tx["block"]}: {tx["txid"]} ({tx["zeros"]} zeros, {tx["inputs"]} inputs, {tx["outputs"]} outputs){coinbase_str}')
+    if batcher:
+        print(f'Adaptive batching: batch size {batcher.next_size()} after {batcher.samples} fetches')
     
-    print(f'\nTotal analysis time: {total_elapsed:.2f} seconds')
-    print(f'Rate: {stats["blocks_analyzed"] / total_elapsed:.2f} blocks/sec')
-    print(f'Phase 1 (collection): {phase1_time:.2f}s, Phase 2 (analysis): {total_elapsed - phase1_time:.2f}s')
+    if archive_writer:
+        print(f'Txid archive: wrote {archive_writer.blocks_written} blocks to {archive_dir}')
+    
+    if histogram_only:
+        print('Phase 2 skipped (histogram only): input/output counts were not resolved')
+    
+    if checkpoint:
+        print(f'Checkpoint: {checkpoint.saves} saves took {checkpoint.save_time:.2f}s ({checkpoint.save_time / total_elapsed:.2%} of analysis time)')
+        checkpoint.close(completed=True)
+    
+    if fetch_mode != 'two-phase':
+        print(f'Fetch mode {fetch_mode}: {batches_by_verbosity[2]} single-pass batches, {batches_by_verbosity[1]} two-phase batches')
+    
+    print_timing(stats, total_elapsed)
     
     # Final status update
-    update_status(end_block, start_block, total_blocks, "completed")
+    update_status(end_block, start_block, total_blocks, "completed", progress=progress)
+    
+    return stats, special_txs, zero_txs
+
+def split_shards(start_block, end_block, shards):
+    """Split start_block..end_block into at most `shards` contiguous, nearly equal (start, end) ranges"""
+    total_blocks = end_block - start_block + 1
+    shards = max(1, min(shards, total_blocks))
+    bounds = [start_block + total_blocks * i // shards for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(shards)]
+
+# Processed blocks per shard, shared with the parent; set in each shard process by init_shard
+shard_blocks = None
+
+def init_shard(blocks):
+    global shard_blocks
+    shard_blocks = blocks
+
+def analyze_shard(shard_index, shard_start, shard_end, options):
+    """Process pool entry point: analyze one shard, logging to stderr and counting its progress in shard_blocks"""
+    options = dict(options)
+    options['progress'] = ShardProgress(shard_blocks, shard_index)
+    memo_path = options.pop('memo_path', None)
+    if options.get('checkpoint_path'):
+        options['checkpoint_path'] = f"{options['checkpoint_path']}.shard{shard_index}"
+    with contextlib.redirect_stdout(sys.stderr):
+        if memo_path:
+            return analyze_blocks_memoized(shard_start, shard_end, memo_path, **options)
+        return analyze_blocks_rpc(shard_start, shard_end, **options)
+
+def empty_stats():
+    return {
+        'blocks_analyzed': 0,
+        'transactions_analyzed': 0,
+        'coinbase_transactions': 0,
+        'multi_input_transactions': 0,
+        'transactions_with_zeros': defaultdict(int),
+        'special_transactions': 0,
+        'unfetched_blocks': [],
+        'unresolved_transactions': []
+    }
+
+def merge_results(results):
+    """Combine (stats, special_txs, zero_txs) of consecutive block ranges, given in height order"""
+    stats = empty_stats()
+    special_txs = []
+    zero_txs = []
+    for range_stats, range_special_txs, range_zero_txs in results:
+        for key in ('blocks_analyzed', 'transactions_analyzed', 'coinbase_transactions', 'multi_input_transactions', 'special_transactions'):
+            stats[key] += range_stats[key]
+        for zeros, count in range_stats['transactions_with_zeros'].items():
+            stats['transactions_with_zeros'][int(zeros)] += count
+        for key in ('memo_hit_blocks', 'memo_chunks_stored'):
+            if key in range_stats:
+                stats[key] = stats.get(key, 0) + range_stats[key]
+        stats['unfetched_blocks'].extend(range_stats['unfetched_blocks'])
+        stats['unresolved_transactions'].extend(tuple(candidate) for candidate in range_stats['unresolved_transactions'])
+        special_txs.extend(range_special_txs)
+        zero_txs.extend(range_zero_txs)
+    return stats, special_txs, zero_txs
+
+def summarize_facts(tx_counts, candidates, first, last, min_zeros, min_inputs, exclude_coinbase, show_all_zeros):
+    """Build (stats, special_txs, zero_txs) for blocks first..last from stored chunk facts, applying the job's filters"""
+    stats = empty_stats()
+    stats['blocks_analyzed'] = len(tx_counts)
+    stats['transactions_analyzed'] = sum(tx_counts)
+    special_txs = []
+    zero_txs = []
+    for block_height, tx_index, txid, leading_zeros, num_inputs, num_outputs in candidates:
+        if leading_zeros < min_zeros or not first <= block_height <= last:
+            continue
+        stats['transactions_with_zeros'][leading_zeros] += 1
+        tally_transaction(stats, special_txs, zero_txs, (block_height, tx_index, txid, leading_zeros), num_inputs, num_outputs,
+                          min_zeros, min_inputs, exclude_coinbase, show_all_zeros)
+    return stats, [tx for _, tx in special_txs], [tx for _, tx in zero_txs]
+
+def store_chunk_facts(store, facts, run_stats, first, last, min_zeros, confirmed_height):
+    """Store every whole chunk of first..last whose facts are complete and at or below confirmed_height"""
+    incomplete = set(run_stats['unfetched_blocks'])
+    incomplete.update(candidate[0] for candidate in run_stats['unresolved_transactions'])
+    candidates_by_chunk = defaultdict(list)
+    for candidate in facts['candidates']:
+        candidates_by_chunk[candidate[0] - candidate[0] % store.chunk_size].append(candidate)
+    
+    for chunk_first, chunk_start, chunk_last in store.chunks(first, last):
+        # Partial chunks at the ends of the range and chunks near the tip are not stored
+        if chunk_start != chunk_first or chunk_last - chunk_first + 1 != store.chunk_size or chunk_last > confirmed_height:
+            continue
+        heights = range(chunk_first, chunk_last + 1)
+        if any(height in incomplete or height not in facts['tx_counts'] for height in heights):
+            continue
+        store.put_chunk(chunk_first, min_zeros, [facts['tx_counts'][height] for height in heights], sorted(candidates_by_chunk[chunk_first]))
+
+def missing_runs(pieces, cached):
+    """Merge the consecutive chunks of pieces that are not in cached into [first, last] runs to analyze"""
+    runs = []
+    for chunk_first, first, last in pieces:
+        if chunk_first in cached:
+            continue
+        if runs and runs[-1][1] == first - 1:
+            runs[-1][1] = last
+        else:
+            runs.append([first, last])
+    return runs
+
+def memo_hit_ratio(stats):
+    total_blocks = stats['blocks_analyzed'] + len(stats['unfetched_blocks'])
+    return stats['memo_hit_blocks'] / total_blocks if total_blocks else 0
+
+def print_memo(stats):
+    total_blocks = stats['blocks_analyzed'] + len(stats['unfetched_blocks'])
+    print(f"Chunk memo: {stats['memo_hit_blocks']} of {total_blocks} blocks from stored chunks ({memo_hit_ratio(stats):.1%} hit ratio), {stats['memo_chunks_stored']} chunks stored")
+
+def analyze_blocks_memoized(start_block, end_block, memo_path=DEFAULT_MEMO_PATH, chunk_size=DEFAULT_CHUNK_SIZE, **options):
+    """Analyze start_block..end_block, reusing the chunk facts stored by earlier jobs
+    
+    The range is split into aligned chunks of chunk_size blocks. Chunks the
+    ChunkStore holds with a floor of at most min_zeros are answered from it
+    with this job's filters; every run of consecutive missing chunks is
+    analyzed by analyze_blocks_rpc, which collects the facts of its blocks.
+    Whole, complete and confirmed chunks among them are stored for later
+    jobs. Results equal those of a plain analyze_blocks_rpc run.
+    """
+    if options.get('histogram_only') or options.get('from_archive'):
+        # Neither mode resolves the per-block facts a chunk needs
+        return analyze_blocks_rpc(start_block, end_block, **options)
+    
+    progress = options.get('progress')
+    events = options.get('events')
+    min_zeros = options.get('min_zeros', 2)
+    filters = (min_zeros, options.get('min_inputs', 1), options.get('exclude_coinbase', False), options.get('show_all_zeros', False))
+    total_blocks = end_block - start_block + 1
+    start_time = time.time()
+    
+    store = ChunkStore(memo_path, chunk_size)
+    pieces = store.chunks(start_block, end_block)
+    cached = store.get_chunks(start_block, end_block, min_zeros)
+    
+    # Consecutive chunks that are not stored are analyzed in one run
+    runs = missing_runs(pieces, cached)
+    
+    print(f'Analyzing blocks {start_block} to {end_block} in {len(pieces)} chunks of {chunk_size} blocks, '
+          f'{len(pieces) - sum(chunk_first in cached for chunk_first, _, _ in pieces)} to compute in {len(runs)} runs...')
+    update_status(start_block, start_block, total_blocks, "chunk memo", progress=progress)
+    
+    results = []
+    for chunk_first, first, last in pieces:
+        if chunk_first in cached:
+            tx_counts, candidates = cached[chunk_first]
+            piece_results = summarize_facts(tx_counts[first - chunk_first:last - chunk_first + 1], candidates, first, last, *filters)
+            if events:
+                # Stored chunks yield no batch or candidate events, only their transactions
+                emit_transactions(events, *piece_results[1:])
+                piece_results = (piece_results[0], [], [])
+            results.append((first, piece_results))
+    
+    confirmed_height = -1
+    if runs:
+        with detail_output():
+            tip = B1TRPCClient(options.get('rpc_limiter')).call('getblockcount')
+        if tip is not None:
+            confirmed_height = tip - DEFAULT_MIN_CONFIRMATIONS
+    
+    phase_times = [0.0, 0.0]
+    for first, last in runs:
+        facts = {'tx_counts': {}, 'candidates': []}
+        run_options = dict(options, facts=facts)
+        if options.get('checkpoint_path'):
+            # Finished runs are stored, so a resumed job computes the same runs from the interrupted one on
+            run_options['checkpoint_path'] = f"{options['checkpoint_path']}.{first}"
+        with detail_output():
+            run_results = analyze_blocks_rpc(first, last, **run_options)
+        results.append((first, run_results))
+        phase_times[0] += run_results[0]['phase1_time']
+        phase_times[1] += run_results[0]['phase2_time']
+        store_chunk_facts(store, facts, run_results[0], first, last, min_zeros, confirmed_height)
+    
+    results.sort(key=lambda entry: entry[0])
+    stats, special_txs, zero_txs = merge_results([range_results for _, range_results in results])
+    stats['phase1_time'], stats['phase2_time'] = phase_times
+    stats['memo_hit_blocks'] = total_blocks - sum(last - first + 1 for first, last in runs)
+    stats['memo_chunks_stored'] = store.stored
+    store.close()
+    
+    total_elapsed = time.time() - start_time
+    stats['total_time'] = total_elapsed
+    print_summary(stats, special_txs, zero_txs, *filters[:2], filters[3])
+    print_memo(stats)
+    print_timing(stats, total_elapsed)
+    
+    update_status(end_block, start_block, total_blocks, "completed", progress=progress)
+    
+    return stats, special_txs, zero_txs
+
+def analyze_jobs_merged(jobs, memo_path=None, chunk_size=DEFAULT_CHUNK_SIZE, **options):
+    """Analyze several jobs with overlapping block ranges in one scan of the union of their ranges
+    
+    jobs maps a key to a dict with the job's start_block, end_block and
+    filters (min_zeros, min_inputs, exclude_coinbase, show_all_zeros); the
+    ranges must cover one contiguous union. Its blocks are fetched and its
+    candidates resolved once, at the lowest min_zeros of the jobs, while
+    analyze_blocks_rpc collects the per-block facts the chunk memo stores.
+    Each job's results are then built from those facts with its own range
+    and filters, so they equal those of a separate run. With a memo_path,
+    stored chunks are used and computed chunks stored as
+    analyze_blocks_memoized does, and every job's stats carry its memo
+    hit blocks and the chunks the scan stored.
+    
+    Returns {key: (stats, special_txs, zero_txs)}.
+    """
+    first = min(job['start_block'] for job in jobs.values())
+    last = max(job['end_block'] for job in jobs.values())
+    min_zeros = min(job['min_zeros'] for job in jobs.values())
+    start_time = time.time()
+    
+    # The scan only collects facts; the jobs' filters are applied to them afterwards
+    options = dict(options, min_zeros=min_zeros, show_all_zeros=False, events=None, checkpoint_path=None, resume=False)
+    
+    facts = {'tx_counts': {}, 'candidates': []}
+    runs = [[first, last]]
+    store = None
+    cached_pieces = []
+    if memo_path:
+        store = ChunkStore(memo_path, chunk_size)
+        pieces = store.chunks(first, last)
+        cached = store.get_chunks(first, last, min_zeros)
+        for chunk_first, piece_first, piece_last in pieces:
+            if chunk_first in cached:
+                tx_counts, candidates = cached[chunk_first]
+                cached_pieces.append((piece_first, piece_last))
+                for height in range(piece_first, piece_last + 1):
+                    facts['tx_counts'][height] = tx_counts[height - chunk_first]
+                facts['candidates'].extend(candidate for candidate in candidates if piece_first <= candidate[0] <= piece_last)
+        runs = missing_runs(pieces, cached)
+    
+    print(f'Analyzing blocks {first} to {last} once for {len(jobs)} overlapping jobs, '
+          f'{sum(run_last - run_first + 1 for run_first, run_last in runs)} blocks to scan in {len(runs)} runs...')
+    
+    confirmed_height = -1
+    if store and runs:
+        with detail_output():
+            tip = B1TRPCClient(options.get('rpc_limiter')).call('getblockcount')
+        if tip is not None:
+            confirmed_height = tip - DEFAULT_MIN_CONFIRMATIONS
+    
+    unfetched_blocks = []
+    unresolved_transactions = []
+    phase_times = [0.0, 0.0]
+    for run_first, run_last in runs:
+        run_facts = {'tx_counts': {}, 'candidates': []}
+        with detail_output():
+            run_stats = analyze_blocks_rpc(run_first, run_last, **dict(options, facts=run_facts))[0]
+        facts['tx_counts'].update(run_facts['tx_counts'])
+        facts['candidates'].extend(run_facts['candidates'])
+        unfetched_blocks.extend(run_stats['unfetched_blocks'])
+        unresolved_transactions.extend(run_stats['unresolved_transactions'])
+        phase_times[0] += run_stats['phase1_time']
+        phase_times[1] += run_stats['phase2_time']
+        if store:
+            store_chunk_facts(store, run_facts, run_stats, run_first, run_last, min_zeros, confirmed_height)
+    if store:
+        store.close()
+    
+    candidates = sorted(facts['candidates'])
+    total_elapsed = time.time() - start_time
+    results = {}
+    for key, job in jobs.items():
+        job_first, job_last = job['start_block'], job['end_block']
+        tx_counts = [facts['tx_counts'][height] for height in range(job_first, job_last + 1) if height in facts['tx_counts']]
+        stats, special_txs, zero_txs = summarize_facts(tx_counts, candidates, job_first, job_last, job['min_zeros'], job['min_inputs'],
+                                                       job['exclude_coinbase'], job['show_all_zeros'])
+        stats['unfetched_blocks'] = [height for height in unfetched_blocks if job_first <= height <= job_last]
+        stats['unresolved_transactions'] = [candidate for candidate in unresolved_transactions if job_first <= candidate[0] <= job_last]
+        stats['phase1_time'], stats['phase2_time'] = phase_times
+        stats['total_time'] = total_elapsed
+        if store:
+            # Chunks stored by the shared scan count for every job it served
+            stats['memo_hit_blocks'] = sum(max(0, min(piece_last, job_last) - max(piece_first, job_first) + 1)
+                                           for piece_first, piece_last in cached_pieces)
+            stats['memo_chunks_stored'] = store.stored
+        
+        print(f'\n=== JOB {key}: blocks {job_first} to {job_last} ===')
+        print_summary(stats, special_txs, zero_txs, job['min_zeros'], job['min_inputs'], job['show_all_zeros'])
+        if store:
+            print_memo(stats)
+        results[key] = (stats, special_txs, zero_txs)
+    print_timing({'blocks_analyzed': last - first + 1, 'phase1_time': phase_times[0], 'phase2_time': phase_times[1]}, total_elapsed)
+    
+    return results
+
+def analyze_blocks_sharded(start_block, end_block, shards, **options):
+    """Analyze start_block..end_block in contiguous shards, one process each, and merge the results
+
+    Every shard process runs analyze_blocks_rpc with its own RPC client,
+    pipeline and cache connection, so block scanning uses several cores.
+    Shards cover increasing heights, so merging their lists in shard order
+    gives the same order and the same summary as a single process run.
+    """
+    # Callbacks cannot cross into the shard processes; shards count their progress in shared memory,
+    # and their transactions are passed to the events callback after merging
+    progress = options.pop('progress', None)
+    events = options.pop('events', None)
+    ranges = split_shards(start_block, end_block, shards)
+    
+    # Neither can an RPC budget; the shards split the job's current share of it through their pipeline depth
+    rpc_limiter = options.pop('rpc_limiter', None)
+    if rpc_limiter:
+        options['pipeline_depth'] = max(1, min(options.get('pipeline_depth', 4), rpc_limiter.share() // len(ranges)))
+    total_blocks = end_block - start_block + 1
+    start_time = time.time()
+    print(f'Analyzing blocks {start_block} to {end_block} in {len(ranges)} shards...')
+    update_status(start_block, start_block, total_blocks, "sharded", progress=progress)
+    
+    # spawn, not fork: the parent may be running threads (e.g. the web app's worker).
+    # Each shard writes only its own slot, so the counts are read without a lock.
+    context = multiprocessing.get_context('spawn')
+    blocks = context.RawArray('q', len(ranges))
+    with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context, initializer=init_shard, initargs=(blocks,)) as executor:
+        futures = [executor.submit(analyze_shard, i, shard_start, shard_end, options)
+                   for i, (shard_start, shard_end) in enumerate(ranges)]
+        while wait(futures, timeout=1.0).not_done:
+            processed = sum(min(blocks[i], shard_end - shard_start + 1) for i, (shard_start, shard_end) in enumerate(ranges))
+            done = sum(future.done() for future in futures)
+            update_status(start_block + processed - 1, start_block, total_blocks, f"sharded ({done}/{len(ranges)} shards done)", progress=progress)
+        results = [future.result() for future in futures]
+    
+    stats, special_txs, zero_txs = merge_results(results)
+    # Shards run side by side, so the slowest one sets each phase's wall time
+    stats['phase1_time'] = max(shard_stats['phase1_time'] for shard_stats, _, _ in results)
+    stats['phase2_time'] = max(shard_stats['phase2_time'] for shard_stats, _, _ in results)
+    if events:
+        emit_transactions(events, special_txs, zero_txs)
+        special_txs, zero_txs = [], []
+    
+    total_elapsed = time.time() - start_time
+    stats['total_time'] = total_elapsed
+    print_summary(stats, special_txs, zero_txs, options.get('min_zeros', 2), options.get('min_inputs', 1), options.get('show_all_zeros', False))
+    if 'memo_hit_blocks' in stats:
+        print_memo(stats)
+    print(f'Shards: {len(ranges)} processes of ~{total_blocks // len(ranges)} blocks')
+    print_timing(stats, total_elapsed)
+    
+    update_status(end_block, start_block, total_blocks, "completed", progress=progress)
     
     return stats, special_txs, zero_txs
 
+def start_notify_listener(port, wake):
+    """Set `wake` on any HTTP request to port, e.g. -blocknotify="curl -s -X POST http://127.0.0.1:<port>/notify" """
+    class NotifyHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            wake.set()
+            self.send_response(204)
+            self.end_headers()
+        
+        do_GET = do_POST
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', port), NotifyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='notify', daemon=True).start()
+    return server
+
+def load_follow_state(path, parameters):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state['parameters'] != parameters:
+        raise ValueError(f"Follow state {path} was written with different parameters")
+    return state
+
+def save_follow_state(path, state):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+def follow_totals(state):
+    return merge_results([state['settled']] + [entry['results'] for entry in state['ranges']])
+
+def rollback_reorg(rpc, state, start_block, events=None):
+    """Drop the recent ranges whose blocks left the node's best chain; returns the fork height or None
+
+    With an events callback, a 'rollback' event names the dropped heights,
+    so consumers can discard the transactions they received for them.
+    """
+    ranges = state['ranges']
+    if not ranges or rpc.batch_call([('getblockhash', [ranges[-1]['end']])])[0] == ranges[-1]['hashes'][-1]:
+        return None
+    
+    heights = [height for entry in ranges for height in range(entry['start'], entry['end'] + 1)]
+    stored = [block_hash for entry in ranges for block_hash in entry['hashes']]
+    current = rpc.batch_call([('getblockhash', [height]) for height in heights])
+    fork = next((i for i, (old, new) in enumerate(zip(stored, current)) if old != new), None)
+    if fork is None:
+        return None
+    
+    fork_height = heights[fork]
+    kept = [entry for entry in ranges if entry['end'] < fork_height]
+    dropped = ranges[len(kept):]
+    state['ranges'] = kept
+    state['tip'] = dropped[0]['start'] - 1
+    state['reorgs'] += 1
+    state['rolled_back_blocks'] += dropped[-1]['end'] - dropped[0]['start'] + 1
+    print(f"Reorg at block {fork_height}: rolled back blocks {dropped[0]['start']}-{dropped[-1]['end']}")
+    if events:
+        events({'event': 'rollback', 'first': dropped[0]['start'], 'last': dropped[-1]['end'], 'fork': fork_height})
+    if fork == 0 and dropped[0]['start'] > start_block:
+        print(f"WARNING: the reorg may reach below the last {len(heights)} blocks; settled totals can include replaced blocks")
+    return fork_height
+
+def follow_step(rpc, state, first, last, revertible, reorg_depth, options):
+    """Analyze first..last and add it to the follow state"""
+    # Hashes are read before the blocks, so a reorg during the analysis shows up as a mismatch next time
+    hashes = rpc.batch_call([('getblockhash', [height]) for height in range(first, last + 1)]) if revertible else None
+    with detail_output():
+        results = analyze_blocks_rpc(first, last, **options)
+    
+    if revertible:
+        state['ranges'].append({'start': first, 'end': last, 'hashes': hashes, 'results': results})
+    else:
+        state['settled'] = merge_results([state['settled'], results])
+    state['tip'] = last
+    
+    # Ranges that dropped out of the reorg window become part of the settled totals
+    while state['ranges'] and state['ranges'][0]['end'] <= last - reorg_depth:
+        state['settled'] = merge_results([state['settled'], state['ranges'].pop(0)['results']])
+    
+    range_stats = results[0]
+    print(f"Blocks {first}-{last}: {range_stats['transactions_analyzed']} transactions, "
+          f"{sum(range_stats['transactions_with_zeros'].values())} with {options.get('min_zeros', 2)}+ leading zeros, "
+          f"{range_stats['special_transactions']} special")
+
+def wait_for_block(wake, stop, timeout):
+    """Wait up to timeout seconds for wake; with a stop event, also return soon after it is set"""
+    if stop is None:
+        wake.wait(timeout)
+    else:
+        deadline = time.monotonic() + timeout
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wake.wait(min(remaining, 0.5)):
+                break
+    wake.clear()
+
+def follow_chain(start_block, state_path=None, poll_interval=FOLLOW_POLL_INTERVAL, reorg_depth=FOLLOW_REORG_DEPTH, notify_port=None, stop=None, **options):
+    """Analyze from start_block to the chain tip, then every newly connected block as it arrives
+
+    The tip is polled every poll_interval seconds, or as soon as a request
+    reaches the notify_port listener. Ranges within reorg_depth blocks of
+    the tip are kept with their block hashes; when the node's hashes no
+    longer match, those ranges are rolled back and analyzed again. With
+    state_path, totals and recent ranges are saved after every step and a
+    restarted run continues from there. Each save is preceded by a
+    'checkpoint' event, so an events callback stores the transactions it
+    received before the saved tip moves past them. The progress callback
+    gets a summary of the totals, which the web app shows live. SIGTERM or
+    Ctrl-C ends the loop and prints the summary of everything analyzed; so
+    does setting the stop event, which callers running the loop outside
+    the main thread pass instead.
+    """
+    parameters = {
+        'start_block': start_block, 'min_zeros': options.get('min_zeros', 2), 'min_inputs': options.get('min_inputs', 1),
+        'exclude_coinbase': options.get('exclude_coinbase', False), 'show_all_zeros': options.get('show_all_zeros', False)
+    }
+    state = load_follow_state(state_path, parameters) if state_path else None
+    if state:
+        print(f"Continuing follow state {state_path} at block {state['tip'] + 1}")
+    else:
+        state = {'parameters': parameters, 'tip': start_block - 1, 'settled': merge_results([]), 'ranges': [], 'reorgs': 0, 'rolled_back_blocks': 0}
+    
+    rpc = B1TRPCClient(options.get('rpc_limiter'))
+    wake = threading.Event()
+    if notify_port:
+        start_notify_listener(notify_port, wake)
+        print(f"Listening for block notifications on http://127.0.0.1:{notify_port}/notify")
+    
+    def stop_following(signum, frame):
+        raise KeyboardInterrupt
+    if stop is None:
+        signal.signal(signal.SIGTERM, stop_following)
+    progress = options.get('progress')
+    
+    start_time = time.time()
+    first_tip = state['tip']
+    print(f"Following the chain tip from block {state['tip'] + 1} (poll every {poll_interval:g}s, reorg depth {reorg_depth})...")
+    
+    try:
+        while stop is None or not stop.is_set():
+            tip = rpc.call('getblockcount')
+            if tip is not None:
+                rollback_reorg(rpc, state, start_block, options.get('events'))
+                if tip > state['tip']:
+                    # Blocks deeper than reorg_depth are analyzed in one step and settled right away
+                    first = state['tip'] + 1
+                    settled_end = tip - reorg_depth
+                    if first <= settled_end:
+                        follow_step(rpc, state, first, settled_end, False, reorg_depth, options)
+                    follow_step(rpc, state, max(first, settled_end + 1), tip, True, reorg_depth, options)
+                
+                stats, _, _ = follow_totals(state)
+                totals = {
+                    'tip': state['tip'],
+                    'blocks_analyzed': stats['blocks_analyzed'],
+                    'transactions_analyzed': stats['transactions_analyzed'],
+                    'zero_transactions': sum(stats['transactions_with_zeros'].values()),
+                    'special_transactions': stats['special_transactions'],
+                    'reorgs': state['reorgs'],
+                    'rolled_back_blocks': state['rolled_back_blocks'],
+                    'updated': time.time()
+                }
+                if state_path:
+                    # The consumer stores what it received before the saved tip moves past it
+                    if options.get('events'):
+                        options['events']({'event': 'checkpoint', 'tip': state['tip']})
+                    save_follow_state(state_path, state)
+                update_status(state['tip'], start_block, state['tip'] - start_block + 1, "following", totals=totals, progress=progress)
+            
+            wait_for_block(wake, stop, poll_interval)
+    except KeyboardInterrupt:
+        pass
+    print("\nFollow mode stopped")
+    
+    stats, special_txs, zero_txs = follow_totals(state)
+    total_elapsed = time.time() - start_time
+    stats['total_time'] = total_elapsed
+    stats['follow'] = {'tip': state['tip'], 'reorgs': state['reorgs'], 'rolled_back_blocks': state['rolled_back_blocks']}
+    print_summary(stats, special_txs, zero_txs, parameters['min_zeros'], parameters['min_inputs'], parameters['show_all_zeros'])
+    print(f"Follow mode: analyzed up to block {state['tip']}, {state['reorgs']} reorgs rolled back {state['rolled_back_blocks']} blocks")
+    print(f'\nTotal analysis time: {total_elapsed:.2f} seconds')
+    print(f"Rate: {(state['tip'] - first_tip) / total_elapsed:.2f} blocks/sec")
+    
+    return stats, special_txs, zero_txs
+
+def analysis_result(stats, special_txs, zero_txs):
+    """JSON-ready summary of an analysis: the numbers print_summary and print_timing show, and the listed transactions"""
+    total_time = stats.get('total_time', 0.0)
+    result = {
+        'blocks_analyzed': stats['blocks_analyzed'],
+        'transactions_analyzed': stats['transactions_analyzed'],
+        'coinbase_transactions': stats['coinbase_transactions'],
+        'multi_input_transactions': stats['multi_input_transactions'],
+        'zero_transactions': sum(stats['transactions_with_zeros'].values()),
+        'zero_breakdown': {str(zeros): count for zeros, count in sorted(stats['transactions_with_zeros'].items())},
+        'special_transactions': stats['special_transactions'],
+        'special_transaction_details': [transaction_details(tx) for tx in special_txs],
+        'zero_transaction_details': [transaction_details(tx) for tx in zero_txs],
+        'analysis_time': total_time,
+        'rate': stats['blocks_analyzed'] / total_time if total_time > 0 else 0.0,
+        'phase1_time': stats.get('phase1_time', 0.0),
+        'phase2_time': stats.get('phase2_time', 0.0),
+        'unfetched_blocks': len(stats['unfetched_blocks']),
+        'unfetched_heights': list(stats['unfetched_blocks']),
+        'unresolved_transactions': len(stats['unresolved_transactions']),
+        'unresolved_txids': [{'block': block_height, 'hash': txid} for block_height, _, txid, _ in stats['unresolved_transactions']]
+    }
+    if 'memo_hit_blocks' in stats:
+        result['memo_hit_blocks'] = stats['memo_hit_blocks']
+        result['memo_hit_ratio'] = memo_hit_ratio(stats) * 100
+        result['memo_chunks_stored'] = stats['memo_chunks_stored']
+    if 'follow' in stats:
+        result['follow'] = stats['follow']
+    return result
+
+def ndjson_writer(stream, flush_interval=NDJSON_FLUSH_INTERVAL):
+    """Events callback writing one JSON line per event to stream
+
+    The stream is flushed after every batch, checkpoint and summary
+    record, and at least every flush_interval seconds while records are
+    written, so consumers see results while the scan runs.
+    """
+    lock = threading.Lock()
+    last_flush = [time.monotonic()]
+    
+    def write_event(event):
+        line = json.dumps(event, separators=(',', ':')) + '\n'
+        with lock:
+            stream.write(line)
+            now = time.monotonic()
+            if event['event'] in ('batch', 'checkpoint', 'summary') or now - last_flush[0] >= flush_interval:
+                stream.flush()
+                last_flush[0] = now
+    return write_event
+
+def run_analysis(start_block, end_block=None, shards=1, chunk_memo=False, memo_path=DEFAULT_MEMO_PATH, chunk_size=DEFAULT_CHUNK_SIZE,
+                 follow=False, follow_state=None, poll_interval=FOLLOW_POLL_INTERVAL, reorg_depth=FOLLOW_REORG_DEPTH, notify_port=None, stop=None, **options):
+    """Engine entry point shared by the command line and the web app; returns analysis_result()
+
+    Picks follow mode, shards or the chunk memo as requested and passes
+    the remaining options (including progress and events callbacks) to
+    analyze_blocks_rpc. With an events callback, a final 'summary' event
+    carries the result without the transaction lists, which were reported
+    as events. Raises ValueError for inconsistent arguments.
+    """
+    if follow:
+        if options.get('checkpoint_path') or shards > 1:
+            raise ValueError('Follow mode keeps its own state and cannot be combined with a checkpoint or shards')
+        results = follow_chain(start_block, follow_state, poll_interval, reorg_depth, notify_port, stop, **options)
+    elif end_block is None:
+        raise ValueError('An end block is required unless following the chain')
+    elif shards > 1:
+        if chunk_memo:
+            options.update(memo_path=memo_path, chunk_size=chunk_size)
+        results = analyze_blocks_sharded(start_block, end_block, shards, **options)
+    elif chunk_memo:
+        results = analyze_blocks_memoized(start_block, end_block, memo_path, chunk_size, **options)
+    else:
+        results = analyze_blocks_rpc(start_block, end_block, **options)
+    
+    result = analysis_result(*results)
+    if options.get('events'):
+        summary = {'event': 'summary'}
+        summary.update((key, value) for key, value in result.items() if key not in ('special_transaction_details', 'zero_transaction_details'))
+        options['events'](summary)
+    return result
+
+def run_merged_analysis(jobs, chunk_memo=False, memo_path=DEFAULT_MEMO_PATH, chunk_size=DEFAULT_CHUNK_SIZE, **options):
+    """Engine entry point for one scan shared by overlapping jobs; returns {key: analysis_result()}
+    
+    jobs is as for analyze_jobs_merged. A job's optional 'events' callback
+    gets its 'special', 'zero' and 'summary' events as from run_analysis.
+    Raises ValueError if the job ranges do not form one contiguous range
+    or a mode that skips phase 2 is requested.
+    """
+    if options.get('histogram_only') or options.get('from_archive'):
+        raise ValueError('A merged scan resolves every candidate and cannot answer from the archive or count zeros only')
+    ranges = sorted((job['start_block'], job['end_block']) for job in jobs.values())
+    covered = ranges[0][1]
+    for first, last in ranges[1:]:
+        if first > covered + 1:
+            raise ValueError(f'Job ranges leave a gap after block {covered}')
+        covered = max(covered, last)
+    
+    results = analyze_jobs_merged(jobs, memo_path if chunk_memo else None, chunk_size, **options)
+    
+    merged = {}
+    for key, job_results in results.items():
+        result = analysis_result(*job_results)
+        events = jobs[key].get('events')
+        if events:
+            emit_transactions(events, job_results[1], job_results[2])
+            summary = {'event': 'summary'}
+            summary.update((name, value) for name, value in result.items() if name not in ('special_transaction_details', 'zero_transaction_details'))
+            events(summary)
+        merged[key] = result
+    return merged
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Analyze Bitcoin blocks for special transactions using RPC')
     parser.add_argument('--start', type=int, required=True, help='Start block height')
-    parser.add_argument('--end', type=int, required=True, help='End block height')
+    parser.add_argument('--end', type=int, default=None, help='End block height (not used with --follow)')
     parser.add_argument('--batch-size', type=int, default=1000, help='Batch size for block processing (default: 1000)')
     parser.add_argument('--min-zeros', type=int, default=2, help='Minimum leading zeros to consider (default: 2)')
     parser.add_argument('--min-inputs', type=int, default=1, help='Minimum inputs for special transactions (default: 1)')
     parser.add_argument('--verbose', action='store_true', help='Verbose output')
     parser.add_argument('--show-all-zeros', action='store_true', help='Show all transactions with min_zeros+ leading zeros')
     parser.add_argument('--exclude-coinbase', action='store_true', help='Exclude coinbase transactions from results')
+    parser.add_argument('--pipeline-depth', type=int, default=4, help='Number of block batches fetched concurrently (default: 4)')
+    parser.add_argument('--stream', action='store_true', help='Resolve candidates in phase 2 while phase 1 is still scanning')
+    parser.add_argument('--phase2-workers', type=int, default=2, help='Phase 2 worker threads in streaming mode (default: 2)')
+    parser.add_argument('--stream-queue-size', type=int, default=10000, help='Maximum candidates waiting for phase 2 in streaming mode (default: 10000)')
+    parser.add_argument('--fetch-mode', choices=FETCH_MODES, default='two-phase',
+                        help='two-phase: getblock + getrawtransaction; single-pass: getblock verbosity 2; auto: choose per batch (default: two-phase)')
+    parser.add_argument('--auto-density', type=float, default=AUTO_DENSITY_THRESHOLD,
+                        help=f'Candidate density at which auto mode switches to verbosity 2 (default: {AUTO_DENSITY_THRESHOLD})')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the on-disk block cache')
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH, help=f'Block cache file (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_CACHE_MAX_MB, help=f'Block cache size limit in MB (default: {DEFAULT_CACHE_MAX_MB})')
+    parser.add_argument('--archive', action='store_true', help='Append scanned blocks to the columnar txid archive')
+    parser.add_argument('--from-archive', action='store_true', help='Answer phase 1 from the txid archive if it covers the range')
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR, help=f'Txid archive directory (default: {DEFAULT_ARCHIVE_DIR})')
+    parser.add_argument('--async-rpc', action='store_true', help='Fetch through the asyncio RPC client with a keep-alive connection pool')
+    parser.add_argument('--adaptive-batch', action='store_true', help='Resize block batches from observed latency and reply size (--batch-size is the starting size)')
+    parser.add_argument('--target-latency', type=float, default=2.0, help='Target seconds per batch fetch with --adaptive-batch (default: 2.0)')
+    parser.add_argument('--max-reply-mb', type=int, default=32, help='Maximum reply size per batch fetch with --adaptive-batch (default: 32)')
+    parser.add_argument('--memory-budget-mb', type=int, default=None, help='Keep the block batches held in memory at once under this many MB')
+    parser.add_argument('--shards', type=int, default=1, help='Split the range into this many contiguous shards, analyzed in parallel processes (default: 1)')
+    parser.add_argument('--checkpoint', default=None, help='Save progress to this file so an interrupted run can be resumed')
+    parser.add_argument('--resume', action='store_true', help='Continue from the --checkpoint file if it exists')
+    parser.add_argument('--checkpoint-interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL,
+                        help=f'Minimum seconds between checkpoint saves (default: {DEFAULT_CHECKPOINT_INTERVAL:g})')
+    parser.add_argument('--chunk-memo', action='store_true', help='Reuse per-chunk results stored by earlier jobs and store the chunks this job computes')
+    parser.add_argument('--memo-path', default=DEFAULT_MEMO_PATH, help=f'Chunk memo database (default: {DEFAULT_MEMO_PATH})')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help=f'Blocks per memoized chunk (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--follow', action='store_true', help='Analyze up to the chain tip, then keep analyzing new blocks until stopped')
+    parser.add_argument('--follow-state', default=None, help='File for follow mode totals, so a restarted follow run continues')
+    parser.add_argument('--poll-interval', type=float, default=FOLLOW_POLL_INTERVAL,
+                        help=f'Seconds between chain tip polls with --follow (default: {FOLLOW_POLL_INTERVAL:g})')
+    parser.add_argument('--reorg-depth', type=int, default=FOLLOW_REORG_DEPTH,
+                        help=f'Blocks below the tip that can be rolled back after a reorg with --follow (default: {FOLLOW_REORG_DEPTH})')
+    parser.add_argument('--notify-port', type=int, default=None, help='With --follow, also wake up on HTTP requests to this local port')
+    parser.add_argument('--status-file', default=STATUS_PATH, help=f'Progress file, rewritten at most every {PROGRESS_INTERVAL}s; empty to write none (default: {STATUS_PATH})')
+    parser.add_argument('--output', choices=OUTPUT_FORMATS, default='text',
+                        help='text: human-readable report; ndjson: one JSON record per event on stdout, text goes to stderr (default: text)')
+    parser.add_argument('--histogram-only', action='store_true', help='Only count leading zeros, skip phase 2 (no RPC calls with --from-archive)')
     
     args = parser.parse_args()
     
-    analyze_blocks_rpc(args.start, args.end, args.batch_size, args.verbose, args.show_all_zeros, args.min_zeros, args.min_inputs, args.exclude_coinbase)
\ No newline at end of file
+    options = {
+        'batch_size': args.batch_size, 'verbose': args.verbose, 'show_all_zeros': args.show_all_zeros, 'min_zeros': args.min_zeros,
+        'min_inputs': args.min_inputs, 'exclude_coinbase': args.exclude_coinbase, 'pipeline_depth': args.pipeline_depth, 'stream': args.stream,
+        'phase2_workers': args.phase2_workers, 'stream_queue_size': args.stream_queue_size, 'fetch_mode': args.fetch_mode,
+        'auto_density': args.auto_density, 'use_cache': not args.no_cache, 'cache_path': args.cache_path, 'cache_max_mb': args.cache_max_mb,
+        'write_archive': args.archive, 'from_archive': args.from_archive, 'archive_dir': args.archive_dir, 'histogram_only': args.histogram_only,
+        'async_rpc': args.async_rpc, 'adaptive_batch': args.adaptive_batch, 'target_latency': args.target_latency,
+        'max_reply_mb': args.max_reply_mb, 'memory_budget_mb': args.memory_budget_mb,
+        'checkpoint_path': args.checkpoint, 'resume': args.resume, 'checkpoint_interval': args.checkpoint_interval
+    }
+    
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint')
+    if args.end is None and not args.follow:
+        parser.error('--end is required unless --follow is given')
+    if args.follow and (args.checkpoint or args.shards > 1):
+        parser.error('--follow keeps its own state (--follow-state) and cannot be combined with --checkpoint or --shards')
+    
+    if args.status_file:
+        options['progress'] = ProgressFile(args.status_file)
+    
+    if args.output == 'ndjson':
+        # Every thread's prints go to stderr so stdout carries nothing but records
+        options['events'] = ndjson_writer(sys.stdout)
+        sys.stdout = sys.stderr
+    
+    run_analysis(args.start, args.end, args.shards, args.chunk_memo, args.memo_path, args.chunk_size,
+                 args.follow, args.follow_state, args.poll_interval, args.reorg_depth, args.notify_port, **options)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import sqlite3
+from job_queue import create_table as create_job_queue_table
 
 def init_database():
     """Initialize the SQLite database with required tables."""
@@ -38,10 +39,20 @@ def init_database():
             num_inputs INTEGER,
             is_special BOOLEAN,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            num_outputs INTEGER,
+            is_coinbase BOOLEAN DEFAULT FALSE,
             FOREIGN KEY (job_id) REFERENCES analysis_jobs (id)
         )
     ''')
     
+    # Create analysis_results indexes
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_job_block ON analysis_results (job_id, block_number)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_job_zeros ON analysis_results (job_id, leading_zeros)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_job_special ON analysis_results (job_id, is_special, block_number)')
+    
+    # Create the persistent job queue
+    create_job_queue_table(cursor)
+    
     conn.commit()
     conn.close()
     print("Database initialized successfully!")
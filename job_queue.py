@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Durable priority queue of analysis jobs in the web app's SQLite database.
+
+Queued jobs are rows of the job_queue table, so they survive a restart of
+the app. get() hands out the job with the highest priority, and among equal
+priorities the one queued first, with an index seek on
+(priority DESC, id) that costs the same for ten queued jobs as for ten
+thousand. The job parameters stay in analysis_jobs; a queue row only holds
+the job id, its priority and whether the job resumes from its checkpoint.
+
+Worker threads block in get() on a condition that put() notifies, so a
+new job is picked up as soon as it is committed. A job is claimed by
+deleting its row; a claim that deletes nothing lost the race to another
+process and simply tries the next row.
+"""
+
+import threading
+
+import db
+
+# Default priority of a job; higher priorities are dispatched first
+DEFAULT_PRIORITY = 0
+
+
+def create_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL UNIQUE,
+            priority INTEGER NOT NULL DEFAULT 0,
+            resume BOOLEAN DEFAULT FALSE,
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES analysis_jobs (id)
+        )
+    ''')
+    # Dispatch order: highest priority first, first in first out within a priority
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_queue_order ON job_queue (priority DESC, id)')
+
+
+class JobQueue:
+    def __init__(self):
+        self.condition = threading.Condition()
+
+    def put(self, job_id, priority=DEFAULT_PRIORITY, resume=False):
+        """Queue a job and mark it queued; a job that is queued already keeps its place."""
+        with db.transaction() as cursor:
+            cursor.execute('INSERT OR IGNORE INTO job_queue (job_id, priority, resume) VALUES (?, ?, ?)',
+                           (job_id, priority, resume))
+            cursor.execute("UPDATE analysis_jobs SET status = 'queued' WHERE id = ?", (job_id,))
+        with self.condition:
+            self.condition.notify()
+
+    def get(self):
+        """Block until a job is queued, claim it and return (job_id, resume)."""
+        with self.condition:
+            while True:
+                job = self._claim()
+                if job:
+                    return job
+                self.condition.wait()
+
+    def _claim(self):
+        conn = db.get_connection()
+        while True:
+            row = conn.execute('SELECT id, job_id, resume FROM job_queue ORDER BY priority DESC, id LIMIT 1').fetchone()
+            if row is None:
+                return None
+            with conn:
+                claimed = conn.execute('DELETE FROM job_queue WHERE id = ?', (row[0],)).rowcount
+            if claimed:
+                return row[1], bool(row[2])
+
+    def take_overlapping(self, start_block, end_block, limit):
+        """Claim up to limit queued jobs whose ranges overlap start_block..end_block or each other; returns their ids.
+        
+        Only jobs that scan the chain plainly are taken: not resumed from a
+        checkpoint, not sharded and not answered from the txid archive. They
+        are taken in dispatch order, and every taken job widens the range
+        the next one may overlap.
+        """
+        taken = []
+        with self.condition:
+            conn = db.get_connection()
+            while len(taken) < limit:
+                row = conn.execute('''
+                    SELECT q.id, q.job_id, j.start_block, j.end_block
+                    FROM job_queue q JOIN analysis_jobs j ON j.id = q.job_id
+                    WHERE j.start_block <= ? AND j.end_block >= ? AND NOT q.resume
+                          AND COALESCE(j.shards, 1) <= 1 AND COALESCE(j.archive_mode, 'off') != 'read' AND NOT COALESCE(j.follow, 0)
+                    ORDER BY q.priority DESC, q.id
+                    LIMIT 1
+                ''', (end_block, start_block)).fetchone()
+                if row is None:
+                    break
+                with conn:
+                    claimed = conn.execute('DELETE FROM job_queue WHERE id = ?', (row[0],)).rowcount
+                if claimed:
+                    taken.append(row[1])
+                    start_block = min(start_block, row[2])
+                    end_block = max(end_block, row[3])
+        return taken
+
+    def remove(self, job_id):
+        """Take a job out of the queue; returns whether it was queued."""
+        return db.execute('DELETE FROM job_queue WHERE job_id = ?', (job_id,)).rowcount > 0
+
+    def clear(self):
+        db.execute('DELETE FROM job_queue')
+
+    def __len__(self):
+        return db.fetch_one('SELECT COUNT(*) FROM job_queue')[0]
+
+    def peek(self, limit):
+        """Return the next limit queued jobs in dispatch order as (job_id, name, start_block, end_block, priority) rows."""
+        return db.fetch_all('''
+            SELECT q.job_id, j.name, j.start_block, j.end_block, q.priority
+            FROM job_queue q JOIN analysis_jobs j ON j.id = q.job_id
+            ORDER BY q.priority DESC, q.id
+            LIMIT ?
+        ''', (limit,))
+
+    def recover(self):
+        """Queue again the jobs a stopped app left behind; returns how many were added.
+        
+        Jobs that were running are resumed from their checkpoints, and jobs
+        marked queued by an app that kept its queue in memory get a row in
+        the order they were created.
+        """
+        with db.transaction() as cursor:
+            cursor.execute('''
+                INSERT OR IGNORE INTO job_queue (job_id, priority, resume)
+                SELECT id, COALESCE(priority, 0), status = 'running'
+                FROM analysis_jobs
+                WHERE status IN ('queued', 'running') AND NOT COALESCE(follow, 0)
+                ORDER BY created_at, id
+            ''')
+            added = cursor.rowcount
+            cursor.execute("UPDATE analysis_jobs SET status = 'queued' WHERE id IN (SELECT job_id FROM job_queue)")
+        with self.condition:
+            self.condition.notify_all()
+        return added
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Progress channels between the analyzer and whoever watches it.
+
+The analyzer reports its status through a progress callback after every
+batch. The callbacks here are throttled by time: a report is passed on
+when at least PROGRESS_INTERVAL seconds have gone by since the last one,
+and always when it completes the run or carries follow totals, so a long
+scan costs a handful of updates per second however small its batches are.
+
+ProgressBus keeps the latest progress record of every running job in
+memory, one record per job, so concurrent runs never overwrite each
+other. A record is replaced as a whole and never changed in place, which
+lets readers take get() or snapshot() without a lock. ProgressFile writes
+the record to a file for the command line, replacing the file atomically
+so a reader never sees it half written, and ShardProgress puts a shard
+process's block count into a slot of shared memory its parent sums up.
+"""
+
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+
+# Minimum seconds between two progress reports passed on by a channel
+PROGRESS_INTERVAL = float(os.getenv('B1T_PROGRESS_INTERVAL', 0.5))
+
+# Fields of the analyzer's status dict that a job's progress record keeps
+PROGRESS_FIELDS = ('progress', 'current_block', 'phase', 'blocks_processed', 'phases')
+
+
+class ThrottledProgress(ABC):
+    """Progress callback that passes on at most one report per interval to publish(), which subclasses implement."""
+
+    def __init__(self, interval=PROGRESS_INTERVAL):
+        self.interval = interval
+        self.last = None
+
+    def __call__(self, status):
+        now = time.monotonic()
+        forced = status.get('phase') == 'completed' or status.get('totals')
+        if not forced and self.last is not None and now - self.last < self.interval:
+            return
+        self.last = now
+        self.publish(status)
+
+    @abstractmethod
+    def publish(self, status):
+        """Pass status on to the watchers."""
+
+
+class ProgressChannel(ThrottledProgress):
+    """The progress callback of one run on a ProgressBus; a merged run reports to several jobs at once."""
+
+    def __init__(self, bus, records, interval=PROGRESS_INTERVAL):
+        super().__init__(interval)
+        self.bus = bus
+        self.records = records  # key -> the record as it was opened
+
+    def publish(self, status):
+        update = {field: status.get(field) for field in PROGRESS_FIELDS}
+        for key, record in self.records.items():
+            self.bus.records[key] = {**record, **update}
+
+    def close(self):
+        for key in self.records:
+            self.bus.records.pop(key, None)
+
+
+class ProgressBus:
+    def __init__(self):
+        self.records = {}  # key -> latest progress record, in start order
+
+    def open(self, records, interval=PROGRESS_INTERVAL):
+        """Publish the initial {key: record} and return the channel that updates them."""
+        self.records.update(records)
+        return ProgressChannel(self, dict(records), interval)
+
+    def get(self, key):
+        return self.records.get(key)
+
+    def snapshot(self):
+        """Return the current records, oldest run first; copying the dict is a single atomic step."""
+        return list(self.records.copy().values())
+
+
+class ProgressFile(ThrottledProgress):
+    """Writes the latest status to path as JSON, for readers outside the process."""
+
+    def __init__(self, path, interval=PROGRESS_INTERVAL):
+        super().__init__(interval)
+        self.path = path
+
+    def publish(self, status):
+        try:
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(status, f)
+            os.replace(temp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: Could not update status file: {e}")
+
+
+class ShardProgress(ThrottledProgress):
+    """Stores a shard's processed block count in its slot of a shared array."""
+
+    def __init__(self, blocks, index, interval=PROGRESS_INTERVAL):
+        super().__init__(interval)
+        self.blocks = blocks
+        self.index = index
+
+    def publish(self, status):
+        self.blocks[self.index] = max(0, status['blocks_processed'])
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Batch request helpers shared by B1TRPCClient and AsyncB1TRPCClient.
+
+Both clients split a batch that fails at the HTTP level in half instead of
+dropping it, and retry calls answered with a transient JSON-RPC error one
+by one. AdaptiveBatcher sizes block batches so each fetch stays near a
+target latency and reply size, and MemoryBudget keeps the blocks held at
+once within a memory limit.
+"""
+
+import codecs
+import json
+import math
+import threading
+from contextvars import ContextVar
+
+# JSON-RPC errors that a retry cannot fix: -5 not found, -8 invalid parameter,
+# and the protocol errors for invalid requests, unknown methods and bad params
+PERMANENT_RPC_ERRORS = {-5, -8, -32600, -32601, -32602}
+
+# Marks calls whose batch never got an HTTP reply; these are not retried one by one
+HTTP_FAILURE = {'code': None, 'message': 'batch request failed'}
+
+# Reply bytes received by the current thread or task; set by whoever wants to measure a fetch
+reply_bytes = ContextVar('reply_bytes', default=None)
+
+
+def count_reply_bytes(size):
+    counter = reply_bytes.get()
+    if counter is not None:
+        counter[0] += size
+
+
+def batch_payload(calls):
+    return [{'jsonrpc': '2.0', 'method': method, 'params': params or [], 'id': i}
+            for i, (method, params) in enumerate(calls)]
+
+
+def parse_batch_reply(replies, num_calls):
+    """Return (result, error) per call, matched by id; missing replies count as errors."""
+    if not isinstance(replies, list):
+        replies = [replies]
+    by_id = {reply.get('id'): reply for reply in replies if isinstance(reply, dict)}
+    parsed = []
+    for i in range(num_calls):
+        reply = by_id.get(i)
+        if reply is None:
+            parsed.append((None, {'code': None, 'message': 'missing from batch reply'}))
+        elif reply.get('error'):
+            parsed.append((None, reply['error']))
+        else:
+            parsed.append((reply.get('result'), None))
+    return parsed
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array decoded incrementally from byte chunks.
+
+    Only the element being decoded and one chunk are buffered. A reply that
+    is a single object instead of an array is yielded as one element.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    opened = False
+    in_array = False
+    eof = False
+    # After a failed decode, wait until the buffered text doubles before trying again
+    need = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer):
+            if not opened:
+                opened = True
+                if buffer[pos] == '[':
+                    in_array = True
+                    pos += 1
+                    continue
+            if buffer[pos] == ']':
+                return
+            if eof or len(buffer) - pos >= need:
+                try:
+                    element, pos = decoder.raw_decode(buffer, pos)
+                    need = 0
+                    yield element
+                    continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    need = 2 * (len(buffer) - pos)
+        elif eof:
+            if in_array:
+                raise ValueError('Batch reply ended before the closing bracket')
+            return
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buffer = buffer[pos:] + text.decode(b'', final=True)
+        else:
+            count_reply_bytes(len(chunk))
+            buffer = buffer[pos:] + text.decode(chunk)
+        pos = 0
+
+
+def is_retryable(error):
+    return error is not None and error is not HTTP_FAILURE and error.get('code') not in PERMANENT_RPC_ERRORS
+
+
+def failure_budget(num_calls, max_retries):
+    """Consecutive failed requests after which a batch gives up.
+
+    Enough to bisect down to a single bad call and retry it max_retries
+    times, while a node that is down costs only a handful of requests.
+    Once a lone call has used up the budget, the rest of the batch gets one
+    more request before it is given up as well.
+    """
+    return max_retries + math.ceil(math.log2(max(num_calls, 1))) + 1
+
+
+class AdaptiveBatcher:
+    """Picks block batch sizes that keep each fetch near a target latency.
+
+    After every fetch the size moves halfway toward the number of blocks
+    that would have taken target_latency at the observed rate, and that
+    would have stayed under max_reply_bytes, changing by at most 2x per step.
+    """
+
+    def __init__(self, initial_size, target_latency=2.0, max_reply_bytes=32 * 1024 * 1024, min_size=10, max_size=5000):
+        self.size = float(max(min_size, min(initial_size, max_size)))
+        self.target_latency = target_latency
+        self.max_reply_bytes = max_reply_bytes
+        self.min_size = min_size
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.samples = 0
+
+    def next_size(self):
+        with self.lock:
+            return int(self.size)
+
+    def record(self, num_blocks, elapsed, received_bytes):
+        if num_blocks <= 0 or elapsed <= 0 or received_bytes <= 0:
+            return
+        wanted = num_blocks * self.target_latency / elapsed
+        wanted = min(wanted, num_blocks * self.max_reply_bytes / received_bytes)
+        with self.lock:
+            wanted = max(self.size / 2, min(wanted, self.size * 2))
+            self.size = max(self.min_size, min((self.size + wanted) / 2, self.max_size))
+            self.samples += 1
+
+
+def block_memory(txids, counts):
+    """Rough bytes held by one decoded block: txid strings, list slots and count tuples"""
+    return 200 + len(txids) * (121 + (64 if counts is not None else 0))
+
+
+class MemoryBudget:
+    """Caps block batch sizes so the batches held at once fit in budget_mb.
+
+    batches_held is how many batches can be alive together (those in flight
+    plus the one being scanned). The per-block estimate follows increases
+    immediately and decays slowly, so busy chain segments shrink batches
+    before they are fetched.
+    """
+
+    def __init__(self, budget_mb, batches_held, initial_blocks=10):
+        self.budget = budget_mb * 1024 * 1024
+        self.batches_held = max(1, batches_held)
+        self.initial_blocks = initial_blocks
+        self.bytes_per_block = None
+        self.peak_batch_bytes = 0
+        self.lock = threading.Lock()
+
+    def record(self, blocks):
+        if not blocks:
+            return
+        batch_bytes = sum(block_memory(txids, counts) for _, _, txids, counts in blocks)
+        per_block = batch_bytes / len(blocks)
+        with self.lock:
+            self.peak_batch_bytes = max(self.peak_batch_bytes, batch_bytes)
+            if self.bytes_per_block is None:
+                self.bytes_per_block = per_block
+            else:
+                self.bytes_per_block = max(per_block, 0.7 * self.bytes_per_block + 0.3 * per_block)
+
+    def max_blocks(self, size):
+        with self.lock:
+            if self.bytes_per_block is None:
+                return min(size, self.initial_blocks)
+            return max(1, min(size, int(self.budget / (self.batches_held * self.bytes_per_block))))
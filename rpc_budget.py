@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Concurrency budget for RPC requests shared by analyses running side by side.
+
+RPCBudget allows a fixed number of requests in flight across all registered
+jobs. Each job is entitled to an even share of that number; the remainder
+goes to the jobs registered first, and every job gets at least one slot.
+A job may borrow idle slots beyond its share as long as no job below its
+own share is waiting, so a single running job can use the whole budget
+while several jobs each get their part. Shares are recomputed whenever a
+job registers or finishes.
+
+Slots are held per request: B1TRPCClient takes one around every HTTP
+request of a job. A thread that already holds a slot of the job gets
+nested requests through without taking another one, so retries issued
+while a streamed reply is open cannot wait on themselves.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+DEFAULT_RPC_BUDGET = int(os.getenv('B1T_RPC_BUDGET', 16))
+
+
+class RPCShare:
+    """One job's handle on an RPCBudget; pass it to the analyzer as rpc_limiter."""
+
+    def __init__(self, budget, key):
+        self.budget = budget
+        self.key = key
+        self._local = threading.local()
+
+    @contextmanager
+    def slot(self):
+        if getattr(self._local, 'held', 0):
+            self._local.held += 1
+            try:
+                yield
+            finally:
+                self._local.held -= 1
+            return
+
+        self.budget.acquire(self.key)
+        self._local.held = 1
+        try:
+            yield
+        finally:
+            self._local.held = 0
+            self.budget.release(self.key)
+
+    def share(self):
+        return self.budget.share(self.key)
+
+    def close(self):
+        self.budget.unregister(self.key)
+
+
+class RPCBudget:
+    def __init__(self, slots=DEFAULT_RPC_BUDGET):
+        self.slots = max(1, slots)
+        self.condition = threading.Condition()
+        self.jobs = {}  # key -> {'in_flight': n, 'waiting': n, 'requests': n}, in registration order
+        self.in_flight = 0
+
+    def register(self, key):
+        with self.condition:
+            self.jobs[key] = {'in_flight': 0, 'waiting': 0, 'requests': 0}
+            self.condition.notify_all()
+        return RPCShare(self, key)
+
+    def unregister(self, key):
+        with self.condition:
+            self.jobs.pop(key, None)
+            self.condition.notify_all()
+
+    def _share(self, key):
+        base, extra = divmod(self.slots, max(1, len(self.jobs)))
+        position = list(self.jobs).index(key)
+        return max(1, base + (1 if position < extra else 0))
+
+    def share(self, key):
+        with self.condition:
+            return self._share(key) if key in self.jobs else 0
+
+    def _may_acquire(self, key):
+        if self.in_flight >= self.slots:
+            return False
+        if self.jobs[key]['in_flight'] < self._share(key):
+            return True
+        # Borrowing an idle slot is fine unless it would keep a job below its share waiting
+        return not any(job['waiting'] and job['in_flight'] < self._share(other)
+                       for other, job in self.jobs.items() if other != key)
+
+    def acquire(self, key):
+        with self.condition:
+            job = self.jobs[key]
+            job['waiting'] += 1
+            self.condition.wait_for(lambda: self._may_acquire(key))
+            job['waiting'] -= 1
+            job['in_flight'] += 1
+            job['requests'] += 1
+            self.in_flight += 1
+
+    def release(self, key):
+        with self.condition:
+            self.in_flight -= 1
+            job = self.jobs.get(key)
+            if job:
+                job['in_flight'] -= 1
+            self.condition.notify_all()
+
+    def snapshot(self):
+        """Return {key: {'share', 'in_flight', 'requests'}} for the registered jobs."""
+        with self.condition:
+            return {key: {'share': self._share(key), 'in_flight': job['in_flight'], 'requests': job['requests']}
+                    for key, job in self.jobs.items()}
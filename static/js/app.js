@@ -149,8 +149,9 @@ function validateAnalysisForm(event) {
     const endBlock = parseInt(form.end_block.value);
     const batchSize = parseInt(form.batch_size.value);
     
-    // Validate block range
-    if (startBlock >= endBlock) {
+    // Validate block range (follow jobs have no end block)
+    const follow = form.follow && form.follow.checked;
+    if (!follow && startBlock >= endBlock) {
         event.preventDefault();
         showAlert('Der Start-Block muss kleiner als der End-Block sein!', 'danger');
         return false;
@@ -165,7 +166,7 @@ function validateAnalysisForm(event) {
     
     // Warn for large ranges
     const blockCount = endBlock - startBlock + 1;
-    if (blockCount > 100000) {
+    if (!follow && blockCount > 100000) {
         if (!confirm(`You want to analyze ${blockCount.toLocaleString()} blocks. This may take a very long time. Continue?`)) {
             event.preventDefault();
             return false;
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a B1T node's JSON-RPC interface.
+
+Serves a deterministic synthetic chain so the analyzer and the RPC clients
+can be exercised without a real node:
+
+    python3 stub_rpc_node.py --port 18332 --height 5000
+    B1T_RPC_PORT=18332 python3 final_analyzer_rpc.py --start 0 --end 5000
+
+POST /notify mines a block and POST /reorg?depth=N replaces the top N blocks.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import urlopen
+
+
+class StubChain:
+    def __init__(self, height, txs_per_block=20, zero_rate=0.05, seed='b1t'):
+        self.height = height
+        self.txs_per_block = txs_per_block
+        self.zero_rate = zero_rate
+        self.seed = seed
+        self.reorgs = 0
+        self.lock = threading.Lock()
+        self._blocks = {}
+        self._txs = {}
+
+    def _digest(self, *parts):
+        data = ':'.join(str(p) for p in (self.seed, self.reorgs) + parts)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def block(self, height):
+        with self.lock:
+            if height in self._blocks:
+                return self._blocks[height]
+            rng = random.Random(self._digest('rng', height))
+            txs = []
+            for i in range(1 + rng.randrange(self.txs_per_block)):
+                txid = self._digest('tx', height, i)
+                if rng.random() < self.zero_rate:
+                    zeros = rng.randint(2, 6)
+                    txid = '0' * zeros + txid[zeros:]
+                vin = 1 if i == 0 else rng.randint(1, 4)
+                vout = rng.randint(1, 3)
+                txs.append((txid, vin, vout))
+                self._txs[txid] = (height, i, vin, vout)
+            block = {'hash': self._digest('block', height), 'height': height, 'tx': txs}
+            self._blocks[height] = block
+            return block
+
+    def tx(self, txid):
+        with self.lock:
+            return self._txs.get(txid)
+
+    def block_by_hash(self, block_hash):
+        with self.lock:
+            for block in self._blocks.values():
+                if block['hash'] == block_hash:
+                    return block
+        # The hash may come from another node serving the same chain
+        for height in range(self.height + 1):
+            if height not in self._blocks and self.block(height)['hash'] == block_hash:
+                return self._blocks[height]
+        return None
+
+    def advance(self, count=1):
+        with self.lock:
+            self.height += count
+
+    def reorg(self, depth):
+        """Replace the top `depth` blocks with a competing branch."""
+        with self.lock:
+            for height in range(self.height - depth + 1, self.height + 1):
+                block = self._blocks.pop(height, None)
+                if block:
+                    for txid, _, _ in block['tx']:
+                        self._txs.pop(txid, None)
+            self.reorgs += 1
+
+
+def tx_json(txid, vin, vout, coinbase=False):
+    inputs = [{'coinbase': '00'}] if coinbase else [{'txid': '11' * 32, 'vout': n} for n in range(vin)]
+    return {'txid': txid, 'vin': inputs, 'vout': [{'n': n, 'value': 1.0} for n in range(vout)]}
+
+
+def dispatch(chain, method, params):
+    if method == 'getblockcount':
+        return chain.height
+    if method == 'getbestblockhash':
+        return chain.block(chain.height)['hash']
+    if method == 'getblockchaininfo':
+        return {'chain': 'stub', 'blocks': chain.height, 'headers': chain.height, 'verificationprogress': 1.0}
+    if method == 'getblockhash':
+        height = params[0]
+        if height < 0 or height > chain.height:
+            raise LookupError((-8, 'Block height out of range'))
+        return chain.block(height)['hash']
+    if method == 'getblock':
+        block = chain.block_by_hash(params[0])
+        if block is None:
+            raise LookupError((-5, 'Block not found'))
+        verbosity = params[1] if len(params) > 1 else 1
+        confirmations = chain.height - block['height'] + 1
+        result = {'hash': block['hash'], 'height': block['height'], 'confirmations': confirmations}
+        if verbosity == 2:
+            result['tx'] = [tx_json(txid, vin, vout, i == 0) for i, (txid, vin, vout) in enumerate(block['tx'])]
+        else:
+            result['tx'] = [txid for txid, _, _ in block['tx']]
+        return result
+    if method == 'getrawtransaction':
+        found = chain.tx(params[0])
+        if found is None:
+            raise LookupError((-5, 'No such mempool or blockchain transaction'))
+        _, index, vin, vout = found
+        return tx_json(params[0], vin, vout, index == 0)
+    raise LookupError((-32601, 'Method not found'))
+
+
+def make_handler(chain, latency, fail_rate, drop_rate=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path == '/notify':
+                chain.advance()
+                self._reply(b'{}')
+                return
+            if self.path.startswith('/reorg'):
+                depth = int(parse_qs(urlsplit(self.path).query).get('depth', ['1'])[0])
+                chain.reorg(depth)
+                self._reply(json.dumps({'reorged': depth}).encode())
+                return
+            if latency:
+                time.sleep(latency)
+            request = json.loads(body)
+            if isinstance(request, list) and fail_rate and random.random() < fail_rate:
+                self.send_response(500)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if isinstance(request, list):
+                # Dropped entries are simply missing from the batch reply
+                reply = [self._handle(r) for r in request if not (drop_rate and random.random() < drop_rate)]
+            elif drop_rate and random.random() < drop_rate:
+                reply = {'result': None, 'error': {'code': -28, 'message': 'Stub dropped this request'}, 'id': request.get('id')}
+            else:
+                reply = self._handle(request)
+            self._reply(json.dumps(reply).encode())
+
+        def _handle(self, request):
+            try:
+                result = dispatch(chain, request['method'], request.get('params') or [])
+                return {'result': result, 'error': None, 'id': request.get('id')}
+            except LookupError as e:
+                code, message = e.args[0]
+                return {'result': None, 'error': {'code': code, 'message': message}, 'id': request.get('id')}
+
+        def _reply(self, payload):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def serve(port, chain, latency=0.0, fail_rate=0.0, drop_rate=0.0):
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(chain, latency, fail_rate, drop_rate))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stand-in B1T JSON-RPC node serving a synthetic chain')
+    parser.add_argument('--port', type=int, default=18332, help='Port to listen on (default: 18332)')
+    parser.add_argument('--height', type=int, default=10000, help='Initial chain height (default: 10000)')
+    parser.add_argument('--txs-per-block', type=int, default=20, help='Maximum transactions per block (default: 20)')
+    parser.add_argument('--zero-rate', type=float, default=0.05, help='Share of txids forced to have leading zeros')
+    parser.add_argument('--latency', type=float, default=0.0, help='Artificial latency per request in seconds')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of batch requests answered with HTTP 500')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of single requests failed and batch entries left unanswered')
+    parser.add_argument('--seed', default='b1t', help='Chain seed; nodes with different seeds disagree on every block')
+    parser.add_argument('--block-interval', type=float, default=0.0, help='Mine a new block every N seconds')
+    parser.add_argument('--notify-url', default=None, help='POST to this URL after every mined block, like -blocknotify')
+    args = parser.parse_args()
+
+    chain = StubChain(args.height, args.txs_per_block, args.zero_rate, args.seed)
+    server = serve(args.port, chain, args.latency, args.fail_rate, args.drop_rate)
+
+    if args.block_interval > 0:
+        def miner():
+            while True:
+                time.sleep(args.block_interval)
+                chain.advance()
+                if args.notify_url:
+                    try:
+                        urlopen(args.notify_url, data=b'', timeout=5).close()
+                    except OSError:
+                        pass
+        threading.Thread(target=miner, daemon=True).start()
+
+    print(f"Stub RPC node listening on http://127.0.0.1:{args.port} (height {args.height})")
+    server.serve_forever()
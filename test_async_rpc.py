@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import os
+import threading
+
+import db
+import final_analyzer_rpc as analyzer
+from async_rpc import AsyncRPCBridge
+
+
+def test_bridge_calls_share_a_bounded_connection_pool(stub_node):
+    bridge = AsyncRPCBridge(max_connections=2)
+    try:
+        assert bridge.call('getblockcount') == stub_node.height
+        calls = [('getblockhash', [height]) for height in range(20)]
+        futures = [bridge.submit(bridge.client.batch_call(calls)) for _ in range(8)]
+        expected = [stub_node.block(height)['hash'] for height in range(20)]
+        assert all(future.result(10) == expected for future in futures)
+        assert bridge.client.connections_opened <= 2
+    finally:
+        bridge.close()
+
+
+def test_async_client_finds_what_the_threaded_client_finds(stub_node):
+    options = dict(min_zeros=2, batch_size=40, use_cache=False)
+    threaded = analyzer.run_analysis(0, 199, **options)
+    pooled = analyzer.run_analysis(0, 199, async_rpc=True, **options)
+    for key in ('blocks_analyzed', 'transactions_analyzed', 'zero_breakdown', 'special_transactions', 'special_transaction_details'):
+        assert pooled[key] == threaded[key]
+
+
+def test_web_app_threads_use_their_own_session(stub_node, web_db):
+    db.execute('UPDATE rpc_config SET host = ?, port = ?, username = ?, password = ? WHERE id = 1',
+               ('127.0.0.1', int(os.environ['B1T_RPC_PORT']), 'stub', 'stub'))
+    results = {}
+
+    def poll(name):
+        results[name] = (web_db.make_rpc_call('getblockcount'), web_db.rpc_session(), web_db.rpc_session())
+        db.release_connection()
+
+    threads = [threading.Thread(target=poll, args=(name,)) for name in 'ab']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert results['a'][0] == results['b'][0] == stub_node.height
+    assert results['a'][1] is results['a'][2]
+    assert results['a'][1] is not results['b'][1]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import final_analyzer_rpc as analyzer
+from block_cache import BlockCache
+
+
+def txid(n):
+    return f'{n:064x}'
+
+
+def test_blocks_round_trip_with_and_without_counts(tmp_path):
+    cache = BlockCache(str(tmp_path / 'cache.db'))
+    cache.put_blocks([(1, 'aa', [txid(1), txid(2)], None, 10), (2, 'bb', [txid(3)], [(2, 1)], 10)])
+
+    assert cache.get_blocks(0, 3) == {1: ('aa', [txid(1), txid(2)], None), 2: ('bb', [txid(3)], [(2, 1)])}
+    assert list(cache.get_blocks(0, 3, need_counts=True)) == [2]
+    assert (cache.hits, cache.misses) == (3, 5)
+    cache.close()
+
+
+def test_blocks_near_the_tip_are_not_cached(tmp_path):
+    cache = BlockCache(str(tmp_path / 'cache.db'), min_confirmations=6)
+    cache.put_blocks([(1, 'aa', [txid(1)], None, 6), (2, 'bb', [txid(2)], None, 5)])
+    assert list(cache.get_blocks(1, 2)) == [1]
+    cache.close()
+
+
+def test_known_counts_survive_a_refetch_but_not_a_reorg(tmp_path):
+    cache = BlockCache(str(tmp_path / 'cache.db'))
+    cache.put_blocks([(1, 'aa', [txid(1)], [(1, 2)], 10)])
+    cache.put_blocks([(1, 'aa', [txid(1)], None, 10)])
+    assert cache.get_blocks(1, 1) == {1: ('aa', [txid(1)], [(1, 2)])}
+
+    cache.put_blocks([(1, 'cc', [txid(9)], None, 10)])
+    assert cache.get_blocks(1, 1) == {1: ('cc', [txid(9)], None)}
+    cache.close()
+
+
+def test_least_recently_used_blocks_are_evicted(tmp_path):
+    cache = BlockCache(str(tmp_path / 'cache.db'))
+    cache.max_bytes = 10 * 32
+    cache.put_blocks([(height, f'{height}', [txid(height)] * 4, None, 10) for height in range(2)])
+    cache.put_tx_counts([(txid(0), 0, 1, 1)])
+    cache.get_blocks(0, 0)
+    cache.put_blocks([(2, '2', [txid(2)] * 4, None, 10)])
+
+    assert sorted(cache.get_blocks(0, 2)) == [0, 2]
+    assert cache.total_bytes == 8 * 32
+    assert cache.get_tx_counts([txid(0)]) == {txid(0): (1, 1)}
+    cache.close()
+
+
+def test_a_second_scan_reads_confirmed_blocks_from_the_cache(stub_node, tmp_path, monkeypatch):
+    requested = []
+    iter_batch = analyzer.B1TRPCClient.iter_batch
+
+    def record(self, calls):
+        requested.extend(params[0] for _, params in calls)
+        return iter_batch(self, calls)
+
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'iter_batch', record)
+    options = dict(min_zeros=2, batch_size=50, use_cache=True, cache_path=str(tmp_path / 'cache.db'))
+    first = analyzer.run_analysis(0, stub_node.height, **options)
+    assert len(requested) == stub_node.height + 1
+
+    requested.clear()
+    second = analyzer.run_analysis(0, stub_node.height, **dict(options, min_zeros=3))
+    # Only the blocks with fewer than six confirmations are fetched again
+    assert len(requested) == 5
+    assert second['zero_breakdown'] == {zeros: count for zeros, count in first['zero_breakdown'].items() if int(zeros) >= 3}
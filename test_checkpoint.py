@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import json
+
+import pytest
+
+import final_analyzer_rpc as analyzer
+from checkpoint import Checkpoint
+
+
+OPTIONS = dict(min_zeros=2, min_inputs=2, batch_size=25, use_cache=False, show_all_zeros=True)
+COMPARED = ('blocks_analyzed', 'transactions_analyzed', 'coinbase_transactions', 'multi_input_transactions', 'zero_breakdown',
+            'special_transactions', 'special_transaction_details', 'zero_transaction_details')
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_resume_cuts_the_log_back_to_the_last_save(tmp_path):
+    path = str(tmp_path / 'run.json')
+    checkpoint = Checkpoint(path, {'start_block': 0}, interval=0)
+    checkpoint.open_log(fresh=True)
+    checkpoint.candidate([1, 'aa', 3])
+    checkpoint.save({'phase': 'phase1', 'next_height': 2})
+    checkpoint.candidate([2, 'bb', 4])
+    checkpoint.close()
+
+    state, records = Checkpoint(path, {'start_block': 0}).load()
+    assert state['next_height'] == 2
+    assert records == [['c', 1, 'aa', 3]]
+    with open(path + '.candidates') as log:
+        assert [json.loads(line) for line in log] == records
+
+
+def test_a_checkpoint_of_other_parameters_is_refused(tmp_path):
+    path = str(tmp_path / 'run.json')
+    checkpoint = Checkpoint(path, {'start_block': 0}, interval=0)
+    checkpoint.open_log(fresh=True)
+    checkpoint.save({'phase': 'phase1', 'next_height': 0})
+    checkpoint.close()
+    with pytest.raises(ValueError, match='start_block'):
+        Checkpoint(path, {'start_block': 5}).load()
+
+
+def test_an_interrupted_phase1_resumes_to_the_same_result(stub_node, tmp_path, monkeypatch):
+    expected = analyzer.run_analysis(0, 199, **OPTIONS)
+    path = str(tmp_path / 'run.json')
+    fetch_block_batch = analyzer.fetch_block_batch
+
+    def interrupt(rpc, batch_start, *args, **kwargs):
+        if batch_start >= 100:
+            raise Interrupted()
+        return fetch_block_batch(rpc, batch_start, *args, **kwargs)
+
+    monkeypatch.setattr(analyzer, 'fetch_block_batch', interrupt)
+    with pytest.raises(Interrupted):
+        analyzer.run_analysis(0, 199, checkpoint_path=path, checkpoint_interval=0, pipeline_depth=1, **OPTIONS)
+    with open(path) as f:
+        state = json.load(f)
+    assert state['phase'] == 'phase1' and state['next_height'] == 100
+
+    monkeypatch.setattr(analyzer, 'fetch_block_batch', fetch_block_batch)
+    resumed = analyzer.run_analysis(0, 199, checkpoint_path=path, checkpoint_interval=0, resume=True, **OPTIONS)
+    for key in COMPARED:
+        assert resumed[key] == expected[key]
+    assert not (tmp_path / 'run.json').exists()
+
+
+def test_an_interrupted_phase2_resumes_without_resolving_twice(stub_node, tmp_path, monkeypatch):
+    expected = analyzer.run_analysis(0, 199, **OPTIONS)
+    path = str(tmp_path / 'run.json')
+    resolve_transactions = analyzer.resolve_transactions
+    resolved = []
+
+    def interrupt(rpc, candidates, cache=None):
+        if resolved:
+            raise Interrupted()
+        resolved.extend(candidate[2] for candidate in candidates)
+        return resolve_transactions(rpc, candidates, cache)
+
+    monkeypatch.setattr(analyzer, 'resolve_transactions', interrupt)
+    with pytest.raises(Interrupted):
+        analyzer.run_analysis(0, 199, checkpoint_path=path, checkpoint_interval=0, **OPTIONS)
+    with open(path) as f:
+        assert json.load(f)['phase'] == 'phase2'
+
+    def record(rpc, candidates, cache=None):
+        assert not {candidate[2] for candidate in candidates} & set(resolved)
+        return resolve_transactions(rpc, candidates, cache)
+
+    monkeypatch.setattr(analyzer, 'resolve_transactions', record)
+    resumed = analyzer.run_analysis(0, 199, checkpoint_path=path, checkpoint_interval=0, resume=True, **OPTIONS)
+    for key in COMPARED:
+        assert resumed[key] == expected[key]
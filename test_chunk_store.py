@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import final_analyzer_rpc as analyzer
+from chunk_store import ChunkStore
+
+
+def candidate(height, zeros, inputs=1):
+    return (height, 1, f'{height:02x}' * 32, zeros, inputs, 2)
+
+
+def test_chunks_split_a_range_along_chunk_boundaries(tmp_path):
+    store = ChunkStore(str(tmp_path / 'memo.db'), chunk_size=100)
+    assert store.chunks(150, 420) == [(100, 150, 199), (200, 200, 299), (300, 300, 399), (400, 400, 420)]
+    assert store.chunks(200, 299) == [(200, 200, 299)]
+    store.close()
+
+
+def test_stored_facts_come_back_for_jobs_at_or_above_their_floor(tmp_path):
+    store = ChunkStore(str(tmp_path / 'memo.db'), chunk_size=4)
+    store.put_chunk(4, 2, [1, 2, 3, 4], [candidate(5, 2), candidate(7, 4, inputs=3)])
+
+    assert store.get_chunks(0, 11, 3) == {4: ([1, 2, 3, 4], [candidate(5, 2), candidate(7, 4, inputs=3)])}
+    assert store.get_chunks(0, 11, 1) == {}
+    assert store.get_chunks(8, 11, 3) == {}
+    store.close()
+
+
+def test_only_a_lower_floor_replaces_a_stored_chunk(tmp_path):
+    store = ChunkStore(str(tmp_path / 'memo.db'), chunk_size=4)
+    store.put_chunk(0, 2, [1, 1, 1, 1], [candidate(0, 2)])
+    store.put_chunk(0, 3, [1, 1, 1, 1], [])
+    store.put_chunk(0, 2, [1, 1, 1, 1], [])
+    assert store.stored == 1
+    assert store.get_chunks(0, 3, 2)[0][1] == [candidate(0, 2)]
+
+    store.put_chunk(0, 1, [1, 1, 1, 1], [candidate(0, 2), candidate(2, 1)])
+    assert store.stored == 2
+    assert store.get_chunks(0, 3, 1)[0][1] == [candidate(0, 2), candidate(2, 1)]
+    store.close()
+
+
+def test_merged_jobs_report_their_memo_hits(stub_node, tmp_path):
+    memo_path = str(tmp_path / 'memo.db')
+    filters = {'min_zeros': 2, 'min_inputs': 1, 'exclude_coinbase': False, 'show_all_zeros': False}
+    options = dict(chunk_memo=True, memo_path=memo_path, chunk_size=50, batch_size=50, use_cache=False)
+
+    # Blocks 0..99 are confirmed on the 300 block stub chain and get stored as two chunks with a floor of 2 zeros
+    first = analyzer.run_analysis(0, 99, min_zeros=2, **options)
+    assert (first['memo_hit_blocks'], first['memo_chunks_stored']) == (0, 2)
+
+    jobs = {'a': {'start_block': 0, 'end_block': 149, **filters}, 'b': {'start_block': 75, 'end_block': 199, **filters}}
+    merged = analyzer.run_merged_analysis(jobs, **options)
+    assert (merged['a']['memo_hit_blocks'], round(merged['a']['memo_hit_ratio'], 1)) == (100, 66.7)
+    assert (merged['b']['memo_hit_blocks'], merged['b']['memo_chunks_stored']) == (25, 2)
+
+    separate = analyzer.run_analysis(0, 149, **dict(options, memo_path=str(tmp_path / 'other.db')))
+    assert merged['a']['special_transactions'] == separate['special_transactions']
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import sqlite3
+import threading
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'pool.db'))
+    monkeypatch.setattr(db, '_pool', [])
+    monkeypatch.setattr(db, '_local', threading.local())
+    yield db._pool
+    db.release_connection()
+
+
+def in_thread(function):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join(5)
+    return result[0]
+
+
+def test_a_thread_keeps_its_connection_until_it_releases_it(pool):
+    conn = db.get_connection()
+    assert db.get_connection() is conn
+    assert in_thread(db.get_connection) is not conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    db.release_connection()
+    assert pool == [conn]
+    assert in_thread(db.get_connection) is conn
+    assert pool == []
+
+
+def test_release_rolls_back_and_the_pool_is_capped(pool, monkeypatch):
+    monkeypatch.setattr(db, 'POOL_SIZE', 1)
+    db.execute('CREATE TABLE items (name TEXT)')
+    conn = db.get_connection()
+    conn.execute("INSERT INTO items VALUES ('uncommitted')")
+    db.release_connection()
+    assert db.fetch_all('SELECT name FROM items') == []
+
+    # The pool is full, so the next connection released is closed instead of kept
+    conn = db.get_connection()
+    assert pool == []
+    spare = db.connect()
+    pool.append(spare)
+    db.release_connection()
+    assert pool == [spare]
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
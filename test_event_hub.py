@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import json
+import threading
+
+import db
+from event_hub import EventHub
+
+
+def test_only_changed_values_bump_the_version():
+    hub = EventHub()
+    assert hub.publish('status', {'running': False})
+    assert not hub.publish('status', {'running': False})
+    assert hub.publish('queue', [])
+    assert hub.publish('status', {'running': True})
+
+    version, changes = hub.changes(0, 0)
+    assert version == 3
+    assert {topic: json.loads(text) for topic, text in changes.items()} == {'status': {'running': True}, 'queue': []}
+    assert hub.changes(2, 0) == (3, {'status': '{"running": true}'})
+    assert hub.changes(3, 0) == (3, {})
+
+
+def test_a_waiting_subscriber_wakes_on_a_change():
+    hub = EventHub()
+    received = []
+    waiter = threading.Thread(target=lambda: received.append(hub.changes(0, 5)))
+    waiter.start()
+    hub.publish('chain', {'height': 7})
+    waiter.join(5)
+    assert received == [(1, {'chain': '{"height": 7}'})]
+
+
+def test_stream_starts_with_every_requested_topic(web_db, monkeypatch):
+    hub = EventHub()
+    monkeypatch.setattr(web_db, 'event_hub', hub)
+    monkeypatch.setattr(web_db, 'start_event_publishers', lambda: None)
+    hub.publish('status', {'running': False})
+    hub.publish('chain', {'height': 7})
+
+    response = web_db.app.test_client().get('/api/events?topics=chain')
+    chunks = iter(response.response)
+    assert next(chunks) == b'retry: 5000\n\n'
+    assert next(chunks) == b'event: chain\ndata: {"height": 7}\n\n'
+    assert hub.subscribers == 1
+    response.close()
+    assert hub.subscribers == 0
+
+    assert web_db.app.test_client().get('/api/events?topics=chain,nope').status_code == 400
+
+
+def test_a_queued_job_page_listens_for_its_progress(web_db):
+    db.execute("INSERT INTO analysis_jobs (name, start_block, end_block, status) VALUES ('waiting', 0, 99, 'queued')")
+    page = web_db.app.test_client().get('/job/1').get_data(as_text=True)
+    assert 'class="row mb-4 d-none" id="progress-card"' in page
+    assert "onStatusEvent('status', updateProgress)" in page
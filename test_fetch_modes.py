@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import pytest
+
+import final_analyzer_rpc as analyzer
+
+
+@pytest.fixture
+def rpc_methods(monkeypatch):
+    """Names of the RPC methods the threaded client sends, one entry per call."""
+    methods = []
+    batch_call = analyzer.B1TRPCClient.batch_call
+    call = analyzer.B1TRPCClient.call
+
+    def record_batch(self, calls):
+        methods.extend(method for method, _ in calls)
+        return batch_call(self, calls)
+
+    def record_call(self, method, params=None):
+        methods.append(method)
+        return call(self, method, params)
+
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'batch_call', record_batch)
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'call', record_call)
+    return methods
+
+
+OPTIONS = dict(min_zeros=2, min_inputs=2, batch_size=25, use_cache=False, show_all_zeros=True)
+COMPARED = ('transactions_analyzed', 'coinbase_transactions', 'multi_input_transactions', 'zero_breakdown',
+            'special_transactions', 'special_transaction_details', 'zero_transaction_details')
+
+
+def test_single_pass_needs_no_transaction_lookups(stub_node, rpc_methods):
+    two_phase = analyzer.run_analysis(0, 199, **OPTIONS)
+    assert 'getrawtransaction' in rpc_methods
+
+    rpc_methods.clear()
+    single_pass = analyzer.run_analysis(0, 199, fetch_mode='single-pass', **OPTIONS)
+    assert 'getrawtransaction' not in rpc_methods
+    for key in COMPARED:
+        assert single_pass[key] == two_phase[key]
+
+
+def test_auto_mode_switches_on_candidate_density(stub_node, rpc_methods):
+    options = dict(OPTIONS, pipeline_depth=1)
+    two_phase = analyzer.run_analysis(0, 199, **options)
+    two_phase_lookups = rpc_methods.count('getrawtransaction')
+
+    lookups = {}
+    for auto_density in (0.0, 1.0):
+        rpc_methods.clear()
+        auto = analyzer.run_analysis(0, 199, fetch_mode='auto', auto_density=auto_density, **options)
+        lookups[auto_density] = rpc_methods.count('getrawtransaction')
+        for key in COMPARED:
+            assert auto[key] == two_phase[key]
+
+    # Only the first batch, fetched before any density is known, needs lookups once every batch counts as dense
+    assert lookups[1.0] == two_phase_lookups
+    assert 0 < lookups[0.0] < two_phase_lookups / 2
+
+
+def test_unknown_fetch_modes_are_rejected():
+    with pytest.raises(ValueError):
+        analyzer.run_analysis(0, 10, fetch_mode='three-phase')
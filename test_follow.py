@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import json
+import threading
+
+import final_analyzer_rpc as analyzer
+
+
+def test_follow_reports_checkpoint_before_saving_its_tip(stub_node, tmp_path):
+    """Consumers hear of every step before the saved follow state moves past it."""
+    state_path = tmp_path / 'follow.json'
+    stop = threading.Event()
+    checkpoints = []
+
+    def events(event):
+        if event['event'] == 'checkpoint':
+            saved = json.loads(state_path.read_text())['tip'] if state_path.exists() else None
+            checkpoints.append((event['tip'], saved))
+            stop.set()
+
+    stats, _, _ = analyzer.follow_chain(0, state_path=str(state_path), poll_interval=0.1, reorg_depth=10, stop=stop,
+                                        events=events, batch_size=50, use_cache=False)
+
+    assert checkpoints == [(stub_node.height, None)]
+    assert json.loads(state_path.read_text())['tip'] == stub_node.height
+    assert stats['blocks_analyzed'] == stub_node.height + 1
+
+
+def test_follow_rolls_back_a_reorg(stub_node, tmp_path):
+    state_path = str(tmp_path / 'follow.json')
+    stop = threading.Event()
+    events = []
+
+    def record(event):
+        events.append(event)
+        if event['event'] == 'checkpoint':
+            stop.set()
+
+    options = dict(poll_interval=0.1, reorg_depth=10, events=record, batch_size=50, use_cache=False)
+    analyzer.follow_chain(0, state_path=state_path, stop=stop, **options)
+    stub_node.reorg(3)
+    stop.clear()
+    analyzer.follow_chain(0, state_path=state_path, stop=stop, **options)
+
+    rollbacks = [event for event in events if event['event'] == 'rollback']
+    assert len(rollbacks) == 1
+    assert rollbacks[0]['last'] == stub_node.height
+    assert rollbacks[0]['first'] <= stub_node.height - 2
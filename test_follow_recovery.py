@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import threading
+
+import db
+
+
+def test_follow_job_restarts_after_restart(web_db, monkeypatch):
+    """A follow job left 'running' by a stopped app is restarted at startup and can be stopped again."""
+    app = web_db
+
+    # The previous run of the app died while these jobs were running
+    db.execute('''
+        INSERT INTO analysis_jobs (name, start_block, end_block, status, follow, fetch_mode)
+        VALUES ('tip watch', 100, 250, 'running', 1, 'two-phase'), ('range', 0, 99, 'running', 0, 'two-phase')
+    ''')
+
+    started = []
+    finished = threading.Event()
+
+    def run_follow_job(job_id, name, start_block, *options):
+        # Stands in for the analyzer: runs until stopped, like the real follow thread
+        started.append((job_id, name, start_block))
+        stop = options[-1]
+        stop.wait(10)
+        with app.follow_lock:
+            app.follow_jobs.pop(job_id, None)
+        finished.set()
+
+    monkeypatch.setattr(app, 'run_follow_job', run_follow_job)
+
+    assert app.recover_follow_jobs() == 1
+    with app.follow_lock:
+        stop = app.follow_jobs.get(1)
+    assert stop is not None
+    assert 2 not in app.follow_jobs
+
+    # The restarted job is a running follow job again, so the Stop button works
+    response = app.app.test_client().post('/job/1/stop')
+    assert response.status_code == 302
+    assert stop.is_set()
+
+    assert finished.wait(5)
+    assert started == [(1, 'tip watch', 100)]
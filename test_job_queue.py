@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import threading
+
+import db
+from job_queue import JobQueue
+
+
+def add_job(name, start_block=0, end_block=99, status='pending', **columns):
+    names = ', '.join(['name', 'start_block', 'end_block', 'status', *columns])
+    values = (name, start_block, end_block, status, *columns.values())
+    return db.execute(f"INSERT INTO analysis_jobs ({names}) VALUES ({', '.join('?' * len(values))})", values).lastrowid
+
+
+def test_higher_priorities_first_then_first_queued_first(web_db):
+    queue = JobQueue()
+    low, first, second, high = (add_job(name) for name in ('low', 'first', 'second', 'high'))
+    queue.put(low, priority=-1)
+    queue.put(first)
+    queue.put(second)
+    queue.put(high, priority=5)
+    queue.put(first, priority=9)
+
+    assert [row[0] for row in queue.peek(10)] == [high, first, second, low]
+    assert db.fetch_one('SELECT status FROM analysis_jobs WHERE id = ?', (low,))[0] == 'queued'
+    # A new queue object, as after a restart, sees the same jobs
+    queue = JobQueue()
+    assert [queue.get()[0] for _ in range(len(queue))] == [high, first, second, low]
+    assert len(queue) == 0
+
+
+def test_remove_takes_a_job_out(web_db):
+    queue = JobQueue()
+    job = add_job('job')
+    queue.put(job)
+    assert queue.remove(job)
+    assert not queue.remove(job)
+    assert len(queue) == 0
+
+
+def test_a_waiting_worker_gets_the_next_job(web_db):
+    queue = JobQueue()
+    claimed = []
+
+    def worker():
+        claimed.append(queue.get())
+        db.release_connection()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    queue.put(add_job('job'), resume=True)
+    thread.join(5)
+    assert claimed == [(1, True)]
+
+
+def test_recover_resumes_running_jobs_and_requeues_queued_ones(web_db):
+    queued = add_job('queued', status='queued', priority=2)
+    running = add_job('running', status='running')
+    add_job('done', status='completed')
+    add_job('following', status='running', follow=True)
+
+    queue = JobQueue()
+    assert queue.recover() == 2
+    assert queue.get() == (queued, False)
+    assert queue.get() == (running, True)
+    assert db.fetch_one('SELECT status FROM analysis_jobs WHERE id = ?', (running,))[0] == 'queued'
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import pytest
+
+import db
+import final_analyzer_rpc as analyzer
+from job_queue import JobQueue
+
+
+def add_job(name, start_block, end_block, **columns):
+    names = ', '.join(['name', 'start_block', 'end_block', *columns])
+    values = (name, start_block, end_block, *columns.values())
+    return db.execute(f"INSERT INTO analysis_jobs ({names}) VALUES ({', '.join('?' * len(values))})", values).lastrowid
+
+
+COMPARED = ('blocks_analyzed', 'transactions_analyzed', 'coinbase_transactions', 'multi_input_transactions', 'zero_breakdown',
+            'special_transactions', 'special_transaction_details', 'zero_transaction_details')
+
+
+def test_a_merged_scan_gives_each_job_its_separate_result(stub_node):
+    jobs = {
+        'wide': {'start_block': 0, 'end_block': 149, 'min_zeros': 2, 'min_inputs': 1, 'exclude_coinbase': False, 'show_all_zeros': True},
+        'strict': {'start_block': 100, 'end_block': 249, 'min_zeros': 4, 'min_inputs': 3, 'exclude_coinbase': True, 'show_all_zeros': False},
+    }
+    events = []
+    jobs['strict']['events'] = events.append
+    merged = analyzer.run_merged_analysis(jobs, batch_size=50, use_cache=False)
+
+    wide = analyzer.run_analysis(0, 149, min_zeros=2, min_inputs=1, exclude_coinbase=False, show_all_zeros=True, batch_size=50, use_cache=False)
+    for key in COMPARED:
+        assert merged['wide'][key] == wide[key]
+    strict = analyzer.run_analysis(100, 249, min_zeros=4, min_inputs=3, exclude_coinbase=True, batch_size=50, use_cache=False)
+    assert events[-1]['event'] == 'summary'
+    for key in ('blocks_analyzed', 'transactions_analyzed', 'special_transactions'):
+        assert events[-1][key] == merged['strict'][key] == strict[key]
+    assert [event['hash'] for event in events if event['event'] == 'special'] == [tx['hash'] for tx in strict['special_transaction_details']]
+
+
+def test_job_ranges_with_a_gap_are_rejected(stub_node):
+    filters = {'min_zeros': 2, 'min_inputs': 1, 'exclude_coinbase': False, 'show_all_zeros': False}
+    jobs = {'a': {'start_block': 0, 'end_block': 49, **filters}, 'b': {'start_block': 51, 'end_block': 99, **filters}}
+    with pytest.raises(ValueError, match='gap after block 49'):
+        analyzer.run_merged_analysis(jobs)
+    with pytest.raises(ValueError):
+        analyzer.run_merged_analysis(jobs, histogram_only=True)
+
+
+def test_queued_jobs_that_overlap_are_taken_together(web_db):
+    queue = JobQueue()
+    chained = add_job('chained', 150, 300)
+    overlapping = add_job('overlapping', 50, 160)
+    sharded = add_job('sharded', 0, 100, shards=2)
+    apart = add_job('apart', 500, 600)
+    resumed = add_job('resumed', 0, 100)
+    low = add_job('low', 0, 100)
+    for job in (chained, overlapping, sharded, apart):
+        queue.put(job)
+    queue.put(resumed, resume=True)
+    queue.put(low, priority=-1)
+
+    # Taken in dispatch order: 'chained' only overlaps once 'overlapping' has widened the range
+    assert queue.take_overlapping(0, 100, 2) == [overlapping, chained]
+    assert queue.take_overlapping(0, 100, 5) == [low]
+    assert [row[0] for row in queue.peek(10)] == [sharded, apart, resumed]
+    assert db.fetch_one('SELECT COUNT(*) FROM job_queue')[0] == 3
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import io
+import json
+import os
+import subprocess
+import sys
+
+import final_analyzer_rpc as analyzer
+
+ANALYZER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'final_analyzer_rpc.py')
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+def test_records_are_flushed_at_batches_checkpoints_and_the_summary():
+    stream = CountingStream()
+    write = analyzer.ndjson_writer(stream, flush_interval=3600)
+    write({'event': 'special', 'hash': 'aa'})
+    write({'event': 'zero', 'hash': 'bb'})
+    assert stream.flushes == 0
+    write({'event': 'batch', 'first': 0, 'last': 9})
+    write({'event': 'checkpoint', 'phase': 'phase1', 'next_height': 10})
+    write({'event': 'summary', 'blocks_analyzed': 10})
+    assert stream.flushes == 3
+
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)['event'] for line in lines] == ['special', 'zero', 'batch', 'checkpoint', 'summary']
+    assert all(' ' not in line for line in lines)
+
+
+def test_records_between_batches_are_flushed_after_the_interval():
+    stream = CountingStream()
+    write = analyzer.ndjson_writer(stream, flush_interval=0)
+    write({'event': 'special', 'hash': 'aa'})
+    assert stream.flushes == 1
+
+
+def test_command_line_writes_only_records_to_stdout(stub_node):
+    completed = subprocess.run([sys.executable, ANALYZER, '--start', '0', '--end', '99', '--batch-size', '50', '--no-cache',
+                                '--status-file', '', '--output', 'ndjson'], capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    records = [json.loads(line) for line in completed.stdout.splitlines()]
+    assert [record['event'] for record in records if record['event'] == 'batch'] == ['batch', 'batch']
+    assert records[-1]['event'] == 'summary'
+    assert records[-1]['blocks_analyzed'] == 100
+    assert '=== PHASE 2' in completed.stderr
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import pytest
+
+import final_analyzer_rpc as analyzer
+
+
+def expected_specials(chain, first, last, min_zeros, min_inputs=1):
+    """The special transactions of first..last as (block, txid), read straight from the stub chain."""
+    specials = []
+    for height in range(first, last + 1):
+        for txid, vin, _ in chain.block(height)['tx']:
+            if len(txid) - len(txid.lstrip('0')) >= min_zeros and vin >= min_inputs:
+                specials.append((height, txid))
+    return specials
+
+
+def test_batches_arrive_in_height_order_while_several_are_in_flight(stub_node):
+    rpc = analyzer.B1TRPCClient()
+    batches = list(analyzer.iter_block_batches(rpc, 5, 104, batch_size=7, pipeline_depth=4))
+    assert [(first, last) for first, last, _, _ in batches] == [(first, min(first + 6, 104)) for first in range(5, 105, 7)]
+    heights = [block[0] for _, _, _, blocks in batches for block in blocks]
+    assert heights == list(range(5, 105))
+    assert all(block[1] == stub_node.block(block[0])['hash'] for _, _, _, blocks in batches for block in blocks)
+
+
+@pytest.mark.parametrize('pipeline_depth', [1, 4])
+def test_pipeline_depth_does_not_change_the_results(stub_node, pipeline_depth):
+    result = analyzer.run_analysis(0, 249, min_zeros=2, batch_size=20, pipeline_depth=pipeline_depth, use_cache=False)
+    assert result['blocks_analyzed'] == 250
+    found = [(tx['block'], tx['hash']) for tx in result['special_transaction_details']]
+    assert found == expected_specials(stub_node, 0, 249, 2)
+
+
+@pytest.mark.parametrize('phase2_workers, stream_queue_size', [(1, 1), (3, 10000)])
+def test_streamed_phase_two_matches_the_two_phase_run(stub_node, phase2_workers, stream_queue_size):
+    options = dict(min_zeros=2, batch_size=20, use_cache=False, show_all_zeros=True)
+    two_phase = analyzer.run_analysis(0, 249, **options)
+    streamed = analyzer.run_analysis(0, 249, stream=True, phase2_workers=phase2_workers, stream_queue_size=stream_queue_size, **options)
+    for key in ('transactions_analyzed', 'zero_breakdown', 'special_transactions', 'special_transaction_details', 'zero_transaction_details'):
+        assert streamed[key] == two_phase[key]
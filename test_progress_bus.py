@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import json
+
+import pytest
+
+from progress_bus import ProgressBus, ProgressFile, ShardProgress, ThrottledProgress
+
+
+def status(blocks, phase='phase1', **fields):
+    return {'progress': blocks / 10, 'current_block': blocks, 'phase': phase, 'blocks_processed': blocks, **fields}
+
+
+def test_throttled_progress_needs_publish():
+    with pytest.raises(TypeError):
+        ThrottledProgress()
+
+
+def test_reports_within_the_interval_are_dropped_but_completion_is_not():
+    blocks = [0]
+    progress = ShardProgress(blocks, 0, interval=3600)
+    progress(status(1))
+    progress(status(2))
+    assert blocks == [1]
+    progress(status(3, phase='completed'))
+    assert blocks == [3]
+    progress(status(4, totals={'blocks_analyzed': 4}))
+    assert blocks == [4]
+
+
+def test_bus_keeps_one_record_per_job():
+    bus = ProgressBus()
+    first = bus.open({1: {'job_id': 1}}, interval=0)
+    second = bus.open({2: {'job_id': 2}, 3: {'job_id': 3}}, interval=0)
+    first(status(5))
+    second(status(7))
+
+    assert bus.get(1) == {'job_id': 1, **status(5), 'phases': None}
+    assert [record['current_block'] for record in bus.snapshot()] == [5, 7, 7]
+
+    second.close()
+    assert [record['job_id'] for record in bus.snapshot()] == [1]
+    assert bus.get(2) is None
+
+
+def test_progress_file_holds_the_latest_status(tmp_path):
+    path = tmp_path / 'status.json'
+    progress = ProgressFile(str(path), interval=0)
+    progress(status(2))
+    progress(status(9))
+    assert json.loads(path.read_text()) == status(9)
+    assert [entry.name for entry in tmp_path.iterdir()] == ['status.json']
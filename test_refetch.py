@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+from collections import Counter
+
+import final_analyzer_rpc as analyzer
+
+
+class GappyRPC:
+    """Stands in for a client whose batch replies leave out the calls gaps() picks."""
+
+    def __init__(self, chain, gaps):
+        self.chain = chain
+        self.gaps = gaps
+
+    def batch_call(self, calls):
+        results = []
+        for method, params in calls:
+            if self.gaps(method, params):
+                results.append(None)
+            elif method == 'getblockhash':
+                results.append(self.chain.block(params[0])['hash'])
+            else:
+                block = self.chain.block_by_hash(params[0])
+                results.append({'tx': [txid for txid, _, _ in block['tx']], 'confirmations': 10})
+        return results
+
+
+def test_missing_replies_never_shift_blocks_to_other_heights(stub_node):
+    hash_of_5 = stub_node.block(5)['hash']
+    rpc = GappyRPC(stub_node, lambda method, params: params[0] in (2, hash_of_5))
+    _, _, _, blocks = analyzer.fetch_block_batch(rpc, 0, 9)
+    assert [block[0] for block in blocks] == [0, 1, 3, 4, 6, 7, 8, 9]
+    for height, block_hash, txids, _ in blocks:
+        assert block_hash == stub_node.block(height)['hash']
+        assert txids == [txid for txid, _, _ in stub_node.block(height)['tx']]
+
+
+def test_dropped_blocks_and_transactions_are_fetched_again(stub_node, monkeypatch):
+    """Blocks 17, 42 and 43 and some transactions are dropped once, block 99 every time."""
+    asked = Counter()
+    iter_batch = analyzer.B1TRPCClient.iter_batch
+    batch_call = analyzer.B1TRPCClient.batch_call
+    flaky_blocks = {stub_node.block(height)['hash']: height for height in (17, 42, 43, 99)}
+
+    def dropping_iter_batch(self, calls):
+        for index, result in iter_batch(self, calls):
+            height = flaky_blocks.get(calls[index][1][0])
+            asked[height] += 1
+            if height == 99 or (height is not None and asked[height] == 1):
+                continue
+            yield index, result
+
+    def dropping_batch_call(self, calls):
+        results = batch_call(self, calls)
+        if calls and calls[0][0] == 'getrawtransaction' and not asked['tx']:
+            asked['tx'] += 1
+            results = [None if i % 2 else result for i, result in enumerate(results)]
+        return results
+
+    clean = analyzer.run_analysis(0, 149, min_zeros=2, batch_size=30, use_cache=False)
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'iter_batch', dropping_iter_batch)
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'batch_call', dropping_batch_call)
+    result = analyzer.run_analysis(0, 149, min_zeros=2, batch_size=30, use_cache=False)
+
+    assert result['unfetched_heights'] == [99]
+    assert result['unresolved_transactions'] == 0
+    assert asked[17] == asked[42] == 2
+    assert asked[99] == 1 + analyzer.REFETCH_ROUNDS
+    assert result['special_transaction_details'] == [tx for tx in clean['special_transaction_details'] if tx['block'] != 99]
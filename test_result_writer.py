@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import db
+
+
+def found(block, zeros=3, inputs=1, kind='zero'):
+    return {'event': kind, 'block': block, 'hash': f'{block:064x}', 'zeros': zeros, 'inputs': inputs, 'outputs': 2, 'coinbase': False}
+
+
+def stored_blocks(job_id=1):
+    return [row[0] for row in db.fetch_all('SELECT block_number FROM analysis_results WHERE job_id = ? ORDER BY block_number', (job_id,))]
+
+
+def test_rows_are_visible_after_a_batch_before_the_buffer_fills(web_db):
+    writer = web_db.ResultWriter(1, min_inputs=5, batch_size=1000, flush_interval=3600)
+    try:
+        writer(found(10))
+        writer(found(11))
+        assert stored_blocks() == []
+        writer({'event': 'batch', 'first': 0, 'last': 99})
+        assert stored_blocks() == [10, 11]
+    finally:
+        writer.close()
+
+
+def test_rows_are_written_before_a_checkpoint_is_saved(web_db):
+    writer = web_db.ResultWriter(1, min_inputs=5, batch_size=1000, flush_interval=3600)
+    try:
+        writer(found(20, inputs=7, kind='special'))
+        writer({'event': 'checkpoint', 'tip': 20})
+        assert stored_blocks() == [20]
+    finally:
+        writer.close()
+
+
+def test_rows_are_written_once_the_flush_interval_passes(web_db):
+    writer = web_db.ResultWriter(1, min_inputs=5, batch_size=1000, flush_interval=0)
+    try:
+        writer(found(30))
+        assert stored_blocks() == [30]
+    finally:
+        writer.close()
+
+
+def test_listed_special_transactions_are_stored_once(web_db):
+    writer = web_db.ResultWriter(1, min_inputs=5, batch_size=1000, flush_interval=3600)
+    writer(found(40, inputs=7, kind='special'))
+    writer(found(40, inputs=7))
+    writer.close()
+    assert db.fetch_all('SELECT block_number, is_special FROM analysis_results') == [(40, 1)]
+
+
+def test_rollback_deletes_the_dropped_blocks(web_db):
+    writer = web_db.ResultWriter(1, min_inputs=5, batch_size=2, flush_interval=3600)
+    try:
+        for block in (50, 51, 52, 53):
+            writer(found(block))
+        writer({'event': 'rollback', 'first': 52, 'last': 60})
+        assert stored_blocks() == [50, 51]
+        assert writer.written == 4
+    finally:
+        writer.close()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import async_rpc
+import final_analyzer_rpc as analyzer
+from rpc_batching import HTTP_FAILURE, AdaptiveBatcher, failure_budget, is_retryable, parse_batch_reply
+
+
+def failing_batches(monkeypatch, fails):
+    """Make B1TRPCClient.post fail for batches fails(calls) is true for; returns the sizes of the batches sent."""
+    sizes = []
+    post = analyzer.B1TRPCClient.post
+
+    def flaky_post(self, payload, exclude=None):
+        if isinstance(payload, list):
+            sizes.append(len(payload))
+            if fails(payload):
+                raise analyzer.RPCNodeError(self.nodes[0], 'HTTP Error: 500')
+        return post(self, payload, exclude)
+
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'post', flaky_post)
+    return sizes
+
+
+def test_a_failing_batch_is_bisected_until_its_parts_go_through(stub_node, monkeypatch):
+    sizes = failing_batches(monkeypatch, lambda payload: len(payload) > 4)
+    calls = [('getblockhash', [height]) for height in range(16)]
+    assert analyzer.B1TRPCClient().batch_call(calls) == [stub_node.block(height)['hash'] for height in range(16)]
+    assert sizes == [16, 8, 4, 4, 8, 4, 4]
+
+
+def test_only_the_bad_call_is_lost(stub_node, monkeypatch):
+    sizes = failing_batches(monkeypatch, lambda payload: any(request['params'] == [5] for request in payload))
+    calls = [('getblockhash', [height]) for height in range(8)]
+    hashes = analyzer.B1TRPCClient().batch_call(calls)
+    assert hashes == [stub_node.block(height)['hash'] if height != 5 else None for height in range(8)]
+    assert len(sizes) <= 1 + 2 * failure_budget(8, 3)
+
+
+def test_the_async_client_loses_only_the_bad_call_too(stub_node, monkeypatch):
+    post = async_rpc.AsyncB1TRPCClient._post
+
+    async def flaky_post(self, payload):
+        if isinstance(payload, list) and any(request['params'] == [5] for request in payload):
+            raise ConnectionError('HTTP Error: 500')
+        return await post(self, payload)
+
+    monkeypatch.setattr(async_rpc.AsyncB1TRPCClient, '_post', flaky_post)
+    bridge = async_rpc.AsyncRPCBridge()
+    try:
+        hashes = bridge.batch_call([('getblockhash', [height]) for height in range(8)])
+    finally:
+        bridge.close()
+    assert hashes == [stub_node.block(height)['hash'] if height != 5 else None for height in range(8)]
+
+
+def test_a_node_that_is_down_costs_few_requests(stub_node, monkeypatch):
+    sizes = failing_batches(monkeypatch, lambda payload: True)
+    calls = [('getblockhash', [height]) for height in range(64)]
+    assert analyzer.B1TRPCClient().batch_call(calls) == [None] * 64
+    assert len(sizes) <= 3 * failure_budget(64, 3)
+
+
+def test_transient_errors_are_retried_one_by_one(stub_node, monkeypatch):
+    retried = []
+    call = analyzer.B1TRPCClient.call
+
+    def record(self, method, params=None):
+        retried.append(params)
+        return call(self, method, params)
+
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'call', record)
+    monkeypatch.setattr(analyzer, 'parse_batch_reply', lambda replies, num_calls: [
+        (None, {'code': -28, 'message': 'warming up'}) if i == 2 else reply for i, reply in enumerate(parse_batch_reply(replies, num_calls))])
+    hashes = analyzer.B1TRPCClient().batch_call([('getblockhash', [height]) for height in range(4)])
+    assert hashes == [stub_node.block(height)['hash'] for height in range(4)]
+    assert retried == [[2]]
+
+
+def test_replies_are_matched_by_id_and_errors_classified():
+    replies = [{'id': 1, 'result': 'b', 'error': None}, {'id': 0, 'result': 'a', 'error': None},
+               {'id': 3, 'result': None, 'error': {'code': -5, 'message': 'not found'}}]
+    parsed = parse_batch_reply(replies, 4)
+    assert [result for result, _ in parsed] == ['a', 'b', None, None]
+    assert [is_retryable(error) for _, error in parsed] == [False, False, True, False]
+    assert not is_retryable(HTTP_FAILURE)
+
+
+def test_batch_size_moves_toward_the_target_latency_at_most_twofold():
+    batcher = AdaptiveBatcher(100, target_latency=2.0, max_size=1000)
+    batcher.record(100, 0.1, 1000)
+    assert batcher.next_size() == 150
+    for _ in range(20):
+        batcher.record(batcher.next_size(), 0.1, 1000)
+    assert batcher.next_size() == 1000
+
+    batcher.record(1000, 20.0, 1000)
+    assert batcher.next_size() == 750
+
+
+def test_batch_size_keeps_replies_under_the_limit():
+    batcher = AdaptiveBatcher(100, target_latency=2.0, max_reply_bytes=1000, min_size=10)
+    for _ in range(20):
+        batcher.record(batcher.next_size(), 0.1, batcher.next_size() * 50)
+    assert batcher.next_size() == 20
+
+
+def test_adaptive_batches_find_the_same_transactions(stub_node):
+    options = dict(min_zeros=2, batch_size=10, use_cache=False)
+    fixed = analyzer.run_analysis(0, 249, **options)
+    adaptive = analyzer.run_analysis(0, 249, adaptive_batch=True, target_latency=0.05, **options)
+    assert adaptive['special_transaction_details'] == fixed['special_transaction_details']
+    assert adaptive['blocks_analyzed'] == 250
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+import threading
+import time
+
+import final_analyzer_rpc as analyzer
+from rpc_budget import RPCBudget
+
+
+def hold(share, entered, release):
+    with share.slot():
+        entered.release()
+        release.wait(5)
+
+
+def test_shares_split_the_budget_evenly_with_the_remainder_first():
+    budget = RPCBudget(5)
+    first = budget.register('a')
+    budget.register('b')
+    budget.register('c')
+    assert [budget.share(key) for key in 'abc'] == [2, 2, 1]
+    first.close()
+    assert budget.share('a') == 0
+    assert [budget.share(key) for key in 'bc'] == [3, 2]
+
+
+def test_every_job_gets_a_slot_when_jobs_outnumber_the_budget():
+    budget = RPCBudget(2)
+    for key in 'abc':
+        budget.register(key)
+    assert [budget.share(key) for key in 'abc'] == [1, 1, 1]
+
+
+def test_a_lone_job_borrows_idle_slots_but_a_waiting_job_gets_its_share_first():
+    budget = RPCBudget(4)
+    busy = budget.register('busy')
+    entered = threading.Semaphore(0)
+    releases = [threading.Event() for _ in range(6)]
+
+    def start(share, release):
+        thread = threading.Thread(target=hold, args=(share, entered, release))
+        thread.start()
+        return thread
+
+    # 'busy' is alone and takes the whole budget
+    threads = [start(busy, release) for release in releases[:4]]
+    for _ in range(4):
+        assert entered.acquire(timeout=5)
+    assert budget.snapshot()['busy']['in_flight'] == 4
+
+    # Once 'late' registers, the next free slot goes to it rather than back to 'busy'
+    late = budget.register('late')
+    threads += [start(busy, releases[4]), start(late, releases[5])]
+    while budget.jobs['late']['waiting'] == 0 or budget.jobs['busy']['waiting'] == 0:
+        time.sleep(0.01)
+    releases[0].set()
+    assert entered.acquire(timeout=5)
+    assert budget.snapshot()['late']['in_flight'] == 1
+    assert budget.snapshot()['busy']['in_flight'] == 3
+
+    for release in releases:
+        release.set()
+    for thread in threads:
+        thread.join(5)
+    assert budget.in_flight == 0
+
+
+def test_nested_requests_reuse_the_thread_slot():
+    budget = RPCBudget(1)
+    share = budget.register('job')
+    with share.slot():
+        with share.slot():
+            assert budget.snapshot()['job'] == {'share': 1, 'in_flight': 1, 'requests': 1}
+    assert budget.snapshot()['job']['in_flight'] == 0
+
+
+def test_follow_polls_through_the_job_budget(stub_node, tmp_path):
+    state_path = str(tmp_path / 'follow.json')
+    stop = threading.Event()
+    options = dict(poll_interval=0.1, reorg_depth=10, batch_size=100, use_cache=False)
+    analyzer.follow_chain(0, state_path=state_path, stop=stop, progress=lambda status: stop.set(), **options)
+
+    # Nothing new to analyze: every request of the second run is follow mode's own tip polling
+    budget = RPCBudget(4)
+    share = budget.register('follow')
+    stop.clear()
+    analyzer.follow_chain(0, state_path=state_path, stop=stop, progress=lambda status: stop.set(), rpc_limiter=share, **options)
+    assert budget.snapshot()['follow']['requests'] > 0
+    assert budget.in_flight == 0
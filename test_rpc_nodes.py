@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import socket
+
+import final_analyzer_rpc as analyzer
+from stub_rpc_node import StubChain
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def use_nodes(monkeypatch, *ports):
+    monkeypatch.setenv('B1T_RPC_NODES', ','.join(f'127.0.0.1:{port}' for port in ports))
+
+
+def test_node_list_parsing():
+    nodes = analyzer.parse_rpc_nodes(' a:1, alice:secret@b , c:3 ,', 'user', 'pass')
+    assert [(node.url, node.auth) for node in nodes] == [
+        ('http://a:1', ('user', 'pass')), ('http://b:8332', ('alice', 'secret')), ('http://c:3', ('user', 'pass'))]
+
+
+def test_requests_are_spread_over_healthy_nodes(stub_node, start_stub, monkeypatch):
+    use_nodes(monkeypatch, start_stub(stub_node), start_stub(stub_node))
+    rpc = analyzer.B1TRPCClient()
+    for height in range(40):
+        assert rpc.call('getblockhash', [height]) == stub_node.block(height)['hash']
+    assert all(requests > 5 for _, requests, _, _ in rpc.node_summary())
+
+
+def test_a_failing_node_is_ejected_and_its_requests_retried_elsewhere(stub_node, start_stub, monkeypatch):
+    monkeypatch.setenv('B1T_RPC_EJECT_AFTER', '2')
+    use_nodes(monkeypatch, start_stub(stub_node), unused_port())
+    rpc = analyzer.B1TRPCClient()
+    hashes = rpc.batch_call([('getblockhash', [height]) for height in range(20)])
+    for height in range(20, 40):
+        hashes.append(rpc.call('getblockhash', [height]))
+
+    assert hashes == [stub_node.block(height)['hash'] for height in range(40)]
+    live, dead = rpc.nodes
+    assert not live.ejected_until and dead.ejected_until
+    assert dead.failures >= 2
+
+
+def test_nodes_on_another_chain_are_dropped(stub_node, start_stub, monkeypatch):
+    other = StubChain(stub_node.height, seed='fork')
+    use_nodes(monkeypatch, start_stub(stub_node), start_stub(other), start_stub(stub_node))
+    rpc = analyzer.B1TRPCClient()
+    rpc.verify_chain(stub_node.height)
+    assert len(rpc.nodes) == 2
+    assert all(rpc.call('getblockhash', [7]) == stub_node.block(7)['hash'] for _ in range(10))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import pytest
+
+import final_analyzer_rpc as analyzer
+
+
+def test_result_and_events_describe_the_same_scan(stub_node):
+    events = []
+    result = analyzer.run_analysis(0, 199, min_zeros=1, batch_size=50, use_cache=False, events=events.append)
+
+    assert result['blocks_analyzed'] == 200
+    assert result['transactions_analyzed'] == sum(len(stub_node.block(height)['tx']) for height in range(200))
+    specials = [event for event in events if event['event'] == 'special']
+    assert len(specials) == result['special_transactions']
+    # The transactions were reported as events and are not kept in the result as well
+    assert result['special_transaction_details'] == []
+
+    summary = events[-1]
+    assert summary['event'] == 'summary'
+    assert summary['special_transactions'] == result['special_transactions']
+    assert 'special_transaction_details' not in summary
+    assert [event['last'] for event in events if event['event'] == 'batch'] == [49, 99, 149, 199]
+
+
+@pytest.mark.parametrize('arguments, options', [
+    ((0,), {}),
+    ((0, None), {'follow': True, 'shards': 2}),
+    ((0, None), {'follow': True, 'checkpoint_path': 'job.json'}),
+])
+def test_inconsistent_arguments_are_rejected(arguments, options):
+    with pytest.raises(ValueError):
+        analyzer.run_analysis(*arguments, **options)
+
+
+def test_summary_is_printed_for_the_command_line(stub_node, capsys):
+    analyzer.run_analysis(0, 9, use_cache=False)
+    output = capsys.readouterr().out
+    assert '=== ANALYSIS SUMMARY ===' in output
+    assert 'Blocks analyzed: 10' in output
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import final_analyzer_rpc as analyzer
+
+
+OPTIONS = dict(min_zeros=2, min_inputs=2, batch_size=25, use_cache=False, show_all_zeros=True)
+COMPARED = ('blocks_analyzed', 'transactions_analyzed', 'coinbase_transactions', 'multi_input_transactions', 'zero_breakdown',
+            'special_transactions', 'special_transaction_details', 'zero_transaction_details')
+
+
+def test_split_shards_covers_the_range_once():
+    assert analyzer.split_shards(10, 19, 3) == [(10, 12), (13, 15), (16, 19)]
+    assert analyzer.split_shards(0, 1, 4) == [(0, 0), (1, 1)]
+    assert analyzer.split_shards(5, 5, 1) == [(5, 5)]
+
+
+def test_shards_give_the_same_result_as_one_process(stub_node):
+    single = analyzer.run_analysis(0, 199, **OPTIONS)
+    sharded = analyzer.run_analysis(0, 199, shards=3, **OPTIONS)
+    for key in COMPARED:
+        assert sharded[key] == single[key]
+
+
+def test_sharded_transactions_are_reported_as_events_after_merging(stub_node):
+    single = analyzer.run_analysis(0, 199, **OPTIONS)
+    statuses = []
+    events = []
+    analyzer.run_analysis(0, 199, shards=2, progress=statuses.append, events=events.append, **OPTIONS)
+
+    assert statuses[-1]['phase'] == 'completed'
+    assert events[-1]['event'] == 'summary'
+    assert events[-1]['special_transactions'] == single['special_transactions']
+    special = [event['hash'] for event in events if event['event'] == 'special']
+    assert special == [tx['hash'] for tx in single['special_transaction_details']]
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import json
+
+import pytest
+
+import final_analyzer_rpc as analyzer
+from rpc_batching import MemoryBudget, block_memory, iter_json_array
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+REPLIES = [{'id': 0, 'result': {'tx': ['ab' * 32] * 50, 'note': 'grüße ✓'}, 'error': None},
+           {'id': 1, 'result': None, 'error': {'code': -5, 'message': 'not found'}},
+           {'id': 2, 'result': [1, [2, {'3': '[]'}]], 'error': None}]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, 100000])
+def test_array_elements_decode_across_any_chunk_boundary(chunk_size):
+    data = json.dumps(REPLIES, ensure_ascii=False, indent=1).encode()
+    assert list(iter_json_array(split(data, chunk_size))) == REPLIES
+
+
+def test_a_single_object_reply_is_one_element():
+    assert list(iter_json_array(split(json.dumps(REPLIES[1]).encode(), 3))) == [REPLIES[1]]
+    assert list(iter_json_array([b'[', b' ]'])) == []
+
+
+def test_a_truncated_reply_raises_after_the_complete_elements():
+    data = json.dumps(REPLIES).encode()
+    elements = iter_json_array(split(data[:-20], 5))
+    assert next(elements) == REPLIES[0]
+    with pytest.raises(ValueError):
+        list(elements)
+
+
+def test_streamed_batches_yield_every_reply(stub_node):
+    rpc = analyzer.B1TRPCClient()
+    calls = [('getblock', [stub_node.block(height)['hash'], 1]) for height in range(30)]
+    replies = dict(rpc.iter_batch(calls))
+    assert sorted(replies) == list(range(30))
+    assert all(replies[height]['height'] == height for height in range(30))
+
+
+def test_memory_budget_caps_batches_by_the_blocks_seen():
+    budget = MemoryBudget(1, batches_held=4, initial_blocks=10)
+    assert budget.max_blocks(500) == 10
+    small = [(height, None, ['ab' * 32] * 10, None) for height in range(10)]
+    budget.record(small)
+    per_block = block_memory(small[0][2], None)
+    assert budget.max_blocks(100000) == 1024 * 1024 // (4 * per_block)
+
+    # A busier block raises the estimate at once
+    budget.record([(0, None, ['ab' * 32] * 1000, None)])
+    assert budget.max_blocks(100000) == 1024 * 1024 // (4 * block_memory(['ab' * 32] * 1000, None))
+    assert budget.max_blocks(1) == 1
+
+
+def test_a_memory_budget_does_not_change_the_results(stub_node):
+    options = dict(min_zeros=2, batch_size=100, use_cache=False)
+    plain = analyzer.run_analysis(0, 199, **options)
+    budgeted = analyzer.run_analysis(0, 199, memory_budget_mb=0.05, **options)
+    assert budgeted['special_transaction_details'] == plain['special_transaction_details']
+    assert budgeted['blocks_analyzed'] == 200
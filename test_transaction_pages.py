@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import pytest
+
+import db
+
+
+def store(rows):
+    db.executemany('''
+        INSERT INTO analysis_results (job_id, block_number, transaction_hash, leading_zeros, num_inputs, num_outputs, is_coinbase, is_special)
+        VALUES (1, ?, ?, ?, 1, 1, 0, ?)
+    ''', [(block, f'{block:064x}', zeros, special) for block, zeros, special in rows])
+
+
+def all_pages(app, **query):
+    client = app.app.test_client()
+    pages = []
+    cursor = None
+    while True:
+        response = client.get('/api/job/1/transactions', query_string={**query, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        data = response.get_json()
+        pages.append([(tx['block'], tx['zeros']) for tx in data['transactions']])
+        cursor = data['next_cursor']
+        if not cursor:
+            return pages
+
+
+def test_pages_cover_every_row_once_in_order(web_db):
+    store([(block, block % 4, block % 3 == 0) for block in range(10)])
+
+    pages = all_pages(web_db, kind='all', limit=3)
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert [block for page in pages for block, _ in page] == list(range(9, -1, -1))
+
+    pages = all_pages(web_db, kind='special', sort='zeros', order='asc', limit=2)
+    assert [row for page in pages for row in page] == [(0, 0), (9, 1), (6, 2), (3, 3)]
+
+
+def test_rows_without_a_zero_count_are_paged_by_zeros(web_db):
+    # Transactions moved from older jobs' results may lack their zero count
+    store([(1, 3, True), (2, None, True), (3, 5, True), (4, None, True), (5, 3, True)])
+
+    descending = [row for page in all_pages(web_db, sort='zeros', limit=1) for row in page]
+    assert descending == [(3, 5), (5, 3), (1, 3), (4, None), (2, None)]
+    ascending = [row for page in all_pages(web_db, sort='zeros', order='asc', limit=2) for row in page]
+    assert ascending == descending[::-1]
+
+
+def test_filters_apply_to_every_page(web_db):
+    store([(block, block % 4, False) for block in range(20)])
+    pages = all_pages(web_db, kind='all', min_zeros=2, from_block=5, to_block=15, order='asc', limit=4)
+    assert [block for page in pages for block, _ in page] == [6, 7, 10, 11, 14, 15]
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'WzEsMiwzXQ==', 'WyJhIiwxXQ=='])
+def test_malformed_cursors_are_rejected(web_db, cursor):
+    response = web_db.app.test_client().get('/api/job/1/transactions', query_string={'cursor': cursor})
+    assert response.status_code == 400
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import random
+from collections import defaultdict
+
+import final_analyzer_rpc as analyzer
+from final_analyzer_rpc import scan_block_batch
+from txid_archive import TxidArchive
+
+
+def make_blocks(first, last, seed=0):
+    rng = random.Random(seed)
+    blocks = []
+    for height in range(first, last + 1):
+        txids = []
+        for _ in range(rng.randrange(1, 12)):
+            zeros = rng.choice([0, 0, 1, 2, 4])
+            txids.append('0' * zeros + ''.join(rng.choice('123456789abcdef') for _ in range(64 - zeros)))
+        blocks.append((height, None, txids, None))
+    return blocks
+
+
+def archive_blocks(archive, blocks, max_height=None):
+    writer = archive.writer(max_height)
+    for height, _, txids, _ in blocks:
+        writer.append_block(height, txids)
+    writer.close()
+    return writer.blocks_written
+
+
+def test_queries_match_a_scan_of_the_blocks(tmp_path):
+    archive = TxidArchive(str(tmp_path / 'archive'))
+    blocks = make_blocks(100, 199)
+    archive_blocks(archive, blocks[:60])
+    archive_blocks(archive, blocks[60:])
+
+    for min_zeros in (0, 1, 2, 3):
+        histogram = defaultdict(int)
+        candidates = scan_block_batch(blocks[10:90], min_zeros, histogram)
+        assert archive.query(110, 189, min_zeros) == (80, sum(len(block[2]) for block in blocks[10:90]), dict(histogram), candidates)
+        assert archive.query(110, 189, min_zeros, with_candidates=False)[2] == dict(histogram)
+
+
+def test_coverage_skips_archived_and_unsettled_heights(tmp_path):
+    archive = TxidArchive(str(tmp_path / 'archive'))
+    blocks = make_blocks(0, 49)
+    assert archive_blocks(archive, blocks[10:20]) == 10
+    assert archive_blocks(archive, blocks, max_height=39) == 30
+
+    assert archive.ranges() == [(0, 39)]
+    assert archive.missing(0, 49) == [(40, 49)]
+    assert archive.missing(5, 30) == []
+    assert len(archive.segments()) == 3
+
+
+def test_an_archived_range_is_counted_without_the_node(stub_node, tmp_path, monkeypatch):
+    options = dict(min_zeros=2, batch_size=50, use_cache=False, archive_dir=str(tmp_path / 'archive'))
+    scanned = analyzer.run_analysis(0, 199, write_archive=True, **options)
+
+    def no_node(*args, **kwargs):
+        raise AssertionError('the node was asked')
+
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'post', no_node)
+    monkeypatch.setattr(analyzer.B1TRPCClient, 'iter_batch', no_node)
+    counted = analyzer.run_analysis(0, 199, from_archive=True, histogram_only=True, **options)
+    assert counted['blocks_analyzed'] == 200
+    assert counted['transactions_analyzed'] == scanned['transactions_analyzed']
+    assert counted['zero_breakdown'] == scanned['zero_breakdown']
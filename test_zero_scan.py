@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import random
+from collections import defaultdict
+
+import pytest
+
+from final_analyzer_rpc import scan_block_batch
+
+
+def leading_zeros(txid):
+    count = 0
+    for char in txid:
+        if char != '0':
+            break
+        count += 1
+    return count
+
+
+@pytest.mark.parametrize('min_zeros', [0, 1, 2, 5, 64])
+def test_scan_matches_counting_character_by_character(min_zeros):
+    rng = random.Random(min_zeros)
+    blocks = []
+    for height in range(30):
+        txids = []
+        for _ in range(rng.randrange(1, 40)):
+            zeros = rng.choice([0, 0, 0, 1, 2, 3, 6])
+            txids.append('0' * zeros + ''.join(rng.choice('123456789abcdef') for _ in range(64 - zeros)))
+        blocks.append((height, None, txids, None))
+    blocks[7][2].append('0' * 64)
+    blocks[9][2].append('0' * 63 + 'f')
+
+    histogram = defaultdict(int)
+    candidates = scan_block_batch(blocks, min_zeros, histogram)
+
+    expected = [(height, index, txid, leading_zeros(txid)) for height, _, txids, _ in blocks
+                for index, txid in enumerate(txids) if leading_zeros(txid) >= min_zeros]
+    assert candidates == expected
+    expected_histogram = defaultdict(int)
+    for candidate in expected:
+        expected_histogram[candidate[3]] += 1
+    assert histogram == expected_histogram
+
+
+def test_scan_adds_to_an_existing_histogram():
+    histogram = defaultdict(int, {2: 5})
+    scan_block_batch([(1, None, ['00a' + 'f' * 61, 'a' * 64], None), (2, None, [], None)], 2, histogram)
+    assert histogram == {2: 6}
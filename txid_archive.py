@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Columnar txid archive for answering leading-zero queries without the node.
+
+Every scanned block is appended to a segment: a run of consecutive heights
+stored as four column files of equal row count (one row per transaction):
+
+    <segment>.txids    32-byte binary txids
+    <segment>.heights  uint32 block height
+    <segment>.txidx    uint32 position of the transaction in its block
+    <segment>.zeros    uint8 number of leading '0' hex digits
+
+Segments never contain gaps, so an index of (first, last) height ranges in
+index.json describes the archive's coverage. Queries memory-map the columns,
+locate rows by bisecting the height column and count zeros with C-level
+bytes operations.
+"""
+
+import bisect
+import fcntl
+import json
+import mmap
+import os
+import re
+import uuid
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager
+
+DEFAULT_ARCHIVE_DIR = os.getenv('B1T_TXID_ARCHIVE_DIR', 'txid_archive')
+
+COLUMNS = ('txids', 'heights', 'txidx', 'zeros')
+
+# Longest possible run of leading zeros in a 32-byte txid
+MAX_ZEROS = 64
+
+
+class ArchiveSegment:
+    """Read-only, memory-mapped view of one segment."""
+
+    def __init__(self, directory, entry):
+        self.name = entry['name']
+        self.first = entry['first']
+        self.last = entry['last']
+        self.rows = entry['rows']
+        self._files = []
+        self._maps = {}
+        for column in COLUMNS:
+            f = open(os.path.join(directory, f"{self.name}.{column}"), 'rb')
+            self._files.append(f)
+            self._maps[column] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.rows else b''
+        self.heights = memoryview(self._maps['heights']).cast('I') if self.rows else []
+        self.txidx = memoryview(self._maps['txidx']).cast('I') if self.rows else []
+        self.zeros = self._maps['zeros']
+        self.txids = self._maps['txids']
+
+    def row_range(self, start_height, end_height):
+        """Rows holding transactions of blocks start_height..end_height."""
+        return (bisect.bisect_left(self.heights, start_height),
+                bisect.bisect_right(self.heights, end_height))
+
+    def close(self):
+        self.heights = self.txidx = None
+        for value in self._maps.values():
+            if isinstance(value, mmap.mmap):
+                value.close()
+        for f in self._files:
+            f.close()
+
+
+class ArchiveWriter:
+    """Appends scanned blocks to the archive, one segment per run of consecutive heights.
+
+    Heights already covered by the archive and heights above max_height
+    (too close to the tip to be final) are skipped.
+    """
+
+    def __init__(self, archive, max_height=None):
+        self.archive = archive
+        self.max_height = max_height
+        self.covered = archive.ranges()
+        self.entry = None
+        self.files = None
+        self.blocks_written = 0
+
+    def _is_covered(self, height):
+        i = bisect.bisect_right(self.covered, (height, float('inf'))) - 1
+        return i >= 0 and self.covered[i][0] <= height <= self.covered[i][1]
+
+    def _open_segment(self, height):
+        name = f"seg_{height:010d}_{uuid.uuid4().hex[:8]}"
+        self.entry = {'name': name, 'first': height, 'last': height - 1, 'rows': 0}
+        self.files = {column: open(os.path.join(self.archive.directory, f"{name}.{column}"), 'wb') for column in COLUMNS}
+
+    def _close_segment(self):
+        if self.entry is None:
+            return
+        for f in self.files.values():
+            f.close()
+        if self.entry['last'] >= self.entry['first']:
+            self.archive._add_segment(self.entry)
+        else:
+            for column in COLUMNS:
+                os.remove(os.path.join(self.archive.directory, f"{self.entry['name']}.{column}"))
+        self.entry = None
+        self.files = None
+
+    def append_block(self, height, txids):
+        if (self.max_height is not None and height > self.max_height) or self._is_covered(height):
+            self._close_segment()
+            return
+        if self.entry is None or height != self.entry['last'] + 1:
+            self._close_segment()
+            self._open_segment(height)
+
+        count = len(txids)
+        zeros = bytes([MAX_ZEROS - len(txid.lstrip('0')) if txid < '1' else 0 for txid in txids])
+        self.files['txids'].write(bytes.fromhex(''.join(txids)))
+        self.files['heights'].write(array('I', [height]).tobytes() * count)
+        self.files['txidx'].write(array('I', range(count)).tobytes())
+        self.files['zeros'].write(zeros)
+        self.entry['last'] = height
+        self.entry['rows'] += count
+        self.blocks_written += 1
+
+    def close(self):
+        self._close_segment()
+
+
+class TxidArchive:
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.json')
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, 'index.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'segments': []}
+
+    def _add_segment(self, entry):
+        with self._locked():
+            index = self._read_index()
+            index['segments'].append(entry)
+            index['segments'].sort(key=lambda segment: (segment['first'], segment['last']))
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+
+    def segments(self):
+        return self._read_index()['segments']
+
+    def ranges(self):
+        """Covered height ranges as sorted, merged (first, last) tuples."""
+        merged = []
+        for segment in self.segments():
+            if merged and segment['first'] <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], segment['last']))
+            else:
+                merged.append((segment['first'], segment['last']))
+        return merged
+
+    def missing(self, start_height, end_height):
+        """Height ranges within start_height..end_height that are not archived."""
+        gaps = []
+        current = start_height
+        for first, last in self.ranges():
+            if last < current:
+                continue
+            if first > end_height:
+                break
+            if first > current:
+                gaps.append((current, first - 1))
+            current = max(current, last + 1)
+        if current <= end_height:
+            gaps.append((current, end_height))
+        return gaps
+
+    def writer(self, max_height=None):
+        return ArchiveWriter(self, max_height)
+
+    def _slices(self, start_height, end_height):
+        """Yield (segment, first_row, end_row, first_height, last_height) covering the range once."""
+        current = start_height
+        for entry in self.segments():
+            if entry['last'] < current or entry['first'] > end_height:
+                continue
+            first = max(current, entry['first'])
+            last = min(end_height, entry['last'])
+            segment = ArchiveSegment(self.directory, entry)
+            try:
+                row_start, row_end = segment.row_range(first, last)
+                yield segment, row_start, row_end, first, last
+            finally:
+                segment.close()
+            current = last + 1
+
+    def query(self, start_height, end_height, min_zeros, with_candidates=True):
+        """Answer a threshold query for an archived range.
+
+        Returns (blocks, transactions, histogram, candidates). histogram maps
+        leading zeros -> count for every value >= min_zeros; candidates are
+        (height, tx_index, txid, leading_zeros) tuples in height order.
+        """
+        blocks = 0
+        transactions = 0
+        histogram = defaultdict(int)
+        candidates = []
+        min_zeros = max(min_zeros, 0)
+        # 0 and 1 leading zeros cover ~99.6% of rows; without candidates they
+        # are tallied with bytes.count() instead of visiting every row
+        first_hit = min_zeros if with_candidates else max(min_zeros, 2)
+        hit_pattern = None
+        if first_hit <= MAX_ZEROS:
+            hit_pattern = re.compile(b'[' + re.escape(bytes([first_hit])) + b'-' + re.escape(bytes([MAX_ZEROS])) + b']')
+
+        for segment, row_start, row_end, first, last in self._slices(start_height, end_height):
+            blocks += last - first + 1
+            transactions += row_end - row_start
+            zeros = segment.zeros[row_start:row_end]
+
+            for value in range(min_zeros, min(first_hit, MAX_ZEROS + 1)):
+                histogram[value] += zeros.count(value)
+            if hit_pattern is None:
+                continue
+
+            for match in hit_pattern.finditer(zeros):
+                row = row_start + match.start()
+                leading_zeros = zeros[match.start()]
+                histogram[leading_zeros] += 1
+                if with_candidates:
+                    txid = segment.txids[row * 32:(row + 1) * 32].hex()
+                    candidates.append((segment.heights[row], segment.txidx[row], txid, leading_zeros))
+
+        return blocks, transactions, dict(histogram), candidates